@@ -16,13 +16,50 @@ from ast import (
     NodeTransformer,
 )
 
+from importlib import import_module
+
 from .node import *
 from .nodes import *
 from .transformer import *
 from .finalise import finalise
+from .stats import RuleStats
+from .codegen import iter_python, write_python
+from .nodes.expressions import string_format
 
 AST = Node
 
 LETTERS = [chr(i) for i in range(0x0, 0x400) if chr(i).isalpha()]
-for l in LETTERS:
-    globals()[l] = Name(l)
+# Only imported once used, as some are slow to import
+SUBMODULES = 'batch bench cache diskcache frozen importer index macros serialize sexpr'.split()
+
+__all__ = '''\
+walk dump literal_eval iter_fields iter_child_nodes get_docstring
+copy_location fix_missing_locations increment_lineno
+NodeVisitor NodeTransformer
+copy parse link first_difference structural_hash Node NodeList AST
+match Language Python finalise RuleStats iter_python write_python
+load store del_ func_signature string_format operators precedence
+'''.split()
+if hasattr(nodes, 'augload'):
+    # Removed in Python 3.9
+    __all__ += 'augload augstore param'.split()
+# Every kind of node, such as BinOp and Load
+__all__ += sorted(
+    name for name, value in vars(nodes).items() if isinstance(value, type)
+    and issubclass(value, Node) and name not in __all__)
+__all__ += LETTERS
+
+
+def __getattr__(name):
+    if name in SUBMODULES:
+        return import_module('.' + name, __name__)
+    elif len(name) == 1 and name.isalpha() and ord(name) < 0x400:
+        # Letters are names, made when first used
+        node = globals()[name] = Name(name)
+        return node
+    raise AttributeError(
+        'module {!r} has no attribute {!r}'.format(__name__, name))
+
+
+def __dir__():
+    return sorted(set(globals()) | set(LETTERS) | set(SUBMODULES))
@@ -0,0 +1,7 @@
+'''Run `python -m astley -h` for usage.'''
+
+import sys
+
+from .batch import main
+
+sys.exit(main())
@@ -0,0 +1,230 @@
+'''Astley: Transpile a directory tree through a Language or Ruleset.'''
+
+import os
+import sys
+import argparse
+import builtins
+import importlib
+import importlib.util
+import marshal
+import struct
+from time import perf_counter
+from multiprocessing import Pool
+
+__all__ = 'load_class summary transpile_file transpile_tree'.split()
+
+STAGES = 'cache parse transform finalise render compile'.split()
+_classes = {}
+# One cache per directory in each process, so its totals are kept
+_caches = {}
+
+
+def load_class(spec):
+    '''Import a class given as "module:Class" or "module.Class".'''
+    cls = _classes.get(spec)
+    if cls is None:
+        module, _, name = spec.rpartition(':' if ':' in spec else '.')
+        cls = _classes[spec] = getattr(importlib.import_module(module), name)
+    return cls
+
+
+def transpile_file(spec, source_path, output_path=None, compile=False,
+                   cache=None):
+    '''Run one file through each stage, returning the time each took.
+
+    If cache is a directory, unchanged files are loaded from a DiskCache
+    there instead. The result is a dict of the path, the times of each
+    stage reached in seconds, and the error, if any, as a string.
+    '''
+    times = {}
+    result = {'path': source_path, 'times': times, 'error': None}
+    stage = 'parse'
+    try:
+        cls = load_class(spec)
+        start = perf_counter()
+        with open(source_path, encoding='utf8') as f:
+            source = f.read()
+
+        entry = code = None
+        if cache is not None:
+            stage = 'cache'
+            disk = _caches.get(cache)
+            if disk is None:
+                disk = _caches[cache] = DiskCache(cache)
+            key = disk.key(source, cls, source_path)
+            entry = disk.get(key)
+            start = _lap(times, stage, start)
+
+        if entry is None:
+            stage = 'parse'
+            node = parse(source, source_path)
+            start = _lap(times, stage, start)
+
+            stage = 'transform'
+            node = transform(cls, node, source_path)
+            start = _lap(times, stage, start)
+
+            stage = 'finalise'
+            node = finalise(node)
+            start = _lap(times, stage, start)
+
+            stage = 'render'
+            w = CodeGenerator()
+            w.visit(node)
+            new = w.getvalue()
+            start = _lap(times, stage, start)
+            if cache is not None:
+                # Compiled from the output, so its lines match it
+                code = builtins.compile(new, source_path, 'exec')
+                disk.put(key, new, code)
+        else:
+            new, code = entry
+
+        stage = 'render'
+        if output_path is not None:
+            os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+            with open(output_path, 'w', encoding='utf8') as f:
+                f.write(new + '\n')
+            start = _lap(times, stage, start - times.get(stage, 0))
+
+        if compile:
+            stage = 'compile'
+            if code is None:
+                code = builtins.compile(new, source_path, 'exec')
+            if output_path is not None:
+                _write_pyc(code, output_path)
+            _lap(times, stage, start)
+    except Exception as e:
+        result['error'] = '{}: {}: {}'.format(stage, type(e).__name__, e)
+    return result
+
+
+def _write_pyc(code, path):
+    '''Write code compiled from the file at path as its .pyc,
+    as py_compile would without compiling it again.'''
+    cfile = importlib.util.cache_from_source(path)
+    os.makedirs(os.path.dirname(cfile), exist_ok=True)
+    stat = os.stat(path)
+    # Magic number, flags, then the source's mtime and size (PEP 552)
+    data = importlib.util.MAGIC_NUMBER + struct.pack(
+        '<III', 0, int(stat.st_mtime) & 0xFFFFFFFF,
+        stat.st_size & 0xFFFFFFFF) + marshal.dumps(code)
+    # Written whole, then moved into place, so readers never see part
+    tmp = '{}.{}'.format(cfile, os.getpid())
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC,
+                 (stat.st_mode & 0o666) | 0o200)
+    try:
+        with open(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, cfile)
+    except OSError:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def _lap(times, stage, start):
+    now = perf_counter()
+    times[stage] = now - start
+    return now
+
+
+def _transpile_job(args):
+    return transpile_file(*args)
+
+
+def _sources(root):
+    if os.path.isfile(root):
+        yield root
+        return
+    for path, dirs, files in os.walk(root):
+        dirs.sort()
+        for name in sorted(files):
+            if name.endswith('.py'):
+                yield os.path.join(path, name)
+
+
+def transpile_tree(spec, root, output=None, compile=False,
+                   jobs=None, max_tasks=50, cache=None):
+    '''Transpile every .py file under root across a pool of processes.
+
+    Outputs mirror the tree under output, if given. Each worker is
+    replaced after max_tasks files to bound its memory.
+    Yields the result of each file as it finishes.
+    '''
+    base = root if os.path.isdir(root) else os.path.dirname(root)
+    work = [
+        (spec, path,
+         None if output is None
+         else os.path.join(output, os.path.relpath(path, base)),
+         compile, cache)
+        for path in _sources(root)]
+    if jobs == 1:
+        yield from map(_transpile_job, work)
+        return
+    with Pool(jobs, maxtasksperchild=max_tasks) as pool:
+        yield from pool.imap_unordered(_transpile_job, work)
+
+
+def summary(results, file=sys.stdout):
+    '''Print the time of each stage per file, and totals. Return failures.'''
+    header = '{:>10}' * (len(STAGES) + 1) + '  {}'
+    row = '{:>10.1f}' * (len(STAGES) + 1) + '  {}'
+    print(header.format(*STAGES, 'total', 'file (times in ms)'), file=file)
+    totals = dict.fromkeys(STAGES, 0)
+    failures = []
+    for result in sorted(results, key=lambda r: r['path']):
+        times = result['times']
+        for stage in STAGES:
+            totals[stage] += times.get(stage, 0)
+        if result['error']:
+            failures.append(result)
+        print(row.format(
+            *(times.get(s, 0) * 1000 for s in STAGES),
+            sum(times.values()) * 1000, result['path']), file=file)
+    print(row.format(
+        *(totals[s] * 1000 for s in STAGES),
+        sum(totals.values()) * 1000, 'total'), file=file)
+    for result in failures:
+        print('{}: {}'.format(result['path'], result['error']), file=file)
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m astley',
+        description='Transpile Python files through a Language or Ruleset.')
+    parser.add_argument(
+        'transformer', help='class to apply, as module:Class')
+    parser.add_argument('source', help='file or directory of .py files')
+    parser.add_argument(
+        '-o', '--output', help='directory to write transpiled files to')
+    parser.add_argument(
+        '-c', '--compile', action='store_true',
+        help='also compile output to bytecode')
+    parser.add_argument(
+        '-j', '--jobs', type=int, default=None,
+        help='number of worker processes (default: one per CPU)')
+    parser.add_argument(
+        '--cache', metavar='DIR',
+        help='directory to cache transpiled files in, skipping unchanged ones')
+    parser.add_argument(
+        '--max-tasks', type=int, default=50,
+        help='files each worker handles before it is replaced')
+    args = parser.parse_args(argv)
+
+    load_class(args.transformer)
+    results = transpile_tree(
+        args.transformer, args.source, args.output, args.compile,
+        args.jobs, args.max_tasks, args.cache)
+    return 1 if summary(results) else 0
+
+# Name mangling (interdependant functions)
+
+from .node import parse
+from .transformer import transform
+from .finalise import finalise
+from .codegen import CodeGenerator
+from .diskcache import DiskCache
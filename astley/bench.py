@@ -0,0 +1,419 @@
+'''Astley: Benchmark each stage of the pipeline against the ast module.
+
+Run `python -m astley.bench -h` for usage.
+'''
+
+import os
+import ast
+import sys
+import json
+import argparse
+import platform
+import subprocess
+import tracemalloc
+from time import perf_counter
+from functools import lru_cache
+
+__all__ = 'Corpus benchmark compare run_benchmarks report'.split()
+
+BENCHMARKS = {}
+# Where the ast module has no equivalent, a stage is compared to nothing
+BASELINES = {}
+
+
+class Corpus:
+    '''Named sources to benchmark over, and how many nodes they hold.'''
+    def __init__(self, sources):
+        self.sources = []
+        self.nodes = 0
+        for name, source in sources:
+            try:
+                tree = ast.parse(source)
+            except (SyntaxError, ValueError):
+                continue
+            self.sources.append((name, source))
+            self.nodes += sum(1 for _ in ast.walk(tree))
+
+    def __len__(self):
+        return len(self.sources)
+
+    def __iter__(self):
+        for _, source in self.sources:
+            yield source
+
+    @classmethod
+    def default(cls, paths=(), limit=20, depth=200, width=2000):
+        '''Python files under the paths, or the standard library,
+        then a deep and a wide tree.'''
+        files = []
+        for path in paths or [os.path.dirname(ast.__file__)]:
+            if os.path.isfile(path):
+                files.append(path)
+            elif not paths:
+                # Only the top of the standard library, as it is big
+                files.extend(
+                    os.path.join(path, name) for name in sorted(os.listdir(path))
+                    if name.endswith('.py'))
+            else:
+                for root, dirs, names in os.walk(path):
+                    dirs.sort()
+                    files.extend(
+                        os.path.join(root, name) for name in sorted(names)
+                        if name.endswith('.py'))
+        sources = []
+        for path in files[:limit]:
+            with open(path, 'rb') as f:
+                sources.append((path, f.read().decode('utf8', 'replace')))
+        sources.append(('<deep>', 'y = ' + ' + '.join(['x'] * depth)))
+        sources.append(('<wide>', '\n'.join(
+            'def f{0}(a, b):\n    return a * {0} + b'.format(i)
+            for i in range(width))))
+        return cls(sources)
+
+
+def benchmark(name, baseline=None):
+    '''Register a benchmark of one stage.
+
+    The function is given a Corpus, and sets up anything it needs
+    before returning (run, count): run is timed, and count is how many
+    items, such as nodes, it handles.
+    '''
+    def register(func):
+        BENCHMARKS[name] = func
+        if baseline is not None:
+            BASELINES[name] = baseline
+        return func
+    return register
+
+
+def _time(setup, corpus, repeat):
+    best = None
+    for _ in range(repeat):
+        run, count = setup(corpus)
+        start = perf_counter()
+        run()
+        took = perf_counter() - start
+        if best is None or took < best:
+            best = took
+    return best, count
+
+
+def _peak(setup, corpus):
+    run, _ = setup(corpus)
+    tracemalloc.start()
+    try:
+        run()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run_benchmarks(corpus, names=None, repeat=3, memory=True):
+    '''Run benchmarks and their baselines, returning a dict of results.
+
+    Each result has the best time in seconds, the items per second,
+    the peak memory allocated in bytes and, if the ast module has an
+    equivalent, its time as a ratio of that equivalent's.
+    '''
+    names = list(BENCHMARKS) if names is None else list(names)
+    for name in list(names):
+        base = BASELINES.get(name)
+        if base is not None and base not in names:
+            names.insert(names.index(name), base)
+
+    results = {}
+    for name in names:
+        setup = BENCHMARKS[name]
+        seconds, count = _time(setup, corpus, repeat)
+        results[name] = result = {
+            'seconds': seconds,
+            'per_second': count / seconds if seconds else None,
+            'peak': _peak(setup, corpus) if memory else None,
+        }
+        base = results.get(BASELINES.get(name))
+        if base is not None and base['seconds']:
+            result['ratio'] = seconds / base['seconds']
+    return results
+
+
+def compare(results, stored, tolerance=0.25, min_delta=0.01):
+    '''Return (name, old, new) for each benchmark slower than stored.
+
+    Ratios to the ast module are compared where both have one,
+    as they vary less between machines than times do. A benchmark must
+    also take min_delta seconds longer than expected, so that noise in
+    short timings is not taken for a regression. Benchmarks without
+    a stored result are not compared.
+    '''
+    slower = []
+    for name, new in results.items():
+        old = stored.get(name)
+        if old is None:
+            continue
+        key = 'ratio' if 'ratio' in new and 'ratio' in old else 'seconds'
+        # Seconds the stored result implies for this run
+        expected = new['seconds'] * old[key] / new[key]
+        if (new[key] > old[key] * (1 + tolerance)
+                and new['seconds'] - expected >= min_delta):
+            slower.append((name, old[key], new[key]))
+    return slower
+
+
+def report(results, stored=None, file=sys.stdout):
+    '''Print a table of results, with changes since the stored results.'''
+    header = '{:<18}{:>10}{:>14}{:>12}{:>8}{:>10}'
+    row = '{:<18}{:>10.2f}{:>14}{:>12}{:>8}{:>10}'
+    print(header.format(
+        'benchmark', 'ms', 'items/s', 'peak KiB', 'x ast', 'vs stored'),
+        file=file)
+    for name, result in results.items():
+        old = (stored or {}).get(name)
+        change = 'new' if stored is not None else ''
+        if old is not None:
+            key = 'ratio' if 'ratio' in result and 'ratio' in old else 'seconds'
+            change = '{:+.0%}'.format(result[key] / old[key] - 1)
+        print(row.format(
+            name, result['seconds'] * 1000,
+            _optional('{:.0f}', result['per_second']),
+            _optional('{:.0f}', result['peak'] and result['peak'] / 1024),
+            _optional('{:.2f}', result.get('ratio')),
+            change), file=file)
+
+
+def _optional(fmt, value):
+    return '-' if value is None else fmt.format(value)
+
+
+# Benchmarks
+
+@benchmark('ast.parse')
+def bench_ast_parse(corpus):
+    return lambda: [ast.parse(source) for source in corpus], corpus.nodes
+
+
+@benchmark('parse', baseline='ast.parse')
+def bench_parse(corpus):
+    return lambda: [parse(source) for source in corpus], corpus.nodes
+
+
+@benchmark('ast.fix_locations')
+def bench_ast_finalise(corpus):
+    trees = [ast.parse(source) for source in corpus]
+    return (
+        lambda: [ast.fix_missing_locations(tree) for tree in trees],
+        corpus.nodes)
+
+
+@benchmark('finalise', baseline='ast.fix_locations')
+def bench_finalise(corpus):
+    trees = [parse(source) for source in corpus]
+    return lambda: [finalise(tree) for tree in trees], corpus.nodes
+
+
+if hasattr(ast, 'unparse'):
+    @benchmark('ast.unparse')
+    def bench_ast_unparse(corpus):
+        trees = [ast.parse(source) for source in corpus]
+        return lambda: [ast.unparse(tree) for tree in trees], corpus.nodes
+
+    RENDER_BASELINE = 'ast.unparse'
+else:
+    RENDER_BASELINE = None
+
+
+@benchmark('as_python', baseline=RENDER_BASELINE)
+def bench_as_python(corpus):
+    trees = [finalise(parse(source)) for source in corpus]
+    # A fresh generator each time, so nothing cached is reused
+    return (
+        lambda: [CodeGenerator().generate(tree) for tree in trees],
+        corpus.nodes)
+
+
+@benchmark('sexpr.write')
+def bench_sexpr_write(corpus):
+    trees = [parse(source) for source in corpus]
+    return lambda: [format_node(tree) for tree in trees], corpus.nodes
+
+
+@benchmark('sexpr.read', baseline='ast.parse')
+def bench_sexpr_read(corpus):
+    texts = [format_node(parse(source)) for source in corpus]
+    return lambda: [list(read_nodes(text)) for text in texts], corpus.nodes
+
+
+@benchmark('dumps')
+def bench_dumps(corpus):
+    trees = [parse(source) for source in corpus]
+    return lambda: [dumps(tree) for tree in trees], corpus.nodes
+
+
+@benchmark('loads', baseline='ast.parse')
+def bench_loads(corpus):
+    data = [dumps(parse(source)) for source in corpus]
+    return lambda: [loads(item) for item in data], corpus.nodes
+
+
+class _Visitor(ast.NodeTransformer):
+    pass
+
+
+@benchmark('ast.NodeTransformer')
+def bench_ast_visit(corpus):
+    trees = [ast.parse(source) for source in corpus]
+    return lambda: [_Visitor().visit(tree) for tree in trees], corpus.nodes
+
+
+@benchmark('Language.visit', baseline='ast.NodeTransformer')
+def bench_language(corpus):
+    language, _ = _transformers()
+    trees = [parse(source) for source in corpus]
+    return lambda: [language(tree) for tree in trees], corpus.nodes
+
+
+@benchmark('Ruleset.visit', baseline='ast.NodeTransformer')
+def bench_ruleset(corpus):
+    trees = [parse(source) for source in corpus]
+    rules = _transformers()[1]()
+    return lambda: [rules.visit(tree) for tree in trees], corpus.nodes
+
+
+FORMULA = '(x + y) * z ** 2 - x / (y + 1)'
+CALLS = 2000
+
+
+@benchmark('eval')
+def bench_eval(corpus):
+    code = compile(FORMULA, '<formula>', 'eval')
+    return lambda: [
+        eval(code, {}, {'x': i, 'y': 2, 'z': 3}) for i in range(CALLS)], CALLS
+
+
+@benchmark('Node.eval', baseline='eval')
+def bench_node_eval(corpus):
+    node = parse(FORMULA, mode='eval').body
+    return lambda: [
+        node.eval(x=i, y=2, z=3, traceback=False) for i in range(CALLS)], CALLS
+
+
+@benchmark('Node.eval+tb', baseline='eval')
+def bench_node_eval_traceback(corpus):
+    node = parse(FORMULA, mode='eval').body
+    return lambda: [
+        node.eval(x=i, y=2, z=3, traceback=True) for i in range(CALLS)], CALLS
+
+
+@benchmark('Node.to_function', baseline='eval')
+def bench_to_function(corpus):
+    function = parse(FORMULA, mode='eval').body.to_function('x', 'y', 'z')
+    return lambda: [function(i, 2, 3) for i in range(CALLS)], CALLS
+
+
+def _import(module):
+    command = [sys.executable, '-c', 'import ' + module]
+    return lambda: subprocess.check_call(command), 1
+
+
+@benchmark('import ast')
+def bench_import_ast(corpus):
+    return _import('ast')
+
+
+@benchmark('import astley', baseline='import ast')
+def bench_import(corpus):
+    return _import('astley')
+
+
+@lru_cache(None)
+def _transformers():
+    # Defined once used, as macros are slow to import
+    from .macros import match as rule, Ruleset
+
+    @match
+    class _Statements(Language):
+        @match(kind=Expr, bare_node=True)
+        def top(self, node):
+            return self.generic_visit(node)
+
+    is_add = rule(kind=BinOp, op=rule(kind=Add))
+    is_zero = rule(kind=Constant, value=0)
+
+    class _Identities(Ruleset):
+        add_zero = rule(is_add, right=is_zero)(lambda n: n.left)
+
+    return _Statements, _Identities
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m astley.bench',
+        description='Time each stage of Astley against the ast module.')
+    parser.add_argument(
+        'paths', nargs='*',
+        help='files or directories to use (default: the standard library)')
+    parser.add_argument(
+        '-n', '--limit', type=int, default=20, help='most files to use')
+    parser.add_argument(
+        '-r', '--repeat', type=int, default=3,
+        help='times to run each benchmark, keeping the best')
+    parser.add_argument(
+        '-b', '--benchmark', action='append', choices=sorted(BENCHMARKS),
+        help='only run this benchmark, and its baseline')
+    parser.add_argument(
+        '--no-memory', action='store_true', help='skip measuring memory')
+    parser.add_argument(
+        '--save', metavar='FILE', help='store results as JSON')
+    parser.add_argument(
+        '--compare', metavar='FILE',
+        help='compare to stored results, failing if any are slower')
+    parser.add_argument(
+        '--tolerance', type=float, default=0.25,
+        help='fraction slower than stored that counts as a regression')
+    parser.add_argument(
+        '--min-delta', type=float, default=10, metavar='MS',
+        help='fewest milliseconds slower that counts as a regression')
+    args = parser.parse_args(argv)
+
+    corpus = Corpus.default(args.paths, args.limit)
+    print('{} sources, {} nodes, Python {}'.format(
+        len(corpus), corpus.nodes, platform.python_version()))
+    results = run_benchmarks(
+        corpus, args.benchmark, args.repeat, not args.no_memory)
+
+    stored = None
+    if args.compare:
+        with open(args.compare) as f:
+            stored = json.load(f)['results']
+    report(results, stored)
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({
+                'python': platform.python_version(),
+                'sources': len(corpus), 'nodes': corpus.nodes,
+                'results': results,
+            }, f, indent=1, sort_keys=True)
+    if stored is not None:
+        missing = [name for name in results if name not in stored]
+        if missing:
+            print('Not in {}, so not compared: {}'.format(
+                args.compare, ', '.join(missing)))
+        slower = compare(
+            results, stored, args.tolerance, args.min_delta / 1000)
+        for name, old, new in slower:
+            print('{} is slower: {:.3g} was {:.3g}'.format(name, new, old))
+        return 1 if slower else 0
+    return 0
+
+# Name mangling (interdependant functions)
+
+from .node import parse
+from .nodes import Add, BinOp, Constant, Expr
+from .finalise import finalise
+from .codegen import CodeGenerator
+from .transformer import match, Language
+from .sexpr import format_node, read_nodes
+from .serialize import dumps, loads
+
+if __name__ == '__main__':
+    sys.exit(main())
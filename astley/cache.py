@@ -0,0 +1,165 @@
+'''Bounded caches of compiled nodes.'''
+
+import os
+import atexit
+from collections import OrderedDict
+import _ast
+from _ast import AST
+
+__all__ = 'Interner LRUCache code_cache node_key'.split()
+
+
+class LRUCache:
+    '''Mapping which only keeps its most recently used items.
+
+    Once more than maxsize items are stored, the least recently used
+    is evicted and passed to on_evict(key, value), if given.
+    A maxsize of 0 disables caching.
+    '''
+    def __init__(self, maxsize=256, on_evict=None):
+        self.maxsize = maxsize
+        self.on_evict = on_evict
+        self.hits = self.misses = 0
+        self._items = OrderedDict()
+
+    def __repr__(self):
+        return '{}(maxsize={}, size={}, hits={}, misses={})'.format(
+            type(self).__name__, self.maxsize, len(self),
+            self.hits, self.misses)
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def get(self, key, default=None):
+        try:
+            value = self._items[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        self._items.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def __setitem__(self, key, value):
+        items = self._items
+        items[key] = value
+        items.move_to_end(key)
+        while len(items) > self.maxsize:
+            self._evict(*items.popitem(last=False))
+
+    def _evict(self, key, value):
+        if self.on_evict is not None:
+            self.on_evict(key, value)
+
+    def clear(self):
+        while self._items:
+            self._evict(*self._items.popitem(last=False))
+
+
+def node_key(node):
+    '''Hashable key that is equal for structurally equal nodes.'''
+    # Flat, with each node or list followed by its items, so that deep
+    # trees reach no recursion limit when keyed or compared
+    key = []
+    stack = [node]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, AST):
+            key.append(type(value))
+            stack.extend(getattr(value, i, None) for i in reversed(value._fields))
+        elif isinstance(value, (list, tuple)):
+            key.append((list, len(value)))
+            stack.extend(reversed(value))
+        else:
+            # Keep eg. 1, 1.0 and True apart
+            key.append((type(value), repr(value)))
+    return tuple(key)
+
+
+class Interner:
+    '''Factory which shares one node between identical subtrees.
+
+    Calling an interner on a tree replaces, in place, each repeated
+    expression (such as names, constants or attribute chains) with the
+    first equal one it has seen, across every tree given to it.
+    Statements are never shared. Shared nodes are kept by the interner
+    and must not be changed; their positions are of the first occurrence.
+    '''
+    unshared = (_ast.stmt, _ast.mod, _ast.excepthandler)
+
+    def __init__(self):
+        self._nodes = {}
+
+    def __len__(self):
+        return len(self._nodes)
+
+    def clear(self):
+        self._nodes.clear()
+
+    def __call__(self, tree):
+        # id(original) -> (original, interned), keeping originals alive
+        done = {}
+        stack = [tree]
+        while stack:
+            node = stack[-1]
+            if id(node) in done:
+                stack.pop()
+                continue
+            pending = [c for c in _children(node) if id(c) not in done]
+            if pending:
+                stack.extend(pending)
+                continue
+            stack.pop()
+            for name in node._fields:
+                value = getattr(node, name, None)
+                if isinstance(value, AST):
+                    new = done[id(value)][1]
+                    if new is not value:
+                        setattr(node, name, new)
+                elif isinstance(value, list):
+                    for i, item in enumerate(value):
+                        if isinstance(item, AST):
+                            value[i] = done[id(item)][1]
+            done[id(node)] = (node, self._share(node))
+        return done[id(tree)][1]
+
+    def _share(self, node):
+        if isinstance(node, self.unshared):
+            return node
+        try:
+            key = (type(node), ) + tuple(
+                _intern_key(getattr(node, i, None)) for i in node._fields)
+            return self._nodes.setdefault(key, node)
+        except TypeError:
+            # Unhashable field value
+            return node
+
+
+def _intern_key(value):
+    if isinstance(value, AST):
+        # Children are interned first, so identity is enough
+        return id(value)
+    elif isinstance(value, (list, tuple)):
+        return tuple(map(_intern_key, value))
+    elif isinstance(value, (float, complex)):
+        # Keep eg. 0.0 and -0.0 apart
+        return (type(value), repr(value))
+    return (type(value), value)
+
+
+def _remove_source(key, code):
+    '''Delete the temporary file a traceback-friendly code object uses.'''
+    mode, traceback, _ = key
+    if traceback:
+        try:
+            os.remove(code.co_filename)
+        except OSError:
+            pass
+
+code_cache = LRUCache(256, _remove_source)
+atexit.register(code_cache.clear)
+
+from .node import _children
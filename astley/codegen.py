@@ -0,0 +1,257 @@
+'''Astley: Single-pass generation of Python source from a node.'''
+
+from string import Formatter
+from _ast import AST, Expr, Module, stmt as _stmt
+
+__all__ = 'CodeGenerator iter_python to_python write_python'.split()
+
+_writers = {}
+_templates = {}
+_cached_writers = {}
+
+
+def writer_for(cls):
+    '''Find the method used to write nodes of a class.
+
+    A `_write(self, w)` method streams into the generator;
+    an overridden `_as_python(self)` returning a string is also accepted.
+    '''
+    writer = _writers.get(cls)
+    if writer is None:
+        for klass in cls.__mro__:
+            if '_write' in vars(klass):
+                writer = klass._write
+                break
+            elif '_as_python' in vars(klass):
+                writer = _write_string
+                break
+        else:
+            writer = _write_unknown
+        _writers[cls] = writer
+    return writer
+
+
+def _cached_writer(cls):
+    # (writer, None if unlinked else whether source is cached)
+    linked = issubclass(cls, Node) and bool(cls._fields or cls._attributes)
+    entry = _cached_writers[cls] = (
+        writer_for(cls), issubclass(cls, _stmt) if linked else None)
+    return entry
+
+
+def _write_string(node, w):
+    w.write(node._as_python())
+
+
+def _write_unknown(node, w):
+    raise TypeError('{} cannot be written as Python.'.format(
+        type(node).__name__))
+
+
+def template(sym):
+    '''Split a `sym` format string into (literal, attribute) parts.'''
+    parts = _templates.get(sym)
+    if parts is None:
+        parts = _templates[sym] = [
+            (literal, field and field.split('.', 1)[1])
+            for literal, field, _, _ in Formatter().parse(sym)]
+    return parts
+
+
+class CodeGenerator:
+    '''Render a node tree into one buffer in a single walk.
+
+    Nodes write themselves through `w.write` and `w.visit`;
+    blocks use `w.body` and `w.newline` to handle indentation.
+    If given a stream, the buffer is written to it between statements
+    once it holds flush_every chunks.
+
+    With cache, each statement keeps its source, and nodes are linked
+    to their parents so that changing one drops the cache of the
+    statements around it. Changing a node shared between places drops
+    the source cached for every statement.
+    '''
+    tab = ' ' * 4
+    flush_every = 1024
+
+    def __init__(self, stream=None, cache=False):
+        self.buffer = []
+        self.write = self.buffer.append
+        self.indent = 0
+        self.stream = stream
+        self.cache = cache
+        self._rendering = 0
+        self._parent = None
+        if cache:
+            self.visit = self._visit_cached
+
+    def generate(self, node):
+        '''Finalise a node once and return its source.'''
+        self.visit(finalise(node))
+        return self.getvalue()
+
+    def getvalue(self):
+        return ''.join(self.buffer)
+
+    def flush(self):
+        '''Write the buffer to the stream and empty it.'''
+        if self.buffer:
+            self.stream.write(self.getvalue())
+            self.buffer.clear()
+
+    def visit(self, node):
+        writer_for(type(node))(node, self)
+
+    def _link(self, node):
+        if isinstance(node, Node) and (node._fields or node._attributes):
+            # Trees built without parent links get them from rendering
+            node.__dict__.setdefault('_parent', self._parent)
+            return True
+        return False
+
+    def _visit_cached(self, node):
+        kind = type(node)
+        writer, cached_kind = _cached_writers.get(kind) or _cached_writer(kind)
+        if cached_kind is None:
+            return writer(node, self)
+        fields = node.__dict__
+        parent = self._parent
+        if '_parent' not in fields:
+            # Trees built without parent links get them from rendering
+            fields['_parent'] = parent
+        if cached_kind:
+            cached = _cached(fields, '_rendered')
+            if cached is not None and cached[0] == self.indent:
+                self.write(cached[1])
+                return
+            start = len(self.buffer)
+        self._parent = node
+        try:
+            writer(node, self)
+        finally:
+            self._parent = parent
+        if cached_kind:
+            text = ''.join(self.buffer[start:])
+            self.buffer[start:] = [text]
+            fields['_rendered'] = Node._shared_changes, (self.indent, text)
+
+    def render(self, node):
+        '''Return source of a subtree without writing it.'''
+        buffer, write = self.buffer, self.write
+        self.buffer = []
+        self.write = self.buffer.append
+        self._rendering += 1
+        try:
+            self.visit(node)
+            return self.getvalue()
+        finally:
+            self.buffer, self.write = buffer, write
+            self._rendering -= 1
+
+    def field(self, value):
+        '''Write a field of a node, which may be a node, None or a literal.'''
+        if isinstance(value, AST):
+            self.visit(value)
+        elif value is not None:
+            self.write(str(value))
+
+    def template(self, node, sym):
+        for literal, attr in template(sym):
+            if literal:
+                self.write(literal)
+            if attr:
+                self.field(getattr(node, attr, None))
+
+    def join(self, nodes, sep=', '):
+        for i, node in enumerate(nodes):
+            if i:
+                self.write(sep)
+            self.visit(node)
+
+    def parens(self, node, wrap=True):
+        if wrap:
+            self.write('(')
+            self.visit(node)
+            self.write(')')
+        else:
+            self.visit(node)
+
+    def newline(self):
+        self.write('\n' + self.tab * self.indent)
+
+    def statements(self, stmts):
+        for _ in self.iter_statements(stmts):
+            pass
+
+    def iter_statements(self, stmts):
+        '''Write statements of a module, yielding after each.'''
+        for i, stmt in enumerate(stmts):
+            if i:
+                self.newline()
+            self.statement(stmt, not i)
+            yield stmt
+
+    def statement(self, stmt, first=False):
+        if first and isinstance(stmt, Expr):
+            value = stmt.value
+            doc = getattr(value, 'value', getattr(value, 's', None))
+            if isinstance(doc, str):
+                if self.cache and self._link(stmt):
+                    self._parent, parent = stmt, self._parent
+                    self._link(value)
+                    self._parent = parent
+                self.write(string_format(doc, '"""'))
+                return
+        self.visit(stmt)
+        if (self.stream is not None and not self._rendering
+                and len(self.buffer) >= self.flush_every):
+            self.flush()
+
+    def body(self, stmts):
+        '''Write an indented block of statements, docstring first.'''
+        self.indent += 1
+        for i, stmt in enumerate(stmts):
+            self.newline()
+            self.statement(stmt, not i)
+        self.indent -= 1
+
+
+def to_python(node):
+    '''Return finalised node as Python source.
+
+    Statements left unchanged since the last call are not rewritten.
+    '''
+    return CodeGenerator(cache=True).generate(node)
+
+
+def write_python(node, stream):
+    '''Write finalised node as Python source to a file-like stream.
+
+    Source is written as it is generated, so only about
+    CodeGenerator.flush_every chunks are held at once.
+    '''
+    w = CodeGenerator(stream)
+    w.visit(finalise(node))
+    w.flush()
+
+
+def iter_python(node):
+    '''Yield finalised node as Python source, in chunks.
+
+    A module is yielded one top-level statement at a time.
+    '''
+    node = finalise(node)
+    w = CodeGenerator(cache=True)
+    if isinstance(node, Module):
+        for _ in w.iter_statements(node.body):
+            yield w.getvalue()
+            w.buffer.clear()
+    else:
+        w.visit(node)
+        yield w.getvalue()
+
+# Name mangling (interdependant functions)
+
+from .node import Node, _cached
+from .finalise import finalise
+from .nodes.expressions import string_format
@@ -0,0 +1,200 @@
+'''Astley: Persistent cache of transpiled files.'''
+
+import os
+import sys
+import hashlib
+import inspect
+import marshal
+import tempfile
+
+__all__ = 'DiskCache astley_hash transformer_hash'.split()
+
+
+_digests = {}
+
+def _digest_files(h, paths):
+    for path in sorted(set(paths)):
+        try:
+            with open(path, 'rb') as f:
+                h.update(f.read())
+        except OSError:
+            h.update(path.encode())
+
+def astley_hash():
+    '''Digest of the Astley sources, standing in for its version.'''
+    digest = _digests.get(None)
+    if digest is None:
+        root = os.path.dirname(os.path.abspath(__file__))
+        h = hashlib.sha256()
+        _digest_files(h, (
+            os.path.join(path, name)
+            for path, _, files in os.walk(root)
+            for name in files if name.endswith('.py')))
+        digest = _digests[None] = h.hexdigest()
+    return digest
+
+def transformer_hash(cls):
+    '''Digest of a transformer class and the files defining it.'''
+    if cls is None:
+        return 'None'
+    digest = _digests.get(cls)
+    if digest is None:
+        h = hashlib.sha256(
+            '{}.{}'.format(cls.__module__, cls.__qualname__).encode())
+        paths = []
+        for klass in cls.__mro__:
+            try:
+                paths.append(inspect.getsourcefile(klass))
+            except TypeError:
+                # Built in
+                pass
+        _digest_files(h, filter(None, paths))
+        digest = _digests[cls] = h.hexdigest()
+    return digest
+
+
+class DiskCache:
+    '''Content-addressed cache of transformed source and code on disk.
+
+    Entries are keyed by the source, filename and mode, the transformer
+    and the Astley and Python versions. Once entries exceed max_size bytes
+    or max_entries, the least recently used are deleted until they are
+    within nine tenths of them.
+    The default directory is $ASTLEY_CACHE, or ~/.cache/astley.
+    '''
+    suffix = '.astley'
+    # Other processes may write too, so the directory is listed again
+    # after this many writes even if it seems within its limits
+    prune_every = 256
+
+    def __init__(self, path=None, max_size=256 * 2 ** 20, max_entries=None):
+        if path is None:
+            path = os.environ.get('ASTLEY_CACHE') or os.path.join(
+                os.path.expanduser('~'), '.cache', 'astley')
+        self.path = path
+        self.max_size = max_size
+        self.max_entries = max_entries
+        self.hits = self.misses = 0
+        # Size and count of entries since the last prune, or None
+        self._size = self._count = None
+        self._writes = 0
+
+    def __repr__(self):
+        return '{}({!r}, hits={}, misses={})'.format(
+            type(self).__name__, self.path, self.hits, self.misses)
+
+    def key(self, source, transformer=None, filename='<unknown>', mode='exec'):
+        h = hashlib.sha256()
+        for part in (
+                astley_hash(), sys.implementation.cache_tag, sys.version,
+                transformer_hash(transformer), filename, mode):
+            h.update(part.encode() + b'\0')
+        h.update(source.encode('utf8', 'surrogatepass'))
+        return h.hexdigest()
+
+    def _file(self, key):
+        return os.path.join(self.path, key + self.suffix)
+
+    def get(self, key):
+        '''Return the (source, code) stored under key, or None.'''
+        path = self._file(key)
+        try:
+            with open(path, 'rb') as f:
+                entry = marshal.loads(f.read())
+            # Mark as recently used
+            os.utime(path)
+        except (OSError, ValueError, EOFError, TypeError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry
+
+    def put(self, key, source, code=None):
+        os.makedirs(self.path, exist_ok=True)
+        data = marshal.dumps((source, code))
+        fd, tmp = tempfile.mkstemp(suffix='.tmp', dir=self.path)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        # Readers never see a partly written entry
+        os.replace(tmp, self._file(key))
+        # Listing the directory costs as much as it has entries,
+        # so totals are kept rather than pruning on every write
+        self._writes += 1
+        if self._size is None or self._writes % self.prune_every == 0:
+            self.prune()
+            return
+        self._size += len(data)
+        self._count += 1
+        if self._size > self.max_size or (
+                self.max_entries is not None and self._count > self.max_entries):
+            self.prune()
+
+    def entries(self):
+        '''Return (last used, size, path) of each entry.'''
+        try:
+            files = list(os.scandir(self.path))
+        except OSError:
+            return []
+        entries = []
+        for entry in files:
+            if entry.name.endswith(self.suffix):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def __len__(self):
+        return len(self.entries())
+
+    def prune(self):
+        '''Delete the least recently used entries beyond the limits.'''
+        entries = sorted(self.entries())
+        size = sum(e[1] for e in entries)
+        count = len(entries)
+        max_size, max_entries = self.max_size, self.max_entries
+        if size > max_size or max_entries is not None and count > max_entries:
+            # Leave room, so the next writes do not prune again at once
+            max_size -= max_size // 10
+            if max_entries is not None:
+                max_entries -= max_entries // 10
+        for _, entry_size, path in entries:
+            if size <= max_size and (
+                    max_entries is None or count <= max_entries):
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            size -= entry_size
+            count -= 1
+        self._size, self._count = size, count
+
+    def clear(self):
+        for _, _, path in self.entries():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        self._size = self._count = 0
+
+    def transpile(self, source, transformer=None, filename='<unknown>',
+                  mode='exec'):
+        '''Return source transformed by a Language or Ruleset class,
+        and its code, loading them from the cache where possible.'''
+        key = self.key(source, transformer, filename, mode)
+        entry = self.get(key)
+        if entry is None:
+            node = transform(transformer, parse(source, filename, mode), filename)
+            node = finalise(node)
+            entry = to_python(node), compile(node, filename, mode)
+            self.put(key, *entry)
+        return entry
+
+# Name mangling (interdependant functions)
+
+from .node import parse
+from .transformer import transform
+from .finalise import finalise
+from .codegen import to_python
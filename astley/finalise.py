@@ -3,11 +3,16 @@
 # This file exists due to a strange import tree:
 # it relies on .expressions, which relies on .
 
-from _ast import AST
+import _ast
+from _ast import AST, Global, Nonlocal
+from .node import _cached
 from .nodes import Constant, Bytes, Num, Str, Name, NameConstant
 from sys import version_info
+from operator import is_
 
 NODE_ONLY_FIELDS = "body value left right".split()
+# Lists in which None marks an absent item, such as `**d` in a Dict
+OPTIONAL_ITEM_FIELDS = "keys kw_defaults".split()
 
 
 def finalise(node):
@@ -19,33 +24,25 @@ def finalise(node):
     """
     return _finalise(node)
 
-def _finalise(node, lineno=1, col_offset=0, _lvl=0):
-    if version_info >= (3, 8) and(
-        node is None or
-        node is True or
-        node is False or
-        node is Ellipsis or isinstance(
-            node, (int, float, complex, str, bytes)
-    )):
-        return Constant(node)
+def _update(node, name, old, new):
+    # Only set changed fields, so finalised nodes keep their cached hashes
+    if old is new or (
+            isinstance(old, list) and isinstance(new, list)
+            and len(old) == len(new) and all(map(is_, old, new))):
+        return
+    setattr(node, name, new)
 
-    elif isinstance(node, bool):
-        return NameConstant(node)
-    elif isinstance(node, (int, float, complex)):
-        return Num(node)
-    elif isinstance(node, str):
-        return Str(node)
-    elif isinstance(node, bytes):
-        return Bytes(node)
+def _finalise(node, lineno=1, col_offset=0, _lvl=0):
+    if not isinstance(node, AST):
+        node = _literal(node, lineno, col_offset, _lvl)
+        if not isinstance(node, AST) or hasattr(node, 'lineno'):
+            return node
 
-    elif callable(node) and hasattr(node, '__name__'):
-        # Allow functions to be placed in - a little unreliable?
-        return Name(node.__name__)
+    if isinstance(node, AST):
+        if _cached(node.__dict__, '_rendered') is not None:
+            # Rendered since it was last finalised and changed
+            return node
 
-    elif isinstance(node, (list, tuple)):
-        # We assume the user will use List() and Tuple() for actual usages
-        return list(_finalise(n, lineno, col_offset, _lvl) for n in node)
-    elif isinstance(node, AST):
         # Copy line and column data
         if 'lineno' in node._attributes:
             if not hasattr(node, 'lineno'):
@@ -61,19 +58,56 @@ def _finalise(node, lineno=1, col_offset=0, _lvl=0):
         # Instantiate default fields not provided
         defaults = getattr(type(node), '_defaults', {})
         for name, field in defaults.items():
-            if not hasattr(node, name):
-                setattr(node, name, field)
+            if name not in node.__dict__:
+                setattr(node, name, getattr(node, name))
 
         for name in node._fields:
-            field = getattr(node, name, None)
+            field = original = getattr(node, name, None)
             if isinstance(field, tuple):
                 # Convert tuple-fields into lists
                 field = list(field)
 
             # Avoid infinite recursion!
-            if type(node).__name__ == 'Constant' and name == 'value':
+            if isinstance(node, _ast.Constant) and name == 'value':
+                pass
+            elif name == 'names' and isinstance(node, (Global, Nonlocal)):
+                # Identifiers, not string literals
                 pass
+            elif name in OPTIONAL_ITEM_FIELDS and isinstance(field, list):
+                _update(node, name, original, [
+                    i if i is None else _finalise(i, lineno, col_offset, _lvl+1)
+                    for i in field])
             elif isinstance(field, (list, AST)) or name in NODE_ONLY_FIELDS:
-                setattr(node, name, _finalise(field, lineno, col_offset, _lvl+1))
+                _update(node, name, original,
+                        _finalise(field, lineno, col_offset, _lvl+1))
+    return node
+
+def _literal(node, lineno, col_offset, _lvl):
+    """Serialise a literal into its node form, which has no position yet."""
+    if version_info >= (3, 8) and(
+        node is None or
+        node is True or
+        node is False or
+        node is Ellipsis or isinstance(
+            node, (int, float, complex, str, bytes)
+    )):
+        return Constant(node)
+
+    elif isinstance(node, bool):
+        return NameConstant(node)
+    elif isinstance(node, (int, float, complex)):
+        return Num(node)
+    elif isinstance(node, str):
+        return Str(node)
+    elif isinstance(node, bytes):
+        return Bytes(node)
+
+    elif callable(node) and hasattr(node, '__name__'):
+        # Allow functions to be placed in - a little unreliable?
+        return Name(node.__name__)
+
+    elif isinstance(node, (list, tuple)):
+        # We assume the user will use List() and Tuple() for actual usages
+        return list(_finalise(n, lineno, col_offset, _lvl) for n in node)
 
     return node
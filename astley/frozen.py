@@ -0,0 +1,298 @@
+'''Astley: Read-only trees held in flat arrays, for analysing many modules.
+
+A frozen tree keeps no object per node. Nodes are numbered in
+pre-order, so the subtree of node i is the range (i, end[i]), and each
+array holds one thing about every node: its kind, parent, the field of
+the parent it is in, and where its other fields start in a table of
+cells. Values such as names are interned in a pool.
+'''
+
+from array import array
+from _ast import AST
+
+__all__ = 'freeze FrozenTree FrozenNode'.split()
+
+
+def freeze(node):
+    '''Return a FrozenTree of a node and its descendants.'''
+    return FrozenTree(node)
+
+
+class FrozenTree:
+    '''A node tree stored as parallel arrays.
+
+    >>> tree = freeze(parse(source))
+    >>> calls = list(tree.query(kind=Call))
+    >>> names = [tree[i].id for i in tree.walk() if tree.kind_of(i) is Name]
+    >>> node = calls[0].thaw()
+    Queries take a match, so `tree.query(match(kind=BinOp, op=Add))`
+    finds the nodes the match would.
+    '''
+    def __init__(self, node):
+        self.kinds, kind_ids = [], {}
+        self.names, name_ids = [], {}
+        self.pool, pool_ids = [], {}
+        self.kind = array('H')
+        self.parent = array('i')
+        self.field = array('H')
+        # Place in a list field, or -1 for a field holding one node
+        self.index = array('i')
+        # Cells of node i are cells[i] up to cells[i + 1]
+        self.cells = array('I')
+        self.cell_name = array('H')
+        # Pool index, or -1 - length for a list of nodes
+        self.cell_value = array('i')
+
+        def intern(table, ids, key, value):
+            i = ids.get(key)
+            if i is None:
+                i = ids[key] = len(table)
+                table.append(value)
+            return i
+
+        stack = [(node, -1, 0, -1)]
+        while stack:
+            value, parent, field, index = stack.pop()
+            i = len(self.kind)
+            kind = type(value)
+            self.kind.append(intern(self.kinds, kind_ids, kind, kind))
+            self.parent.append(parent)
+            self.field.append(field)
+            self.index.append(index)
+            self.cells.append(len(self.cell_name))
+
+            children = []
+            for name in tuple(value._fields) + tuple(value._attributes):
+                item = getattr(value, name, _MISSING)
+                if item is _MISSING:
+                    continue
+                name_id = intern(self.names, name_ids, name, name)
+                if isinstance(item, AST):
+                    children.append((item, i, name_id, -1))
+                    continue
+                elif isinstance(item, list) and any(
+                        isinstance(x, AST) for x in item):
+                    self.cell_name.append(name_id)
+                    self.cell_value.append(-1 - len(item))
+                    children.extend(
+                        (x, i, name_id, n) for n, x in enumerate(item)
+                        if isinstance(x, AST))
+                    continue
+                elif isinstance(item, list):
+                    item = tuple(item)
+                self.cell_name.append(name_id)
+                self.cell_value.append(intern(
+                    self.pool, pool_ids, _const_key(item), item))
+            stack.extend(reversed(children))
+        self.cells.append(len(self.cell_name))
+
+        self.end = array('I', range(1, len(self.kind) + 1))
+        end, parent = self.end, self.parent
+        for i in reversed(range(1, len(end))):
+            p = parent[i]
+            if end[i] > end[p]:
+                end[p] = end[i]
+        self._by_kind = None
+
+    def __repr__(self):
+        return '<{} of {} nodes>'.format(type(self).__name__, len(self))
+
+    def __len__(self):
+        return len(self.kind)
+
+    def __getitem__(self, i):
+        if not -len(self) <= i < len(self):
+            raise IndexError(i)
+        return FrozenNode(self, i % len(self))
+
+    @property
+    def root(self):
+        return FrozenNode(self, 0)
+
+    def nbytes(self):
+        '''Return the bytes taken by the arrays, but not the pool.'''
+        return sum(a.itemsize * len(a) for a in (
+            self.kind, self.parent, self.field, self.index, self.end,
+            self.cells, self.cell_name, self.cell_value))
+
+    # Traversal
+
+    def kind_of(self, i):
+        return self.kinds[self.kind[i]]
+
+    def walk(self, i=0):
+        '''Return indexes of node i and its descendants, in pre-order.'''
+        return range(i, self.end[i])
+
+    def children(self, i):
+        '''Yield indexes of the child nodes of node i, in order.'''
+        child, end = i + 1, self.end[i]
+        while child < end:
+            yield child
+            child = self.end[child]
+
+    def ancestors(self, i):
+        '''Yield indexes of the parents of node i, nearest first.'''
+        i = self.parent[i]
+        while i >= 0:
+            yield i
+            i = self.parent[i]
+
+    def fields(self, i):
+        '''Return a dict of the fields of node i which hold no nodes.'''
+        names, pool = self.names, self.pool
+        return {
+            names[self.cell_name[c]]: pool[self.cell_value[c]]
+            for c in range(self.cells[i], self.cells[i + 1])
+            if self.cell_value[c] >= 0}
+
+    def get(self, i, name, default=None):
+        '''Return field name of node i, as a FrozenNode if it is a node.'''
+        for c in range(self.cells[i], self.cells[i + 1]):
+            if self.names[self.cell_name[c]] == name:
+                value = self.cell_value[c]
+                if value >= 0:
+                    return self.pool[value]
+                items = [None] * (-1 - value)
+                for child in self.children(i):
+                    if self.names[self.field[child]] == name:
+                        items[self.index[child]] = FrozenNode(self, child)
+                return items
+        for child in self.children(i):
+            if self.names[self.field[child]] == name:
+                return FrozenNode(self, child)
+        return default
+
+    # Queries
+
+    def of_kind(self, kind):
+        '''Return indexes of every node which is an instance of kind.'''
+        if self._by_kind is None:
+            self._by_kind = by_kind = {}
+            for i, code in enumerate(self.kind):
+                found = by_kind.get(code)
+                if found is None:
+                    found = by_kind[code] = array('I')
+                found.append(i)
+        found = [
+            self._by_kind[code] for code, cls in enumerate(self.kinds)
+            if issubclass(cls, kind)]
+        if len(found) == 1:
+            return found[0]
+        return sorted(i for indexes in found for i in indexes)
+
+    def query(self, condition=None, kind=None):
+        '''Yield a FrozenNode of each node of kind for which condition,
+        a match or a function of a FrozenNode, is true.'''
+        if kind is None:
+            kind = getattr(condition, 'node_kind', None)
+        indexes = range(len(self)) if kind is None else self.of_kind(kind)
+        if condition is not None and hasattr(condition, 'matches'):
+            condition = condition.matches
+        for i in indexes:
+            node = FrozenNode(self, i)
+            if condition is None or condition(node):
+                yield node
+
+    def thaw(self, i=0):
+        '''Return node i and its descendants as ordinary nodes.'''
+        names, pool, kinds = self.names, self.pool, self.kinds
+        made = {}
+        for j in self.walk(i):
+            cls = kinds[self.kind[j]]
+            node = cls.__new__(cls)
+            values = node.__dict__
+            for c in range(self.cells[j], self.cells[j + 1]):
+                value = self.cell_value[c]
+                if value >= 0:
+                    value = pool[value]
+                    if type(value) is tuple and cls._fields:
+                        # Lists of names were kept as tuples
+                        value = _list_field(cls, names[self.cell_name[c]], value)
+                else:
+                    value = [None] * (-1 - value)
+                if type(value) is list:
+                    value = NodeList(node, value)
+                values[names[self.cell_name[c]]] = value
+            made[j] = node
+            if j != i:
+                parent = made[self.parent[j]]
+                name = names[self.field[j]]
+                place = self.index[j]
+                if place < 0:
+                    parent.__dict__[name] = node
+                else:
+                    parent.__dict__[name][place] = node
+                    values['_pos'] = place
+                values['_parent'] = parent
+                values['_field'] = name
+        return made[i]
+
+
+def _list_field(cls, name, value):
+    # Constants may be tuples, but other tuples were once lists
+    if issubclass(cls, _ast.Constant) and name == 'value':
+        return value
+    return list(value)
+
+
+class FrozenNode:
+    '''A view of one node of a FrozenTree, with the fields of a node.
+
+    It passes for an instance of its kind, so matches may be used on it.
+    '''
+    __slots__ = ('tree', 'index')
+
+    def __init__(self, tree, index):
+        self.tree = tree
+        self.index = index
+
+    @property
+    def __class__(self):
+        return self.tree.kinds[self.tree.kind[self.index]]
+
+    @property
+    def _fields(self):
+        return self.__class__._fields
+
+    def __getattr__(self, name):
+        value = self.tree.get(self.index, name, _MISSING)
+        if value is _MISSING:
+            raise AttributeError('{} has no attribute {!r}'.format(
+                self.__class__.__name__, name))
+        return value
+
+    def __eq__(self, other):
+        if type(other) is FrozenNode:
+            return self.tree is other.tree and self.index == other.index
+        return NotImplemented
+
+    def __hash__(self):
+        return hash((id(self.tree), self.index))
+
+    def __repr__(self):
+        return '<Frozen {} {}>'.format(self.__class__.__name__, self.index)
+
+    @property
+    def parent(self):
+        i = self.tree.parent[self.index]
+        return None if i < 0 else FrozenNode(self.tree, i)
+
+    @property
+    def children(self):
+        return [FrozenNode(self.tree, i) for i in self.tree.children(self.index)]
+
+    def thaw(self):
+        return self.tree.thaw(self.index)
+
+
+class _Missing:
+    pass
+
+_MISSING = _Missing()
+
+# Name mangling (interdependant functions)
+
+import _ast
+from .node import NodeList
+from .serialize import _const_key
@@ -0,0 +1,148 @@
+'''Astley: Import modules through a Language.'''
+
+import os
+import sys
+import marshal
+import hashlib
+import tempfile
+from importlib.abc import Loader, MetaPathFinder
+from importlib.util import (
+    MAGIC_NUMBER, cache_from_source, decode_source, spec_from_file_location)
+
+__all__ = 'LanguageFinder LanguageLoader install'.split()
+
+# Kept apart from the interpreter's own caches of the same files
+OPTIMIZATION = 'astley'
+
+
+class LanguageFinder(MetaPathFinder):
+    '''Finds modules to import through a Language or Ruleset class.
+
+    Modules in the given packages are found as .py files or with any of
+    the given extensions; elsewhere, only files with the extensions are.
+    '''
+    def __init__(self, language, packages=(), extensions=()):
+        if not (packages or extensions):
+            raise ValueError('Give packages or file extensions to import.')
+        self.language = language
+        self.packages = tuple(packages)
+        self.extensions = tuple(extensions)
+
+    def __repr__(self):
+        return '{}({}, packages={}, extensions={})'.format(
+            type(self).__name__, self.language.__name__,
+            self.packages, self.extensions)
+
+    def _suffixes(self, fullname):
+        for package in self.packages:
+            if fullname == package or fullname.startswith(package + '.'):
+                return self.extensions + ('.py', )
+        return self.extensions
+
+    def find_spec(self, fullname, path=None, target=None):
+        suffixes = self._suffixes(fullname)
+        if not suffixes:
+            return None
+        name = fullname.rpartition('.')[2]
+        for entry in path or sys.path:
+            entry = entry or os.getcwd()
+            for suffix in suffixes:
+                init = os.path.join(entry, name, '__init__' + suffix)
+                if os.path.isfile(init):
+                    return spec_from_file_location(
+                        fullname, init, loader=LanguageLoader(self.language, init),
+                        submodule_search_locations=[os.path.dirname(init)])
+                filename = os.path.join(entry, name + suffix)
+                if os.path.isfile(filename):
+                    return spec_from_file_location(
+                        fullname, filename,
+                        loader=LanguageLoader(self.language, filename))
+        return None
+
+    def uninstall(self):
+        if self in sys.meta_path:
+            sys.meta_path.remove(self)
+
+
+class LanguageLoader(Loader):
+    '''Loads a module transformed by a Language or Ruleset class.
+
+    Code is cached next to the source in __pycache__, and used while
+    the hash of the source, Astley and the transformer is unchanged.
+    '''
+    def __init__(self, language, path):
+        self.language = language
+        self.path = path
+
+    def create_module(self, spec):
+        return None
+
+    def exec_module(self, module):
+        exec(self.get_code(module.__name__), module.__dict__)
+
+    def get_filename(self, fullname=None):
+        return self.path
+
+    def get_source(self, fullname=None):
+        with open(self.path, 'rb') as f:
+            return decode_source(f.read())
+
+    def _digest(self, data):
+        h = hashlib.sha256()
+        h.update(astley_hash().encode())
+        h.update(transformer_hash(self.language).encode())
+        h.update(data)
+        return h.digest()
+
+    def get_code(self, fullname=None):
+        with open(self.path, 'rb') as f:
+            data = f.read()
+        header = MAGIC_NUMBER + self._digest(data)
+        cache = cache_from_source(self.path, optimization=OPTIMIZATION)
+        try:
+            with open(cache, 'rb') as f:
+                cached = f.read()
+        except OSError:
+            pass
+        else:
+            if cached.startswith(header):
+                return marshal.loads(cached[len(header):])
+
+        node = parse(decode_source(data), self.path)
+        node = finalise(transform(self.language, node, self.path))
+        code = compile(node, self.path, 'exec', dont_inherit=True)
+        if not sys.dont_write_bytecode:
+            _write(cache, header + marshal.dumps(code))
+        return code
+
+
+def _write(path, data):
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(suffix='.tmp', dir=os.path.dirname(path))
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except OSError:
+        # Read-only locations are simply not cached
+        pass
+
+
+def install(language, packages=(), extensions=()):
+    '''Import the given packages or file extensions through a Language.
+
+    Returns the finder, which may later be uninstalled:
+    >>> finder = install(MyLanguage, extensions=['.my'])
+    >>> import my_module
+    >>> finder.uninstall()
+    '''
+    finder = LanguageFinder(language, packages, extensions)
+    sys.meta_path.insert(0, finder)
+    return finder
+
+# Name mangling (interdependant functions)
+
+from .node import parse
+from .finalise import finalise
+from .transformer import transform
+from .diskcache import astley_hash, transformer_hash
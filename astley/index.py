@@ -0,0 +1,172 @@
+'''Astley: Nodes of a tree by kind, kept up to date as it changes.
+
+An index is attached to the root of a tree and every node below it.
+Setting a field of an indexed node, or editing one of its lists, takes
+the nodes that were replaced out of the index and puts the new ones in,
+so finding every Call in a module does not walk the whole of it.
+'''
+
+from itertools import count
+from _ast import AST
+
+__all__ = 'NodeIndex index_of'.split()
+
+
+def index_of(node):
+    '''Return the NodeIndex node belongs to, or None.'''
+    return getattr(node, '__dict__', {}).get('_index')
+
+
+class NodeIndex:
+    '''Live nodes of a tree by kind, and Names by identifier if names.
+
+    >>> index = NodeIndex(tree, names=True)
+    >>> calls = index.of_kind(Call)
+    >>> uses = index.named('x')
+    Operators and contexts, such as Add and Load, are shared between
+    trees so are not indexed. A node used twice in one tree is indexed
+    once, at the place it was last put.
+    '''
+    def __init__(self, root, names=False):
+        self.root = root
+        # {class: {id: node}}, each in the order nodes were indexed
+        self.kinds = {}
+        self.names = {} if names else None
+        # {id: (parent, field)}, parent being None for the root
+        self.parents = {}
+        # {id: n}; the first nodes indexed are numbered in pre-order
+        self.order = {}
+        self._count = count()
+        self._add(root, None, None, set())
+
+    def __repr__(self):
+        return '<{} of {} nodes>'.format(type(self).__name__, len(self))
+
+    def __len__(self):
+        return len(self.parents)
+
+    def __contains__(self, node):
+        return id(node) in self.parents
+
+    def of_kind(self, kind):
+        '''Return every node in the tree which is an instance of kind.'''
+        found = [
+            nodes for cls, nodes in self.kinds.items() if issubclass(cls, kind)]
+        if len(found) == 1:
+            return list(found[0].values())
+        return sorted(
+            (node for nodes in found for node in nodes.values()),
+            key=lambda node: self.order[id(node)])
+
+    def named(self, identifier):
+        '''Return every Name node with the identifier.'''
+        if self.names is None:
+            raise ValueError('Index was made without names.')
+        return list(self.names.get(identifier, {}).values())
+
+    def parent(self, node):
+        '''Return (parent, field) of a node in the tree.'''
+        return self.parents[id(node)]
+
+    def detach(self):
+        '''Stop keeping the index, removing it from every node.'''
+        for nodes in self.kinds.values():
+            for node in nodes.values():
+                node.__dict__.pop('_index', None)
+        self.kinds.clear()
+        self.parents.clear()
+        self.order.clear()
+        if self.names is not None:
+            self.names.clear()
+
+    # Upkeep
+
+    def _add(self, node, parent, field, kept):
+        stack = [(node, parent, field)]
+        pop, push = stack.pop, stack.append
+        parents, order, kinds = self.parents, self.order, self.kinds
+        names = self.names
+        number = self._count.__next__
+        while stack:
+            node, parent, field = pop()
+            if not isinstance(node, AST):
+                continue
+            cls = type(node)
+            fields = cls._fields
+            if not (fields or cls._attributes):
+                continue
+            key = id(node)
+            parents[key] = (parent, field)
+            values = node.__dict__
+            if values.get('_index') is self:
+                # Moved within the tree; its subtree is already indexed
+                kept.add(key)
+                continue
+            values['_index'] = self
+            order[key] = number()
+            found = kinds.get(cls)
+            if found is None:
+                found = kinds[cls] = {}
+            found[key] = node
+            if names is not None and cls.__name__ == 'Name':
+                self._name(node, getattr(node, 'id', None), True)
+            for name in reversed(fields):
+                value = getattr(node, name, None)
+                if type(value) is NodeList or isinstance(value, list):
+                    for i in range(len(value) - 1, -1, -1):
+                        push((value[i], node, name))
+                elif value is not None:
+                    push((value, node, name))
+
+    def _remove(self, node, parent, field, kept):
+        stack = [(node, parent, field)]
+        while stack:
+            node, parent, field = stack.pop()
+            key = id(node)
+            if not isinstance(node, AST) or key in kept:
+                continue
+            fields = node.__dict__
+            if fields.get('_index') is not self:
+                continue
+            place = self.parents[key]
+            if place[0] is not parent or place[1] != field:
+                # Moved elsewhere in the tree before this was replaced
+                continue
+            del fields['_index']
+            del self.parents[key], self.order[key]
+            del self.kinds[type(node)][key]
+            if self.names is not None and type(node).__name__ == 'Name':
+                self._name(node, fields.get('id'), False)
+            for name in node._fields:
+                value = fields.get(name)
+                if isinstance(value, list):
+                    stack.extend((item, node, name) for item in value)
+                else:
+                    stack.append((value, node, name))
+
+    def _name(self, node, identifier, add):
+        nodes = self.names.get(identifier)
+        if add:
+            if nodes is None:
+                nodes = self.names[identifier] = {}
+            nodes[id(node)] = node
+        elif nodes is not None:
+            nodes.pop(id(node), None)
+            if not nodes:
+                del self.names[identifier]
+
+    def _replace(self, parent, field, old, new):
+        '''Note that field of parent, once old, is now new.'''
+        if (self.names is not None and field == 'id'
+                and type(parent).__name__ == 'Name'):
+            self._name(parent, old, False)
+            self._name(parent, new, True)
+        kept = set()
+        for value in new if isinstance(new, list) else (new, ):
+            self._add(value, parent, field, kept)
+        for value in old if isinstance(old, list) else (old, ):
+            self._remove(value, parent, field, kept)
+
+# Name mangling (interdependant functions)
+
+from .node import NodeList
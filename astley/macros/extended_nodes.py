@@ -1,10 +1,12 @@
 from abc import abstractmethod
+from _ast import AST
 
 from ..node import Node
-from ..nodes import Add, Mult, UnaryOp, USub
+from ..nodes import Add, Sub, Mult, Div, BinOp, Constant, UnaryOp, USub
 from .match import match
 
-class CustomNode(Node):
+class CustomNode(Node, AST):
+    '''A node of Astley's own, which finalises into ast nodes.'''
     _attributes = ()
     @abstractmethod
     def finalise(self):
@@ -20,9 +22,45 @@ is_inv = match(kind=UInv)
 
 class Chain(CustomNode):
     _fields = 'op operands'.split()
+    def finalise(self):
+        '''Return the chain as BinOps, keeping its operands in order,
+        so that any calls among them are made in the same order.'''
+        is_add = isinstance(self.op, Add)
+        inverse = is_neg if is_add else is_inv
+        operands = list(self.operands)
+        if operands and (inverse(operands[0]) or (
+                is_add and _is_negative(operands[0]))):
+            # Numbers may be moved, as they call nothing:
+            # 3 - x is shorter than -x + 3
+            for i, a in enumerate(operands):
+                if _is_number(a) and not _is_negative(a):
+                    operands.insert(0, operands.pop(i))
+                    break
+        node = None
+        for a in operands:
+            if inverse(a):
+                a = a.operand if is_add else a.value
+            elif is_add and _is_negative(a):
+                # x + -1 is written as x - 1
+                a = Constant(-a.value)
+            elif node is None:
+                node = a
+                continue
+            else:
+                node = BinOp(node, type(self.op)(), a)
+                continue
+            if node is None:
+                node = UnaryOp(USub(), a) if is_add else BinOp(
+                    Constant(1), Div(), a)
+            else:
+                node = BinOp(node, Sub() if is_add else Div(), a)
+        if node is None:
+            node = Constant(0 if is_add else 1)
+        return node
+
     def _as_python(self):
         text = ''
-        ops = sorted(self.operands, key=is_neg | is_inv, reverse=True)
+        ops = self.operands
         is_add = isinstance(self.op, Add)
         is_mul = isinstance(self.op, Mult)
         for a in ops:
@@ -48,3 +86,11 @@ class Chain(CustomNode):
 
             text += a.as_python()
         return text.strip()
+
+def _is_number(node):
+    return (isinstance(node, Constant)
+            and type(node.value) in (int, float, complex))
+
+def _is_negative(node):
+    return (isinstance(node, Constant) and type(node.value) in (int, float)
+            and node.value < 0)
@@ -1,9 +1,15 @@
 
+from _ast import AST
+from time import perf_counter
+
 from ..node import Node
+from ..index import index_of
 
 from .. import NodeTransformer, iter_child_nodes
 
-__all__ = 'match Rule Ruleset Transformation'.split()
+__all__ = 'match Rule RuleIndex Ruleset Transformation'.split()
+
+MISSING = object()
 
 class match:
     '''Matching condition(s) for a node.'''
@@ -123,35 +129,167 @@ class Rule(match):
         else:
             return node
 
+def discriminators(m, tests=None):
+    '''Return the (field, is_kind, kind or value) tests a match requires.
+
+    These are kinds of fields matched by a nested match, such as
+    `op=match(kind=Add)`, and plain values such as `n=0`.
+    Any other condition is left for the match itself to check.
+    '''
+    if tests is None:
+        tests = []
+    if not m.all_condition:
+        return tests
+    for field, value in m.field_conditions.items():
+        if isinstance(value, match):
+            if value.node_kind is not None and not isinstance(value, Rule):
+                tests.append((field, True, value.node_kind))
+        elif not (isinstance(value, (list, tuple)) or callable(value)):
+            tests.append((field, False, value))
+    for condition in m.conditions:
+        if isinstance(condition, match) and not isinstance(condition, Rule):
+            discriminators(condition, tests)
+    return tests
+
+
+class RuleIndex:
+    '''Index of rules by node kind and discriminating field values.
+
+    Rules which may apply to a node are found from its class, the kinds
+    of the fields the rules test, and which of the values the rules test
+    for the fields are equal, and remembered for that combination, so
+    only those rules are tried. There are only as many combinations as
+    the rules make, however many values are seen.
+    Rules for a node kind come before generic rules.
+    '''
+    def __init__(self, rules):
+        rules = list(rules)
+        rules.sort(key=lambda r: r[1].node_kind is None)
+        self.rules = [(name, rule, discriminators(rule)) for name, rule in rules]
+        # Kinds the rules apply to, or None if any rule may apply to all
+        kinds = {rule.node_kind for _, rule in rules}
+        self.kinds = None if None in kinds else tuple(kinds)
+        # {node class: (fields, rules, {field signature: candidates})}
+        self._kinds = {}
+
+    def __call__(self, node):
+        entry = self._kinds.get(type(node))
+        if entry is None:
+            entry = self._kinds[type(node)] = self._for_kind(type(node))
+        fields, rules, found = entry
+        if not fields:
+            return rules
+
+        key = []
+        for field, by_kind, values in fields:
+            value = getattr(node, field, MISSING)
+            if by_kind:
+                key.append(type(value))
+            if values:
+                # Which tested values it equals, not the value itself,
+                # so new names or numbers do not each make an entry
+                key.append(tuple(
+                    i for i, test in enumerate(values) if value == test))
+        key = tuple(key)
+        candidates = found.get(key)
+        if candidates is None:
+            candidates = found[key] = self._select(node, rules)
+        return candidates
+
+    def _for_kind(self, kind):
+        rules = [
+            (name, rule, tests) for name, rule, tests in self.rules
+            if rule.node_kind is None or issubclass(kind, rule.node_kind)]
+        # {field: (whether its kind is tested, values tested)}
+        fields = {}
+        for _, _, tests in rules:
+            for field, is_kind, test in tests:
+                by_kind, values = fields.get(field, (False, ()))
+                if is_kind:
+                    fields[field] = True, values
+                else:
+                    fields[field] = by_kind, values + (test, )
+        rules = tuple(rules)
+        if not fields:
+            rules = tuple((name, rule) for name, rule, _ in rules)
+        fields = tuple((field, ) + entry for field, entry in fields.items())
+        return fields, rules, {}
+
+    @staticmethod
+    def _select(node, rules):
+        candidates = []
+        for name, rule, tests in rules:
+            for field, is_kind, test in tests:
+                value = getattr(node, field, MISSING)
+                if is_kind:
+                    if not isinstance(value, test):
+                        break
+                elif value is MISSING or not value == test:
+                    break
+            else:
+                candidates.append((name, rule))
+        return tuple(candidates)
+
+
 class Ruleset(match, NodeTransformer):
     '''Non-stateful set of rules which may transform a node directly.'''
     __slots__ = ('rules', )
+    _index = RuleIndex(())
+
+    def __init_subclass__(cls, **kw):
+        super().__init_subclass__(**kw)
+        cls._index = RuleIndex(
+            (name, rule) for name, rule in cls.__dict__.items()
+            if isinstance(rule, Rule))
 
-    def __init__(self):
+    def __init__(self, trace=None, stats=None):
         self.rules = {}
-        for name, rule in type(self).__dict__.items():
-            if not isinstance(rule, Rule):
-                continue
+        for name, rule, _ in self._index.rules:
             kind = rule.node_kind or 'generic'
             if kind not in self.rules:
                 self.rules[kind] = [(name, rule)]
             else:
                 self.rules[kind].append((name, rule))
+        # Called as trace(name, node, result) for each rule applied
+        self.trace = trace
+        # A RuleStats to fill; without one, rounds are not measured
+        self.stats = stats
+        if stats is not None:
+            self._transform_round = self._profiled_round
 
     def rules_for(self, node):
-        return self.rules.get(type(node), []) + self.rules.get('generic', [])
+        return self._index(node)
 
     def matches(self, node):
         return any(rule.matches(node) for name, rule in self.rules_for(node))
 
     def _transform_round(self, node):
-        rules_for = self.rules_for(node)
-        if len(rules_for):
-            print(f"-- Round for {type(node).__name__} `{node.as_python()}`:")
-        for name, rule in rules_for:
+        for name, rule in self.rules_for(node):
             if rule.matches(node):
-                print('Matched', name)
-                return rule.transform(node)
+                result = rule.transform(node)
+                if self.trace is not None:
+                    self.trace(name, node, result)
+                return result
+        else:
+            return None
+
+    def _profiled_round(self, node):
+        stats = self.stats
+        kind = stats.kind(type(node))
+        kind.rounds += 1
+        for name, rule in self.rules_for(node):
+            start = perf_counter()
+            matched = rule.matches(node)
+            took = perf_counter() - start
+            if not matched:
+                stats.record(name, kind, took)
+                continue
+            start = perf_counter()
+            result = rule.transform(node)
+            stats.record(name, kind, took, perf_counter() - start)
+            if self.trace is not None:
+                self.trace(name, node, result)
+            return result
         else:
             return None
 
@@ -165,8 +303,74 @@ class Ruleset(match, NodeTransformer):
                 return node
 
     def visit(self, node):
-        node = self.transform(node)
-        return self.generic_visit(node)
+        '''Rewrite a tree until no rule matches any of its nodes.
+
+        Children are rewritten before their parents, and only the new
+        parts of a rewritten node are examined again. Rules should
+        return new nodes rather than change children in place.
+        If node is the root of a NodeIndex and every rule is for a
+        node kind, only nodes of those kinds are examined.
+        '''
+        index = index_of(node)
+        if (index is not None and index.root is node
+                and self._index.kinds is not None):
+            return self._visit_indexed(node, index)
+        holder = [node]
+        # Nodes in which no rule matches, by id
+        done = {}
+        # (node, container, key, children_done): the node is at
+        # container[key] for lists, or getattr(container, key) for nodes
+        stack = [(node, holder, 0, False)]
+        while stack:
+            node, container, key, children_done = stack.pop()
+            if not children_done:
+                if id(node) not in done:
+                    stack.append((node, container, key, True))
+                    stack.extend(reversed(list(_child_slots(node, done))))
+                continue
+
+            new = self.transform(node)
+            if new is not node:
+                if isinstance(key, str):
+                    setattr(container, key, new)
+                else:
+                    container[key] = new
+                if isinstance(new, AST) and id(new) not in done:
+                    stack.append((new, container, key, False))
+                    continue
+            done[id(new)] = new
+        return holder[0]
+
+    def _visit_indexed(self, root, index):
+        # Pre-order reversed puts children before their parents
+        order = index.order
+        candidates = sorted(
+            {id(node): node for kind in self._index.kinds
+             for node in index.of_kind(kind)}.values(),
+            key=lambda node: order[id(node)], reverse=True)
+        for node in candidates:
+            if node not in index:
+                # Replaced along with an ancestor already rewritten
+                continue
+            new = self.transform(node)
+            if new is node:
+                continue
+            parent, field = index.parent(node)
+            if isinstance(new, AST):
+                new = self.visit(new)
+            if parent is None:
+                # The root was replaced, so the index no longer applies
+                index.detach()
+                return new
+            value = getattr(parent, field)
+            if isinstance(value, list):
+                for i, item in enumerate(value):
+                    if item is node:
+                        value[i] = new
+                        break
+            else:
+                setattr(parent, field, new)
+        return root
 
     # Being technically a match object, we include these properties for compatability
     # and analysis. A Ruleset may be treated as a Rule for all purposes, allowing
@@ -180,5 +384,16 @@ class Ruleset(match, NodeTransformer):
     def conditions(self):
         return self.rules
 
+def _child_slots(node, done):
+    for name in node._fields:
+        value = getattr(node, name, None)
+        if isinstance(value, AST):
+            if id(value) not in done:
+                yield value, node, name, False
+        elif isinstance(value, list):
+            for i, item in enumerate(value):
+                if isinstance(item, AST) and id(item) not in done:
+                    yield item, value, i, False
+
 class Transformation(Ruleset):
     '''A stateful ruleset using an instance for each transformation.'''
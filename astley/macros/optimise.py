@@ -0,0 +1,284 @@
+'''Optimisation passes for numeric code.
+
+Sums and products are flattened into Chains, so that constants
+anywhere in them may be folded together and identities removed,
+before they are written back as BinOps:
+
+>>> optimise(parse('y = (x + 1 + 2) * 1 - 0')).as_python()
+'y = x + 3'
+
+These assume + and * are associative and commutative, and that x + 0
+and x * 1 are x, as for numbers. Floats may round differently once
+regrouped, and code adding strings or lists, or whose classes
+define their own operators, should not be optimised. Divisions are
+kept wherever dividing by zero would raise ZeroDivisionError.
+
+Operands other than numbers are written back in the order they were
+in, so calls among them are still made in that order, but may then be
+grouped differently: f() - (g() - h()) becomes f() - g() + h().
+'''
+
+import operator
+from ast import walk, iter_child_nodes, copy_location
+
+from .match import match, Ruleset
+from .extended_nodes import Chain, UInv, is_neg, is_inv
+from ..nodes import (
+    Add, Sub, Mult, Div, FloorDiv, Mod, Pow, LShift, RShift,
+    BitOr, BitXor, BitAnd, USub, UAdd, Invert,
+    BinOp, UnaryOp, Constant, Name, Assign, Pass, Load, alias, arg,
+    ExceptHandler,
+    Global, Nonlocal, Module, FunctionDef, AsyncFunctionDef, ClassDef,
+    Lambda, GeneratorExp, ListComp, SetComp, DictComp)
+
+__all__ = 'Flatten FoldConstants Unflatten propagate_constants optimise'.split()
+
+NUMBERS = (int, float, complex)
+# Larger numbers are left to be worked out when the code runs
+MAX_BITS = 128
+
+BINARY = {
+    Add: operator.add, Sub: operator.sub, Mult: operator.mul,
+    Div: operator.truediv, FloorDiv: operator.floordiv, Mod: operator.mod,
+    Pow: operator.pow, LShift: operator.lshift, RShift: operator.rshift,
+    BitOr: operator.or_, BitXor: operator.xor, BitAnd: operator.and_,
+}
+UNARY = {USub: operator.neg, UAdd: operator.pos, Invert: operator.invert}
+
+
+def binop(op):
+    return match(kind=BinOp, op=match(kind=op))
+
+def integer(value):
+    return match(lambda n: type(n.value) is int and n.value == value, kind=Constant)
+
+is_number = match(lambda n: type(n.value) in NUMBERS, kind=Constant)
+is_zero = integer(0)
+is_one = integer(1)
+
+
+def _small(value):
+    '''Whether a folded value is worth writing as a constant.'''
+    if type(value) is int:
+        return value.bit_length() <= MAX_BITS
+    elif type(value) is float:
+        # inf and nan cannot be written as literals
+        return value - value == 0
+    elif type(value) is complex:
+        return _small(value.real) and _small(value.imag)
+    return False
+
+
+def _apply(func, *values):
+    if func is operator.pow or func is operator.lshift:
+        # Refuse before working out, not after, whatever the base
+        if abs(values[1]) > MAX_BITS:
+            return None
+    try:
+        value = func(*values)
+    except (ArithmeticError, ValueError, TypeError):
+        return None
+    return value if _small(value) else None
+
+
+# Flattening
+
+def _operands(node, op):
+    if isinstance(node, Chain) and isinstance(node.op, op):
+        return list(node.operands)
+    return [node]
+
+def _negate(node):
+    if is_neg(node):
+        return node.operand
+    elif is_number(node):
+        return Constant(-node.value)
+    return UnaryOp(USub(), node)
+
+def _invert(node):
+    if is_inv(node):
+        return node.value
+    return UInv(value=node)
+
+def _divisors(node):
+    operands = _operands(node, Mult)
+    if any(map(is_inv, operands)):
+        # a / (b / c) is not turned into a * c / b, which would not
+        # raise ZeroDivisionError when c is 0
+        return [UInv(value=node)]
+    return list(map(_invert, operands))
+
+
+class Flatten(Ruleset):
+    '''Turn sums and products into Chains of all their operands.'''
+    add = binop(Add)(lambda n: Chain(
+        Add(), _operands(n.left, Add) + _operands(n.right, Add)))
+    sub = binop(Sub)(lambda n: Chain(
+        Add(), _operands(n.left, Add) + list(map(_negate, _operands(n.right, Add)))))
+    mult = binop(Mult)(lambda n: Chain(
+        Mult(), _operands(n.left, Mult) + _operands(n.right, Mult)))
+    div = binop(Div)(lambda n: Chain(
+        Mult(), _operands(n.left, Mult) + _divisors(n.right)))
+
+
+# Folding
+
+def _fold_chain(node):
+    '''Return a chain with its numbers folded together, or None.'''
+    is_add = isinstance(node.op, Add)
+    total = 0 if is_add else 1
+    others = []
+    numbers = 0
+    for a in node.operands:
+        if is_number(a):
+            value = _apply(operator.add if is_add else operator.mul, total, a.value)
+        elif not is_add and is_inv(a) and is_number(a.value):
+            value = _apply(operator.truediv, total, a.value.value)
+        else:
+            others.append(a)
+            continue
+        if value is None:
+            others.append(a)
+        else:
+            total = value
+            numbers += 1
+
+    # Only whole numbers are dropped: x * 1.0 is a float
+    identity = type(total) is int and total == (0 if is_add else 1)
+    alone = len(node.operands) == 1 and not is_inv(node.operands[0])
+    if numbers < 2 and not (numbers and identity) and not alone:
+        return None
+    if not (identity and others):
+        others.append(Constant(total))
+    if len(others) == 1 and not is_inv(others[0]):
+        return others[0]
+    return Chain(type(node.op)(), others)
+
+def _fold_binop(node):
+    if not (is_number(node.left) and is_number(node.right)):
+        return None
+    func = BINARY.get(type(node.op))
+    value = func and _apply(func, node.left.value, node.right.value)
+    return None if value is None else copy_location(Constant(value), node)
+
+def _fold_unaryop(node):
+    func = UNARY.get(type(node.op))
+    if func is None or not is_number(node.operand):
+        return None
+    value = _apply(func, node.operand.value)
+    return None if value is None else copy_location(Constant(value), node)
+
+
+class FoldConstants(Ruleset):
+    '''Work out arithmetic on numbers, and drop x + 0 and x * 1.'''
+    fold_chain = match(
+        lambda n: _fold_chain(n) is not None, kind=Chain)(_fold_chain)
+    fold_binop = match(
+        lambda n: _fold_binop(n) is not None, kind=BinOp)(_fold_binop)
+    fold_unaryop = match(
+        lambda n: _fold_unaryop(n) is not None, kind=UnaryOp)(_fold_unaryop)
+
+    add_zero = match(binop(Add), right=is_zero)(lambda n: n.left)
+    zero_add = match(binop(Add), left=is_zero)(lambda n: n.right)
+    sub_zero = match(binop(Sub), right=is_zero)(lambda n: n.left)
+    mult_one = match(binop(Mult), right=is_one)(lambda n: n.left)
+    one_mult = match(binop(Mult), left=is_one)(lambda n: n.right)
+    pow_one = match(binop(Pow), right=is_one)(lambda n: n.left)
+
+
+class Unflatten(Ruleset):
+    '''Write Chains back as BinOps, so the tree may be compiled.'''
+    # Chains write their own UInvs as divisions, so they are left alone
+    chain = match(kind=Chain)(lambda n: n.finalise())
+
+
+# Constant propagation
+
+SCOPES = (
+    FunctionDef, AsyncFunctionDef, ClassDef, Lambda,
+    GeneratorExp, ListComp, SetComp, DictComp)
+# Functions which may read local variables by name
+INTROSPECTION = {'locals', 'vars', 'eval', 'exec', 'dir'}
+
+
+def _in_scope(nodes):
+    '''Yield nodes and their descendants, not entering nested scopes.'''
+    stack = list(reversed(nodes))
+    while stack:
+        node = stack.pop()
+        yield node
+        if not isinstance(node, SCOPES):
+            stack.extend(reversed(list(iter_child_nodes(node))))
+
+
+def _propagate(scope, remove):
+    names = {}
+    fixed = set()
+    for node in walk(scope):
+        if isinstance(node, Name):
+            if not isinstance(node.ctx, Load):
+                names[node.id] = names.get(node.id, 0) + 1
+        elif isinstance(node, (Global, Nonlocal)):
+            fixed.update(node.names)
+        elif node is not scope and isinstance(node, (
+                FunctionDef, AsyncFunctionDef, ClassDef)):
+            fixed.add(node.name)
+        elif isinstance(node, alias):
+            fixed.add(node.asname or node.name.split('.')[0])
+        elif isinstance(node, (ExceptHandler, arg)):
+            fixed.add(getattr(node, 'name', None) or getattr(node, 'arg', None))
+
+    body = scope.body
+    for stmt in list(body):
+        if not (isinstance(stmt, Assign) and len(stmt.targets) == 1
+                and isinstance(stmt.targets[0], Name)
+                and isinstance(stmt.value, Constant)):
+            continue
+        name = stmt.targets[0].id
+        if names.get(name) != 1 or name in fixed:
+            continue
+        value = stmt.value.value
+        for later in body[stmt.place[1] + 1:]:
+            for node in _in_scope([later]):
+                if isinstance(node, Name) and node.id == name:
+                    field, pos = node.place
+                    new = copy_location(Constant(value), node)
+                    if pos is None:
+                        setattr(node.parent, field, new)
+                    else:
+                        getattr(node.parent, field)[pos] = new
+
+        if remove and not any(
+                isinstance(node, Name) and node.id in INTROSPECTION | {name}
+                and node is not stmt.targets[0]
+                for node in walk(scope)):
+            del body[stmt.place[1]]
+    if not body:
+        body.append(Pass())
+
+
+def propagate_constants(node, module=False):
+    '''Replace names assigned a constant once in a function by it.
+
+    Only assignments in the body of a function itself are used, and
+    only later statements are changed. Names are not replaced in
+    nested functions or comprehensions. Unless they are read there,
+    the assignments are then removed. If module is true, this is also
+    done with assignments in the module, which other modules may read.
+    '''
+    scopes = [
+        scope for scope in walk(node)
+        if isinstance(scope, (FunctionDef, AsyncFunctionDef))
+        or module and isinstance(scope, Module)]
+    for scope in scopes:
+        _propagate(scope, not isinstance(scope, Module))
+    return node
+
+
+def optimise(node, module=False):
+    '''Return a tree with its arithmetic and constants simplified.'''
+    node = FoldConstants().visit(node)
+    propagate_constants(node, module)
+    node = Flatten().visit(node)
+    node = FoldConstants().visit(node)
+    return Unflatten().visit(node)
@@ -1,15 +1,13 @@
 """Base Node (= AST) class which all nodes inherit from."""
 
-import os
-import tempfile
-
 from _ast import AST
+from operator import is_
 # pylint: disable=E1101
 # E1101: node.attr
 
 _globals = globals
 
-__all__ = "copy parse Node".split()
+__all__ = "copy parse link first_difference structural_hash Node NodeList".split()
 
 def copy(old_node, new_node):
     old_attr = getattr(old_node, '_attributes', None)
@@ -23,24 +21,17 @@ def copy(old_node, new_node):
 DFIELDS = ("lineno", "col_offset")
 PyCF_ONLY_AST = 1024
 
-def parse(source, filename="<unknown>", mode="exec"):
-    return modify(compile(
+def parse(source, filename="<unknown>", mode="exec", lazy=False):
+    """Parse source into an Astley node.
+
+    The parsed tree is adopted in place rather than copied.
+    If lazy is True, child nodes are instead only converted once accessed.
+    """
+    node = compile(
         source, filename,
         "eval" if mode is eval else "exec" if mode is exec else mode,
-        PyCF_ONLY_AST))
-
-class CodeDisplay:
-    def __init__(self, node):
-        self._node = node
-
-    def __getattr__(self, attr):
-        item = getattr(self._node, attr, None)
-        if isinstance(item, Node):
-            return item.as_python()
-        elif item is not None:
-            return item
-        else:
-            return ""
+        PyCF_ONLY_AST)
+    return modify(node, True) if lazy else adopt(node)
 
 # extremely unlikely sentinel
 NODE = "ϨϨϨ"
@@ -65,29 +56,290 @@ class _Face:
     def __ne__(self, value):
         return object.__getattribute__(self, NODE).__nequate__(value)
 
+MISSING = object()
+
+class _Default:
+    """Class-level value of a field a node was not given.
+
+    The value is stored on the node on first access, copying lists,
+    so later lookups find it directly.
+    """
+    __slots__ = ('name', 'value')
+    def __init__(self, name, value):
+        self.name = name
+        self.value = value
+
+    def __get__(self, node, cls=None):
+        if node is None:
+            return self.value
+        fields = node.__dict__
+        if '_source' in fields:
+            value = node._from_source(self.name)
+            if value is not MISSING:
+                return value
+        value = self.value
+        if isinstance(value, list):
+            value = NodeList(node, value)
+        fields[self.name] = value
+        return value
+
+class NodeList(list):
+    """List field of a node, which tells the node when it is edited."""
+    __slots__ = ('owner', )
+    def __init__(self, owner, items=()):
+        super().__init__(items)
+        self.owner = owner
+
+def _place(items, i, clamp=False):
+    if i < 0:
+        i += len(items)
+    if clamp:
+        return min(max(i, 0), len(items))
+    elif not 0 <= i < len(items):
+        raise IndexError('list index out of range')
+    return i
+
+def _span(items, name, args):
+    """Return (start, removed) of an edit: where the list first changes,
+    and the items the edit takes out of it."""
+    if name in ('append', 'extend', '__iadd__'):
+        return len(items), []
+    elif name == 'insert':
+        return _place(items, args[0], True), []
+    elif name in ('__setitem__', '__delitem__'):
+        key = args[0]
+        if not isinstance(key, slice):
+            i = _place(items, key)
+            return i, [items[i]]
+        start, stop, step = key.indices(len(items))
+        if step == 1:
+            return start, items[start:max(start, stop)]
+    elif name == 'pop':
+        i = _place(items, args[0] if args else -1)
+        return i, [items[i]]
+    elif name == 'remove':
+        i = list.index(items, args[0])
+        return i, [items[i]]
+    # Clearing, sorting or repeating may move every item
+    return 0, list(items)
+
+def _edit(name):
+    method = getattr(list, name)
+    def edit(self, *args, **kw):
+        # Unpickling fills the list before it has an owner
+        owner = getattr(self, 'owner', None)
+        if owner is None:
+            return method(self, *args, **kw)
+        if name == '__setitem__':
+            key, value = args
+            if isinstance(key, slice):
+                value = list(value)
+                args = key, value
+                if key == slice(None) and len(value) == len(self) and all(
+                        map(is_, value, self)):
+                    # Transformers set every list, changed or not
+                    return None
+            elif self[key] is value:
+                return None
+        elif name in ('extend', '__iadd__'):
+            args = list(args[0]),
+        _changed(owner)
+        values = owner.__dict__
+        for field in owner._fields:
+            if values.get(field) is self:
+                break
+        else:
+            # No longer a field of its owner
+            return method(self, *args, **kw)
+        # Only the items taken out and put in are unlinked and indexed,
+        # and only those from start on need to know where they now are
+        start, removed = _span(self, name, args)
+        kept = len(self) - len(removed)
+        _unlink_value(removed, owner, field)
+        result = method(self, *args, **kw)
+        _link_value(self, owner, field, start)
+        index = values.get('_index')
+        if index is not None:
+            added = self[start:start + len(self) - kept]
+            index._replace(owner, field, removed, added)
+        return result
+    edit.__name__ = name
+    return edit
+
+for _name in (
+        '__setitem__ __delitem__ __iadd__ __imul__ '
+        'append extend insert pop remove clear sort reverse').split():
+    setattr(NodeList, _name, _edit(_name))
+del _name
+
+def _holds(parent, field, pos, node):
+    value = parent.__dict__.get(field)
+    if pos is None:
+        return value is node
+    return isinstance(value, list) and pos < len(value) and value[pos] is node
+
+def _link(node, parent, field, pos=None):
+    """Note that node is field of parent, at pos if the field is a list.
+
+    A node put in a second place while still in its first is marked
+    as shared, as its parent link only leads up to one of them.
+    """
+    if isinstance(node, AST) and (node._fields or node._attributes):
+        values = node.__dict__
+        old = values.get('_parent')
+        if old is not None and '_shared' not in values:
+            place = values.get('_field'), values.get('_pos')
+            if (old is not parent or place != (field, pos)) and _holds(
+                    old, place[0], place[1], node):
+                values['_shared'] = True
+        values['_parent'] = parent
+        values['_field'] = field
+        if pos is None:
+            values.pop('_pos', None)
+        else:
+            values['_pos'] = pos
+
+def _unlink(node, parent, field):
+    """Forget the parent of a node, unless it has since moved."""
+    if isinstance(node, AST):
+        values = node.__dict__
+        if values.get('_parent') is parent and values.get('_field') == field:
+            del values['_parent'], values['_field']
+            values.pop('_pos', None)
+
+def _link_value(value, parent, field, start=0):
+    if isinstance(value, list):
+        for pos in range(start, len(value)):
+            _link(value[pos], parent, field, pos)
+    else:
+        _link(value, parent, field)
+
+def _unlink_value(value, parent, field):
+    if isinstance(value, list):
+        for item in value:
+            _unlink(item, parent, field)
+    else:
+        _unlink(value, parent, field)
+
+def link(node):
+    """Give each node of a tree built without them its parent links."""
+    stack = [node] if isinstance(node, AST) else []
+    pop, push = stack.pop, stack.append
+    while stack:
+        parent = pop()
+        values = parent.__dict__
+        for name in parent._fields:
+            value = values.get(name)
+            if isinstance(value, list):
+                for pos, item in enumerate(value):
+                    if isinstance(item, AST) and (
+                            item._fields or item._attributes):
+                        fields = item.__dict__
+                        if '_parent' in fields:
+                            # Already placed, perhaps elsewhere too
+                            _link(item, parent, name, pos)
+                        else:
+                            fields['_parent'] = parent
+                            fields['_field'] = name
+                            fields['_pos'] = pos
+                        push(item)
+            elif isinstance(value, AST) and (
+                    value._fields or value._attributes):
+                fields = value.__dict__
+                if '_parent' in fields:
+                    _link(value, parent, name)
+                else:
+                    fields['_parent'] = parent
+                    fields['_field'] = name
+                    fields.pop('_pos', None)
+                push(value)
+    return node
+
+def _changed(node):
+    """Note that a node has changed, dropping source and hashes
+    cached up the tree.
+
+    What is cached above the other places of a shared node cannot be
+    reached from it, so changing it outdates everything cached before.
+    """
+    while node is not None:
+        fields = node.__dict__
+        if '_shared' in fields:
+            Node._shared_changes += 1
+        fields.pop('_rendered', None)
+        fields.pop('_hash', None)
+        fields.pop('_compiled', None)
+        node = fields.get('_parent')
+
+def _cached(fields, name):
+    """Return what is cached under name in the fields of a node,
+    or None if a shared node has changed since."""
+    cached = fields.get(name)
+    if cached is not None and cached[0] == Node._shared_changes:
+        return cached[1]
+    return None
+
 class Node:
+    """Base of all Astley nodes.
+
+    List fields are kept as NodeLists, so that editing them in place,
+    as well as setting a field, drops the source cached by rendering
+    for the node and its ancestors. Assigning a list stores a copy.
+
+    Each node knows its parent and where it is in it, kept as it is
+    placed or moved, so finding ancestors and siblings needs no walk.
+    """
     sym = ""
     _defaults = {}
+    # Changes to nodes used in more than one place so far
+    _shared_changes = 0
+
+    def __init_subclass__(cls, **kw):
+        super().__init_subclass__(**kw)
+        # Defaults are resolved as class attributes, without __getattr__
+        for name, value in cls.__dict__.get('_defaults', {}).items():
+            setattr(cls, name, _Default(name, value))
+        # Classes listing their ast class first would otherwise
+        # take the plain setters of AST, and not notice changes
+        if '__setattr__' not in cls.__dict__:
+            cls.__setattr__ = Node.__setattr__
+        if '__delattr__' not in cls.__dict__:
+            cls.__delattr__ = Node.__delattr__
+
+    @property
+    def _(self):
+        return _Face(self)
+
+    def _from_source(self, attr):
+        """Convert a field of a lazily modified node on first access."""
+        source = self.__dict__.get('_source')
+        if source is not None and (attr in DFIELDS or attr in source._fields):
+            if hasattr(source, attr):
+                value = convert(getattr(source, attr), lazy=True)
+                if type(value) is list:
+                    value = NodeList(self, value)
+                # Conversion is not a change, so skip __setattr__
+                self.__dict__[attr] = value
+                _link_value(value, self, attr)
+                return value
+        return MISSING
+
     def __getattr__(self, attr):
-        if attr in self._defaults:
-            return self._defaults[attr]
-        else:
+        value = self._from_source(attr)
+        if value is MISSING:
             raise AttributeError('{} has no attribute {!r}'.format(
                 type(self).__name__, attr
             ))
+        return value
 
     def __init__(self, *args, **kw):
-        self._ = _Face(self)
-        if not args or kw:
+        if not (args or kw):
             return
         if len(args) == 1 and isinstance(args[0], AST):
             node = args[0]
-            for n in DFIELDS + getattr(node, "_fields", ()):
+            for n in DFIELDS + tuple(getattr(node, "_fields", ())):
                 if hasattr(node, n):
-                    v = modify(getattr(node, n))
-                    if isinstance(v, list):
-                        v = list(map(modify, v))
-                    setattr(self, n, v)
+                    setattr(self, n, convert(getattr(node, n)))
 
         else:
             kwargs = dict()
@@ -136,47 +388,153 @@ class Node:
         return self.display(-1)
 
     def __eq__(self, other):
-        return (self._fields == other._fields
-            and all(getattr(self, i, None) == getattr(other, i, None)
-                 for i in self._fields))
+        if not isinstance(other, AST):
+            return NotImplemented
+        return _difference(self, other, True) is None
 
     def __ne__(self, other):
-        return not self == other
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+
+    def __hash__(self):
+        cached = _cached(self.__dict__, '_hash')
+        if cached is not None:
+            return cached
+        return structural_hash(self)
+
+    def __setattr__(self, name, value):
+        if name[0] != '_':
+            if type(value) is list or (
+                    type(value) is NodeList and value.owner is not self):
+                value = NodeList(self, value)
+            values = self.__dict__
+            old = values.get(name, MISSING)
+            if old is value:
+                # Transformers set every field, changed or not
+                return
+            _changed(self)
+            if old is not MISSING:
+                _unlink_value(old, self, name)
+            super().__setattr__(name, value)
+            _link_value(value, self, name)
+            index = values.get('_index')
+            if index is not None:
+                index._replace(self, name, old, value)
+            return
+        super().__setattr__(name, value)
+
+    def __delattr__(self, name):
+        if name[0] != '_':
+            _changed(self)
+            values = self.__dict__
+            old = values.get(name)
+            _unlink_value(old, self, name)
+            index = values.get('_index')
+            if index is not None:
+                index._replace(self, name, old, None)
+        super().__delattr__(name)
+
+    def __reduce_ex__(self, protocol):
+        # Links to the rest of the tree are made again on unpickling,
+        # rather than copying the tree above the node too
+        cls, args, state = super().__reduce_ex__(protocol)[:3]
+        return cls, args, {
+            k: v for k, v in state.items() if k not in _TREE_LINKS}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        for name in self._fields:
+            value = state.get(name)
+            if value is not None:
+                _link_value(value, self, name)
+
+    # Place in the tree
+
+    @property
+    def parent(self):
+        """The node this node is a field of, or None."""
+        return self.__dict__.get('_parent')
+
+    @property
+    def place(self):
+        """(field, index) of this node in its parent, index being
+        None unless the field is a list."""
+        values = self.__dict__
+        return values.get('_field'), values.get('_pos')
+
+    def ancestors(self):
+        """Yield the parents of this node, nearest first."""
+        node = self.__dict__.get('_parent')
+        while node is not None:
+            yield node
+            node = node.__dict__.get('_parent')
+
+    def sibling(self, offset=1):
+        """Return the node offset places along the list this node
+        is in, or None."""
+        values = self.__dict__
+        parent, pos = values.get('_parent'), values.get('_pos')
+        if parent is None or pos is None:
+            return None
+        items = parent.__dict__.get(values['_field'])
+        pos += offset
+        if items is None or not 0 <= pos < len(items):
+            return None
+        return items[pos]
 
     def as_python(self):
-        return finalise(self)._as_python()
+        return to_python(self)
+
+    def _as_python(self):
+        """Return source of node without finalising it."""
+        return CodeGenerator().render(self)
 
-    def _as_python(self, indent=1):
-        return self.sym.format(self=CodeDisplay(self))
+    def _write(self, w):
+        w.template(self, self.sym)
 
     def compile(self, filename=None):
         """Return compiled code version of node."""
         raise TypeError("Node is not a code segment.")
        
+    def _code(self, mode, traceback=True):
+        """Return compiled code of node, cached while it is unchanged."""
+        values = self.__dict__
+        compiled = _cached(values, '_compiled')
+        if compiled is not None and (mode, traceback) in compiled:
+            return compiled[mode, traceback]
+        # Equal nodes share code, but are only compared when this changes
+        key = mode, traceback, node_key(self)
+        code = code_cache.get(key)
+        if code is None:
+            if traceback:
+                # Only imported when needed, as it is slow to import
+                import tempfile
+                source = self.as_python()
+                tmp = tempfile.NamedTemporaryFile('w', delete=False, suffix='.py')
+                with tmp as f:
+                    f.write(source)
+                code = compile(source, f.name, mode)
+            else:
+                code = finalise(self).compile('<astley>')
+            # Kept as it was before finalising, as equal nodes will be
+            code_cache[key] = code
+        if compiled is None:
+            compiled = {}
+            values['_compiled'] = Node._shared_changes, compiled
+        compiled[mode, traceback] = code
+        return code
+
     def _result(self, func, globals=None, locals=None, traceback=True, **kw):
-        globals = globals or _globals()
-        locals = locals or dict()
+        if globals is None:
+            globals = _globals()
+        if locals is None:
+            locals = dict()
         locals.update(kw)
-        if traceback:
-            code = self.as_python()
-            node = parse(code)
-            tmp = tempfile.NamedTemporaryFile('w', delete=False, suffix='.py')
-            with tmp as f:
-                f.write(code)
-            try:
-                result = func(node.compile(f.name), globals, locals)
-            except Exception as e:
-                tb = e.__traceback__
-                # todo: erase Astley tracebacks
-                raise e
-            
-            os.remove(f.name)
-            
-            return result
-            
-        else:
-            return func(finalise(self).compile('<astley>'), globals, locals)
-    
+        is_expr = isinstance(self, (nodes.expr, nodes.Expression))
+        mode = "eval" if func is eval and is_expr else "exec"
+        # todo: erase Astley tracebacks
+        return func(self._code(mode, traceback), globals, locals)
+
     # TODO: allow for eval(1, 2, 3), auto-applying to un-kwarg'd names in alphabetical order
 
     def eval(self, globals=None, locals=None, traceback=True, **kw):
@@ -186,6 +544,10 @@ class Node:
         If traceback is True, a temporary file is created for more convenient
         traceback with pre-formatted code.
         Set this to false to increase speed.
+
+        Compiled code is kept on the node until it changes, and in
+        astley.cache.code_cache for equal nodes, so evaluating an
+        unchanged node again skips rendering and compiling it.
         """
         return self._result(eval, globals, locals, traceback, **kw)
 
@@ -196,19 +558,210 @@ class Node:
         self._result(exec, globals, locals, traceback, **kw)
 
 
-def modify(node):
+def _children(node):
+    for name in node._fields:
+        value = getattr(node, name, None)
+        if isinstance(value, AST):
+            yield value
+        elif isinstance(value, list):
+            for item in value:
+                if isinstance(item, AST):
+                    yield item
+
+def _field_hash(value, hashes):
+    if isinstance(value, AST):
+        return hashes[id(value)]
+    elif isinstance(value, (list, tuple)):
+        return hash(tuple(_field_hash(i, hashes) for i in value))
+    try:
+        return hash(value)
+    except TypeError:
+        return 0
+
+def structural_hash(node):
+    """Return a hash of node which is equal for equal nodes.
+
+    The hash of each Astley node in the tree is cached on it until
+    it or a node below it is changed, or until any node used in
+    more than one place is.
+    """
+    hashes = {}
+    stack = [node]
+    while stack:
+        top = stack[-1]
+        if id(top) in hashes:
+            stack.pop()
+            continue
+        pending = []
+        for child in _children(top):
+            if id(child) in hashes:
+                continue
+            cached = _cached_hash(child)
+            if cached is not None:
+                hashes[id(child)] = cached
+            else:
+                pending.append(child)
+        if pending:
+            stack.extend(pending)
+            continue
+        stack.pop()
+        # Operators are told apart by their class alone
+        value = hash((type(top), ) + tuple(
+            _field_hash(getattr(top, i, None), hashes) for i in top._fields))
+        hashes[id(top)] = value
+        if isinstance(top, Node):
+            top.__dict__['_hash'] = Node._shared_changes, value
+    return hashes[id(node)]
+
+def _cached_hash(node):
+    if isinstance(node, Node):
+        return _cached(node.__dict__, '_hash')
+    return None
+
+def first_difference(a, b):
+    """Return the path to where two trees first differ, or None if equal.
+
+    The path is a tuple of field names and list indices from the root,
+    such as ('body', 0, 'value'); it is empty if the roots differ.
+    """
+    return _difference(a, b, False)
+
+def _path(link):
+    path = []
+    while link:
+        link, key = link
+        path.append(key)
+    return tuple(reversed(path))
+
+def _difference(a, b, use_hash):
+    # Walked with a stack, so deep trees do not hit the recursion limit;
+    # paths are kept as (parent, key) links until one is returned
+    stack = [(None, a, b)]
+    while stack:
+        path, a, b = stack.pop()
+        if a is b:
+            continue
+        elif isinstance(a, AST) and isinstance(b, AST):
+            if type(a) is not type(b) or tuple(a._fields) != tuple(b._fields):
+                # Operators differ only by class, as in a + b and a - b
+                return _path(path)
+            if use_hash:
+                # Equal nodes always have equal hashes
+                ha, hb = _cached_hash(a), _cached_hash(b)
+                if ha is not None and hb is not None and ha != hb:
+                    return _path(path)
+            for name in reversed(a._fields):
+                stack.append((
+                    (path, name),
+                    getattr(a, name, None), getattr(b, name, None)))
+        elif isinstance(a, (list, tuple)) and isinstance(b, (list, tuple)):
+            if len(a) != len(b):
+                return _path(path)
+            for i in reversed(range(len(a))):
+                stack.append(((path, i), a[i], b[i]))
+        elif isinstance(a, AST) or isinstance(b, AST) or not a == b:
+            return _path(path)
+    return None
+
+def modify(node, lazy=False):
+    """Convert an ast node into its Astley equivalent.
+
+    If lazy is True, only the node itself is converted;
+    its fields are converted when first accessed.
+    """
     cls = node.__class__
     newcls = getattr(nodes, cls.__name__, None)
 
     if issubclass(cls, AST) and newcls:
         new = newcls()
-        Node.__init__(new, node)
+        if lazy:
+            new._source = node
+        else:
+            Node.__init__(new, node)
         return new
     else:
         return node
 
+def adopt(node):
+    """Convert an ast tree into Astley nodes in place.
+
+    Each node has its class swapped for its Astley equivalent,
+    so no second tree is built. The tree must not be used elsewhere.
+    Where the interpreter does not allow this, nodes are copied as in modify.
+    """
+    node = _adopt(node)
+    stack = [node]
+    while stack:
+        parent = stack.pop()
+        for name, value in vars(parent).items():
+            if name[0] == '_':
+                continue
+            elif isinstance(value, AST):
+                new = _adopt(value)
+                if new is value:
+                    stack.append(value)
+                else:
+                    # Conversion is not a change, so skip __setattr__
+                    vars(parent)[name] = new
+                if new._fields or new._attributes:
+                    fields = new.__dict__
+                    fields['_parent'] = parent
+                    fields['_field'] = name
+            elif isinstance(value, list):
+                for i, item in enumerate(value):
+                    if isinstance(item, AST):
+                        new = _adopt(item)
+                        if new is item:
+                            stack.append(item)
+                        else:
+                            value[i] = new
+                        if new._fields or new._attributes:
+                            fields = new.__dict__
+                            fields['_parent'] = parent
+                            fields['_field'] = name
+                            fields['_pos'] = i
+                if isinstance(parent, Node) and type(value) is list:
+                    vars(parent)[name] = NodeList(parent, value)
+    return node
+
+# Links to the tree and what is cached from it, which are not pickled;
+# hashes also depend on the classes of this process
+_TREE_LINKS = frozenset((
+    '_parent', '_field', '_pos', '_shared', '_index',
+    '_rendered', '_hash', '_compiled'))
+
+_kinds = {}
+
+def _adopt(node):
+    cls = node.__class__
+    newcls = getattr(nodes, cls.__name__, None)
+
+    if newcls is None or newcls is cls or not issubclass(newcls, cls):
+        return node
+    elif not (cls._fields or cls._attributes):
+        # Operators and contexts may be shared by every tree,
+        # so swap them for a shared Astley instance instead.
+        if cls not in _kinds:
+            _kinds[cls] = newcls()
+        return _kinds[cls]
+
+    try:
+        node.__class__ = newcls
+    except TypeError:
+        # Layout differs from the ast class on this interpreter
+        return modify(node)
+    return node
+
+def convert(value, lazy=False):
+    """Modify a field value, which may be a list of nodes."""
+    if isinstance(value, list):
+        return [modify(i, lazy) for i in value]
+    return modify(value, lazy)
+
 # Name mangling (interdependant functions)
 
 from . import nodes
 from .finalise import finalise
+from .codegen import CodeGenerator, to_python
+from .cache import code_cache, node_key
 from .nodes.expressions import Attribute
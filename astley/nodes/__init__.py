@@ -17,10 +17,8 @@ class Expression(_ast.Expression, BaseNode):
         return compile(finalise(self), filename, 'eval')
 
 class Module(_ast.Module, BaseNode):
-    def _as_python(self, index=0):
-        return '\n'.join(
-            '   ' * index + stmt.as_python()
-            for stmt in self.body)
+    def _write(self, w):
+        w.statements(self.body)
     def compile(self, filename='<unknown>'):
         return compile(finalise(self), filename, 'exec')
 
@@ -34,13 +32,21 @@ class expr_context(_ast.expr_context, kind):
     '''Method of evaluating an expression.'''
 
 
-for i in 'Load Store Del_ AugLoad AugStore Param'.split():
-    exec("""
-class {0}(_ast.{0}, expr_context): pass
-{1} = {0}()
-""".format(i.replace('_', ''), i.lower()))
+class Load(_ast.Load, expr_context): pass
+class Store(_ast.Store, expr_context): pass
+class Del(_ast.Del, expr_context): pass
 
-del i, _ast
+load, store, del_ = Load(), Store(), Del()
+
+if hasattr(_ast, 'AugLoad'):
+    # Removed in Python 3.9
+    class AugLoad(_ast.AugLoad, expr_context): pass
+    class AugStore(_ast.AugStore, expr_context): pass
+    class Param(_ast.Param, expr_context): pass
+
+    augload, augstore, param = AugLoad(), AugStore(), Param()
+
+del _ast
 
 from .datanodes import *
 from .expressions import *
@@ -12,12 +12,9 @@ class keyword(_ast.keyword, Datanode):
     """Keyword used in a Call."""
     _fields = 'arg value'.split()
     _defaults = {'arg': None}
-    def _as_python(self):
-        val = self.value.as_python()
-        if self.arg:
-            return "{}={}".format(self.arg, val)
-        else:
-            return "**{}".format(val)
+    def _write(self, w):
+        w.write(self.arg + "=" if self.arg else "**")
+        w.visit(self.value)
 
 class Alias(Datanode):
     pass
@@ -26,53 +23,52 @@ class alias(_ast.alias, Alias):
     """Aliases in an import"""
     _fields = "name asname".split()
     _defaults = {"asname": None}
-    def _as_python(self):
+    def _write(self, w):
+        w.write(self.name)
         if self.asname:
-            return self.name + " as " + self.asname
-        else:
-            return self.name
+            w.write(" as " + self.asname)
 
 class withitem(_ast.withitem, Alias):
     """Aliases in a With block"""
     _fields = "context_expr optional_vars".split()
     _defaults = {"optional_vars": None}
-    def _as_python(self):
-        expr = self.context_expr.as_python()
-        alias = self.optional_vars
-        if alias:
-            return expr + " as " + alias.as_python()
-        else:
-            return expr
+    def _write(self, w):
+        w.visit(self.context_expr)
+        if self.optional_vars:
+            w.write(" as ")
+            w.visit(self.optional_vars)
 
 class FormattedValue(_ast.FormattedValue, Datanode):
     """String and formatting used in f-string"""
-    _fields = 'value format_spec'.split()
-    _defaults = {'format_spec': ''}
-    def _as_python(self):
-        value = self.value.as_python()
-        fmt = self.format_spec
-        if fmt:
+    _fields = 'value conversion format_spec'.split()
+    _defaults = {'conversion': -1, 'format_spec': None}
+    def _write(self, w):
+        w.write("{")
+        value = w.render(self.value)
+        if value.startswith("{"):
+            w.write(" ")
+        w.write(value)
+        if self.conversion != -1:
+            w.write("!" + chr(self.conversion))
+        if self.format_spec:
             # Formats are also f-strings
-            print(fmt)
-            value += ":" + fmt.as_python()[2:-1]
-        return "{" + value + "}"
+            w.write(":" + self.format_spec.fstring_body(w))
+        w.write("}")
 
 class comprehension(_ast.comprehension, Datanode):
     """Iterator and targets in comprehenson expressions"""
     _fields = 'target iter ifs is_async'.split()
     _defaults = {'ifs': [], 'is_async': False}
-    def _as_python(self):
-        text = "for {} in {}".format(
-            self.target.as_python(),
-            self.iter.as_python()
-        )
+    def _write(self, w):
         if self.is_async:
-            text = 'async ' + text
-        if self.ifs:
-            text += ' ' + ' '.join(
-                'if ' + a.as_python() for a in self.ifs
-            )
-        return text
+            w.write("async ")
+        w.write("for ")
+        w.visit(self.target)
+        w.write(" in ")
+        w.visit(self.iter)
+        for i in self.ifs:
+            w.write(" if ")
+            w.parens(i, isinstance(i, (_ast.IfExp, _ast.Lambda)))
 
 class SliceKind(Datanode):
     pass
@@ -81,10 +77,17 @@ class Index(_ast.Index, SliceKind):
     sym = "{self.value}"
 
 class Slice(_ast.Slice, SliceKind):
-    sym = "{self.lower}:{self.upper}{self._step}"
-    @property
-    def _step(self):
-        print(self, self.step)
+    _defaults = {'lower': None, 'upper': None, 'step': None}
+    def _write(self, w):
+        w.field(self.lower)
+        w.write(":")
+        w.field(self.upper)
         if self.step is not None:
-            return ':' + self.step.as_python()
-        return ''
+            w.write(":")
+            w.visit(self.step)
+
+class ExtSlice(_ast.ExtSlice, SliceKind):
+    def _write(self, w):
+        w.join(self.dims)
+        if len(self.dims) == 1:
+            w.write(",")
@@ -3,13 +3,14 @@
 # pylint: disable=E0102
 # E0102: repetition of new in op_modifier
 
+import re
 import _ast
 from ast import copy_location
 from sys import version_info
 
 from . import Node, function_kind, Expression, load, store
 from .datanodes import keyword
-from .signature import arguments
+from .signature import arguments, arg
 
 __all__ = '''\
 expr Expr Name NameS Constant JoinedStr NamedExpr \
@@ -22,9 +23,28 @@ Comprehension GeneratorExp ListComp DictComp SetComp
 class expr(Node):
     '''Expression node - subclasses may be eval'd'''
     def compile(self, filename='<unknown>'):
-        expr = copy_location(Expression(body=self), self)
+        expr = copy_location(Expression(), self)
+        # The wrapper does not take the expression from its parent
+        vars(expr)['body'] = self
         return expr.compile(filename)
 
+    def to_function(self, *argnames, globals=None, traceback=False):
+        '''Return a function of argnames which returns this expression.
+
+        It is compiled once, so calling it costs as much as any function.
+        Other names are looked up in globals. If traceback is True, the
+        source is written to a temporary file as in eval.
+        >>> f = (x ** 2 + y).to_function('x', 'y')
+        >>> f(3, 1)
+        10
+        '''
+        # A copy is wrapped, so that the expression keeps its parent
+        # and is not finalised
+        function = Lambda(
+            args=arguments(args=[arg(name) for name in argnames]),
+            body=type(self)(self))
+        return function.eval({} if globals is None else globals, traceback=traceback)
+
     def __call__(self, *args, **kwargs):
         return Call(
             self, list(args),
@@ -35,10 +55,13 @@ class expr(Node):
 
 from . import ops
 
-def op_modifier(op_kind, op):
+def op_modifier(op_kind, op, reflected=False):
     if op_kind == 'cmpop':
         def new(self, other):
             return ops.Compare(self, [op()], [other])
+    elif op_kind == 'operator' and reflected:
+        def new(self, other):
+            return ops.BinOp(other, op(), self)
     elif op_kind == 'operator':
         def new(self, other):
             return ops.BinOp(self, op(), other)
@@ -54,7 +77,8 @@ for op_kind, operators in ops.operators.items():
 
     for node_name, sym, *rest in operators:
         if rest:
-            fname = rest[0].replace('eq', 'equate').replace('ne', 'nequate')
+            fname = {'__eq__': '__equate__', '__ne__': '__nequate__'}.get(
+                rest[0], rest[0])
             # to avoid ambiguity, making a node of comparison is handled as
             # x ._== y and x ._!= y.
 
@@ -67,7 +91,7 @@ for op_kind, operators in ops.operators.items():
             if op_kind == 'operator':
                 # BinOps have reversible dundermethods
                 rname = fname.replace('__', '__r', 1)
-                setattr(expr, rname, method)
+                setattr(expr, rname, op_modifier(op_kind, op, True))
 
 class Expr(expr, _ast.Expr):
     '''Expression that may be used in a Module'''
@@ -81,6 +105,8 @@ class Name(expr, _ast.Name):
 class NameS(Name):
     _defaults = {'ctx': store}
 
+_escapes = re.compile(r'\\.|.', re.DOTALL)
+
 def string_format(string, sep="'"):
     """repr(str) with your choice of separator.
     No guarantees it will work beyond internal usage.
@@ -89,28 +115,32 @@ def string_format(string, sep="'"):
         raise ValueError('Invalid separator.')
 
     is_bytes = isinstance(string, bytes)
+    quote = sep[0]
 
     old_sep, *as_repr = repr(string)[int(is_bytes):-1]
-    as_repr = ''.join(as_repr)
-
-    if old_sep != sep:
-        as_repr = as_repr.replace('\\' + old_sep, old_sep).replace(sep, '\\' + sep)
-        if sep in ('"""', "'''"):
-            as_repr = as_repr.replace('\\n', '\n')
+    text = []
+    for char in _escapes.findall(''.join(as_repr)):
+        if char == '\\' + old_sep:
+            char = old_sep
+        if char == quote:
+            char = '\\' + quote
+        elif char == '\\n' and len(sep) == 3:
+            char = '\n'
+        text.append(char)
 
-    return 'b' * is_bytes + sep + as_repr + sep
+    return 'b' * is_bytes + sep + ''.join(text) + sep
 
 
 class Constant(expr, _ast.Constant):
     '''Constant value: number, ellipsis, string or bytes. Used in 3.8+.'''
     __fields__ = ('value', )
-    def _as_python(self):
+    def _write(self, w):
         if isinstance(self.value, (str, bytes)):
-            return string_format(self.value, '"')
-        elif self.value is None:
-            return 'None'
+            w.write(string_format(self.value, '"'))
+        elif self.value is ...:
+            w.write('...')
         else:
-            return repr(self.value)
+            w.write(repr(self.value))
 
 # In 3.8, a lot of constants are merged.
 # TODO: This is really a hotfix.
@@ -126,8 +156,7 @@ if version_info >= (3, 8):
 
     class Ellipsis(Constant):
         '''Ellipsis literal. Useful in 3rd party packages such as numpy. Alias for Constant.'''
-        def _as_python(self):
-            return '...'
+        _defaults = {'value': ...}
 
     class Num(Constant):
         '''Numerical literal of type int, float or complex. Alias for Constant.'''
@@ -139,15 +168,14 @@ if version_info >= (3, 8):
         '''Bytes literal. Alias for Constant.'''
 
 else:
-    class NamedExpr(expr, _ast.NamedExpr):
+    class NamedExpr(expr):
         '''Expression with an assignment, `x := y`.'''
-        def _as_python(self):
+        def _write(self, w):
             raise NotImplementedError('This only works in Python 3.8.')
 
     class NameConstant(expr, _ast.NameConstant):
         '''Keyword literal: True, False, None. Subsumed into Constant after 3.8.'''
-        def _as_python(self):
-            return str(self.value)
+        sym = '{self.value}'
 
     class Ellipsis(expr, _ast.Ellipsis):
         sym = '...'
@@ -158,45 +186,107 @@ else:
 
     class Str(expr, _ast.Str):
         __fields__ = ('s', )
-        def _as_python(self):
-            return string_format(self.s, sep='"')
+        def _write(self, w):
+            w.write(string_format(self.s, sep='"'))
 
     class Bytes(expr, _ast.Bytes):
         __fields__ = ('s', )
-        def _as_python(self):
-            return string_format(self.s, sep='"')
+        def _write(self, w):
+            w.write(string_format(self.s, sep='"'))
 
 
 class JoinedStr(expr, _ast.JoinedStr):
-    def _as_python(self):
+    def fstring_body(self, w, parts=None):
+        '''Contents of the f-string, as written between its quotes.
+
+        The source of each expression is also added to parts, if given.
+        '''
         body = ''
         for i in self.values:
             if isinstance(i, Str):
-                body += i.s
+                text = i.s
             elif isinstance(i, Constant) and isinstance(i.value, str):
-                body += i.value
+                text = i.value
             else:
-                body += i._as_python()
-        return 'f' + repr(body)
+                part = w.render(i)
+                if parts is not None:
+                    parts.append(part)
+                body += part
+                continue
+            body += text.replace('{', '{{').replace('}', '}}')
+        return body
+
+    def format_body(self, args):
+        '''Contents of the f-string as a str.format string,
+        adding the expressions it formats to args.'''
+        body = ''
+        for i in self.values:
+            if isinstance(i, _ast.FormattedValue):
+                args.append(i.value)
+                body += '{'
+                if i.conversion != -1:
+                    body += '!' + chr(i.conversion)
+                if i.format_spec:
+                    body += ':' + i.format_spec.format_body(args)
+                body += '}'
+                continue
+            text = i.s if isinstance(i, Str) else i.value
+            body += text.replace('{', '{{').replace('}', '}}')
+        return body
+
+    def _write(self, w):
+        parts = []
+        body = self.fstring_body(w, parts)
+        quote = '"' if "'" in body and '"' not in body else "'"
+        if not any('\\' in i or '\n' in i or quote in i for i in parts):
+            w.write('f' + repr(body))
+            return
+        # Expressions in f-strings cannot hold backslashes or their
+        # quote, so these are written as a call to str.format instead
+        args = []
+        w.write(repr(self.format_body(args)) + '.format(')
+        w.join(args)
+        w.write(')')
 
 class Subscript(expr, _ast.Subscript):
     _fields = 'value slice ctx'.split()
     _defaults = {'ctx': load}
-
-    sym = '{self.value}[{self.slice}]'
+    def _write(self, w):
+        w.parens(self.value, needs_parentheses(self.value))
+        w.write('[')
+        w.visit(self.slice)
+        w.write(']')
 class Attribute(expr, _ast.Attribute):
-    sym = '{self.value}.{self.attr}'
+    _defaults = {'ctx': load}
+    def _write(self, w):
+        value = self.value
+        # 1.real would be read as a float
+        w.parens(value, needs_parentheses(value) or (
+            isinstance(value, _ast.Constant) and type(value.value) is int))
+        w.write('.' + self.attr)
 class Call(expr, _ast.Call):
     _defaults = {'keywords': [], 'args': []}
-    def _as_python(self):
-        return '{}({})'.format(
-            self.func._as_python(), ', '.join(
-                i._as_python() for i in self.args + self.keywords))
+    def _write(self, w):
+        w.parens(self.func, needs_parentheses(self.func))
+        w.write('(')
+        w.join(self.args + self.keywords)
+        w.write(')')
 
 class IfExp(expr, _ast.IfExp):
-    sym = '{self.body} if {self.test} else {self.orelse}'
+    def _write(self, w):
+        w.parens(self.body, isinstance(self.body, (IfExp, Lambda)))
+        w.write(' if ')
+        w.parens(self.test, isinstance(self.test, (IfExp, Lambda)))
+        w.write(' else ')
+        w.parens(self.orelse, isinstance(self.orelse, Lambda))
 class Lambda(function_kind, expr, _ast.Lambda):
-    sym = 'lambda {self.args}: {self.body}'
+    def _write(self, w):
+        w.write('lambda')
+        args = w.render(self.args)
+        if args:
+            w.write(' ' + args)
+        w.write(': ')
+        w.parens(self.body, isinstance(self.body, (_ast.Yield, _ast.YieldFrom)))
 
     @classmethod
     def from_function(cls, func=None, body=None):
@@ -205,47 +295,73 @@ class Lambda(function_kind, expr, _ast.Lambda):
 # Iterables
 
 class Iterable(expr):
-    @property
-    def _elts(self):
-        e = ', '.join(i._as_python() for i in self.elts)
-        print(self, self.elts, e)
-        return e
+    brackets = '[]'
+    def _write(self, w):
+        w.write(self.brackets[0])
+        w.join(self.elts)
+        w.write(self.brackets[1])
 
 class List(Iterable, _ast.List):
-    sym = '[{self._elts}]'
+    _defaults = {'ctx': load}
 class Tuple(Iterable, _ast.Tuple):
     _defaults = {'ctx': load}
-    def _as_python(self):
-        elts = self.elts
-        if len(elts) == 0:
-            return '()'
-        elif len(elts) == 1:
-            return '({}, )'.format(elts[0]._as_python())
+    brackets = '()'
+    def _write(self, w):
+        if len(self.elts) == 1:
+            w.write('(')
+            w.visit(self.elts[0])
+            w.write(', )')
         else:
-            return '({})'.format(self._elts)
+            Iterable._write(self, w)
 class Dict(Iterable, _ast.Dict):
-    def _as_python(self):
-        return '{{{}}}'.format(', '.join(
-            k._as_python() + ': ' + v._as_python()
-            for k, v in zip(self.keys, self.values)))
+    def _write(self, w):
+        w.write('{')
+        for i, (k, v) in enumerate(zip(self.keys, self.values)):
+            if i:
+                w.write(', ')
+            if k is None:
+                w.write('**')
+            else:
+                w.visit(k)
+                w.write(': ')
+            w.visit(v)
+        w.write('}')
 class Set(Iterable, _ast.Set):
-    def _as_python(self):
+    brackets = '{}'
+    def _write(self, w):
         if self.elts:
-            return '{{{}}}'.format(self._elts)
+            Iterable._write(self, w)
         else:
-            return 'set()'
+            w.write('set()')
 
 class Comprehension(expr):
     '''Iterable comprehension'''
-    sym = '{self.elt} {self.elements}'
-    elements = property(lambda s: ' '.join(
-        i._as_python() for i in s.generators))
+    brackets = '()'
+    def _write(self, w):
+        w.write(self.brackets[0])
+        if isinstance(self, DictComp):
+            w.visit(self.key)
+            w.write(': ')
+            w.visit(self.value)
+        else:
+            w.visit(self.elt)
+        for i in self.generators:
+            w.write(' ')
+            w.visit(i)
+        w.write(self.brackets[1])
 
 class GeneratorExp(Comprehension, _ast.GeneratorExp):
-    sym = '({self.elt} {self.elements})'
+    pass
 class SetComp(Comprehension, _ast.SetComp):
-    sym = '{{{self.elt} {self.elements}}}'
+    brackets = '{}'
 class ListComp(Comprehension, _ast.ListComp):
-    sym = '[{self.elt} {self.elements}]'
+    brackets = '[]'
 class DictComp(Comprehension, _ast.DictComp):
-    sym = '{{{self.key}: {self.value} {self.elements}}}'
+    brackets = '{}'
+
+def needs_parentheses(node):
+    '''Whether a node must be bracketed to be used as an operand.'''
+    # Folding may leave a negative number where a name was, as in (-1)[x]
+    return isinstance(node, (
+        ops.OpApplier, IfExp, Lambda, NamedExpr, _ast.Yield, _ast.YieldFrom)
+    ) or ops._signed(node)
@@ -2,7 +2,7 @@
 
 import _ast
 
-from . import kind
+from . import Node, kind
 from .expressions import expr
 
 __all__ = [
@@ -13,8 +13,8 @@ __all__ = [
 
 class OpKind(kind):
     """Operator kind."""
-    def _as_python(self):
-        return self.symbol
+    def _write(self, w):
+        w.write(self.symbol)
 
 class boolop(_ast.boolop, OpKind):
     def __new__(cls, values=None):
@@ -86,15 +86,45 @@ operators = dict(
     )
 )
 
+class Or(_ast.Or, boolop): symbol = 'or'
+class And(_ast.And, boolop): symbol = 'and'
+
+class BitOr(_ast.BitOr, operator): symbol = '|'
+class BitXor(_ast.BitXor, operator): symbol = '^'
+class BitAnd(_ast.BitAnd, operator): symbol = '&'
+class LShift(_ast.LShift, operator): symbol = '<<'
+class RShift(_ast.RShift, operator): symbol = '>>'
+class Add(_ast.Add, operator): symbol = '+'
+class Sub(_ast.Sub, operator): symbol = '-'
+class Mult(_ast.Mult, operator): symbol = '*'
+class MatMult(_ast.MatMult, operator): symbol = '@'
+class Div(_ast.Div, operator): symbol = '/'
+class FloorDiv(_ast.FloorDiv, operator): symbol = '//'
+class Mod(_ast.Mod, operator): symbol = '%'
+class Pow(_ast.Pow, operator): symbol = '**'
+
+class In(_ast.In, cmpop): symbol = 'in'
+class NotIn(_ast.NotIn, cmpop): symbol = 'not in'
+class Is(_ast.Is, cmpop): symbol = 'is'
+class IsNot(_ast.IsNot, cmpop): symbol = 'is not'
+class Lt(_ast.Lt, cmpop): symbol = '<'
+class LtE(_ast.LtE, cmpop): symbol = '<='
+class Gt(_ast.Gt, cmpop): symbol = '>'
+class GtE(_ast.GtE, cmpop): symbol = '>='
+class NotEq(_ast.NotEq, cmpop): symbol = '!='
+class Eq(_ast.Eq, cmpop): symbol = '=='
+
+class Not(_ast.Not, unaryop): symbol = 'not '
+class Invert(_ast.Invert, unaryop): symbol = '~'
+class UAdd(_ast.UAdd, unaryop): symbol = '+'
+class USub(_ast.USub, unaryop): symbol = '-'
+
 precedence = {}
 
 for op_kind, ops in operators.items():
     for node_name, symbol, *r in ops:
         if len(r) == 2:
             precedence[node_name] = r[1]
-
-        exec('class {0}(_ast.{0}, {2}): symbol = "{1}"'.format(
-             node_name, symbol, op_kind), globals())
         __all__.append(node_name)
 
 
@@ -103,56 +133,77 @@ class OpApplier(expr):
     pass
 
 requires_parentheses = (
-    _ast.IfExp, _ast.Lambda, _ast.GeneratorExp
+    _ast.IfExp, _ast.Lambda,
+    _ast.BoolOp, _ast.Compare, _ast.Yield, _ast.YieldFrom,
 )
 
+def _signed(node):
+    '''Whether a node is a number written with a leading minus.'''
+    return (isinstance(node, _ast.Constant)
+            and type(node.value) in (int, float) and repr(node.value)[0] == '-')
+
 class BinOp(OpApplier, _ast.BinOp):
     '''Binary infix operator (+, -, and, etc) '''
-    def _as_python(self):
+    def _write(self, w):
         # Add brackets to ensure cases such as '(a + b) * c'
         # are represented correctly
         pm = precedence[self.op.__class__.__name__]
+        right_assoc = isinstance(self.op, _ast.Pow)
 
-        def name(node):
-            name = node.as_python()
+        def name(node, is_right):
             if isinstance(node, _ast.BinOp):
                 pinner = precedence[node.op.__class__.__name__]
-                if pm > pinner:
-                    return '(' + name + ')'
-            elif isinstance(node, requires_parentheses):
-                return '(' + name + ')'
-
-            return name
-
-        return "{} {} {}".format(
-            name(self.left), self.op.symbol, name(self.right))
+                # a - (b - c), but (a ** b) ** c
+                wrap = pm > pinner or (
+                    pm == pinner and is_right != right_assoc)
+            elif isinstance(node, _ast.UnaryOp) or _signed(node):
+                # (-a) ** b, as -a ** b is -(a ** b)
+                wrap = right_assoc and not is_right or isinstance(
+                    getattr(node, 'op', None), _ast.Not)
+            else:
+                wrap = isinstance(node, requires_parentheses)
+            w.parens(node, wrap)
+
+        name(self.left, False)
+        w.write(" " + self.op.symbol + " ")
+        name(self.right, True)
 
 class BoolOp(OpApplier, _ast.BoolOp):
     '''Binary infix operator that works on booleans (and, or)'''
-    def _as_python(self):
-        values = [i.as_python() for i in self.values]
-        # try to map 'A and (B or C)' nicely
-        if isinstance(self.op, _ast.Or):
-            for i, v in enumerate(self.values):
-                if isinstance(v, _ast.BinOp) and isinstance(v.op, _ast.And):
-                    self.values[i] = '(' + values[i] + ')'
-
-        return (' ' + self.op.symbol + ' ').join(
-            i.as_python() for i in self.values)
+    def _write(self, w):
+        # map 'A and (B or C)' nicely
+        for i, v in enumerate(self.values):
+            if i:
+                w.write(" " + self.op.symbol + " ")
+            w.parens(v, isinstance(v, (_ast.BoolOp, _ast.IfExp, _ast.Lambda)))
 
 class UnaryOp(OpApplier, _ast.UnaryOp):
     '''Unary prefix operator.'''
-    sym = "{self.op}{self.operand}"
+    def _write(self, w):
+        w.visit(self.op)
+        v = self.operand
+        if isinstance(self.op, _ast.Not):
+            wrap = isinstance(v, (_ast.BoolOp, _ast.IfExp, _ast.Lambda))
+        elif isinstance(v, _ast.BinOp):
+            wrap = not isinstance(v.op, _ast.Pow)
+        elif _signed(v):
+            wrap = True
+        else:
+            wrap = isinstance(v, requires_parentheses)
+        w.parens(v, wrap)
 
 class Compare(OpApplier, _ast.Compare):
     '''Chain of comparators.'''
     _fields = 'left ops comparators'.split()
-    def _as_python(self):
-        chain = [self.left.as_python()]
+    def _write(self, w):
+        def name(node):
+            w.parens(node, isinstance(node, requires_parentheses) or (
+                isinstance(node, _ast.UnaryOp) and isinstance(node.op, _ast.Not)))
+
+        name(self.left)
         for o, c in zip(self.ops, self.comparators):
-            chain.append(o.symbol)
-            chain.append(c.as_python())
-        return ' '.join(chain)
+            w.write(" " + o.symbol + " ")
+            name(c)
 
     def _op(self, other, operator):
         self.ops.append(operator)
@@ -161,6 +212,7 @@ class Compare(OpApplier, _ast.Compare):
 
     __eq__ = lambda s, o: s._op(o, Eq)
     __ne__ = lambda s, o: s._op(o, NotEq)
+    # Building comparisons with == leaves Compare unhashable
     __lt__ = lambda s, o: s._op(o, Lt)
     __le__ = lambda s, o: s._op(o, LtE)
     __gt__ = lambda s, o: s._op(o, Gt)
@@ -15,57 +15,65 @@ class arg(_ast.arg, Datanode):
 class arguments(_ast.arguments, Datanode):
     """Function argument signature"""
 
-    _fields = "args defaults vararg kwonlyargs kw_defaults kwarg".split()
     _defaults = dict(
-        args=[], defaults=[], vararg=None,
+        posonlyargs=[], args=[], defaults=[], vararg=None,
         kwonlyargs=[], kw_defaults=[], kwarg=None
     )
 
-    def _as_python(self):
-        n_required = len(self.args) - len(self.defaults)
-        words = []
+    def _write(self, w):
+        posonlyargs = getattr(self, 'posonlyargs', [])
+        positional = posonlyargs + self.args
+        n_required = len(positional) - len(self.defaults)
+        first = True
 
-        def argify(variables, defaults, is_kwargs_only):
-            for n, arg in enumerate(variables):
-
-                defa = None
-                if is_kwargs_only:
-                    defa = defaults[n]
-                elif defaults:
-                    # __defaults__ applies to the tail of the variables
-                    dindex = n - n_required
-                    if dindex >= 0:
-                        defa = defaults[dindex]
-
-                if isinstance(defa, Node):
-                    defa = defa.as_python()
+        def sep():
+            nonlocal first
+            if not first:
+                w.write(', ')
+            first = False
 
-                word = arg.arg
-                ann = arg.annotation
-
-                if ann is not None:
-                    word += ': {}'.format(ann.as_python())
-                    if defa is not None:
-                        word += ' = ' + defa
-                else:
+        def argify(variables, defaults, offset):
+            for n, arg in enumerate(variables):
+                # __defaults__ applies to the tail of the variables
+                dindex = n + offset
+                defa = defaults[dindex] if 0 <= dindex < len(defaults) else None
+
+                sep()
+                w.write(arg.arg)
+                if arg.annotation is not None:
+                    w.write(': ')
+                    w.visit(arg.annotation)
                     if defa is not None:
-                        word += '=' + defa
-
-                words.append(word)
-
-        argify(self.args, self.defaults, False)
+                        w.write(' = ')
+                        w.field(defa)
+                elif defa is not None:
+                    w.write('=')
+                    w.field(defa)
+
+        argify(posonlyargs, self.defaults, -n_required)
+        if posonlyargs:
+            sep()
+            w.write('/')
+        argify(self.args, self.defaults, len(posonlyargs) - n_required)
 
         if self.vararg:
-            words.append('*' + self.vararg.arg)
+            sep()
+            w.write('*' + self.vararg.arg)
+            if self.vararg.annotation is not None:
+                w.write(': ')
+                w.visit(self.vararg.annotation)
         elif self.kwonlyargs:
-            words.append('*')
+            sep()
+            w.write('*')
 
-        argify(self.kwonlyargs, self.kw_defaults, True)
+        argify(self.kwonlyargs, self.kw_defaults, 0)
 
         if self.kwarg:
-            words.append('**' + self.kwarg.arg)
-
-        return ', '.join(words)
+            sep()
+            w.write('**' + self.kwarg.arg)
+            if self.kwarg.annotation is not None:
+                w.write(': ')
+                w.visit(self.kwarg.annotation)
 
     @classmethod
     def from_function(cls, f):
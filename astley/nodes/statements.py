@@ -5,7 +5,6 @@ import _ast
 from ..node import copy
 from ..finalise import finalise
 from . import Node, Module
-from .expressions import Str, Expr, string_format
 from .datanodes import Datanode
 from .signature import arguments
 
@@ -20,8 +19,8 @@ class AssignKind(stmt):
 
 class Assign(_ast.Assign, AssignKind):
     '''Assignment of value(s)'''
-    def _as_python(self):
-        return ' = '.join(i.as_python() for i in self.targets + [self.value])
+    def _write(self, w):
+        w.join(self.targets + [self.value], ' = ')
 
 class AugAssign(_ast.AugAssign, AssignKind):
     '''Augmented in-place assignment (eg +=)'''
@@ -29,43 +28,56 @@ class AugAssign(_ast.AugAssign, AssignKind):
 
 class AnnAssign(_ast.AnnAssign, AssignKind):
     '''Single-target type-annotated assignment'''
-    _fields = 'target annotation value'.split()
-    _defaults = {'value': None}
-    def _as_python(self):
-        tgt = self.target.as_python()
-        ann = self.annotation.as_python()
+    _defaults = {'value': None, 'simple': 1}
+    def _write(self, w):
+        w.parens(self.target, not self.simple)
+        w.write(': ')
+        w.visit(self.annotation)
         if self.value:
-            return '{}: {} = {}'.format(
-                tgt, ann, self.value.as_python())
-        return '{}: {}'.format(tgt, ann)
+            w.write(' = ')
+            w.visit(self.value)
 
 
 class Oneliner(stmt):
     '''Base class: One-line statement.'''
     _fields = 'value'.split()
+    _defaults = {'value': None}
+    def _write(self, w):
+        w.write(self.sym)
+        if self.value is not None:
+            w.write(' ')
+            w.visit(self.value)
 
 class Return(_ast.Return, Oneliner):
-    sym = 'return {self.value}'
-class Await(_ast.Yield, Oneliner):
-    sym = 'await {self.value}'
+    sym = 'return'
+class Await(_ast.Await, Oneliner):
+    sym = 'await'
 class Yield(_ast.Yield, Oneliner):
-    sym = 'yield {self.value}'
+    sym = 'yield'
 class YieldFrom(_ast.YieldFrom, Oneliner):
-    sym = 'yield from {self.value}'
+    sym = 'yield from'
 
 class Raise(_ast.Raise, Oneliner):
-    _fields = 'exc'.split()
-    sym = 'raise {self.exc}'
+    _defaults = {'exc': None, 'cause': None}
+    def _write(self, w):
+        w.write('raise')
+        if self.exc is not None:
+            w.write(' ')
+            w.visit(self.exc)
+        if self.cause is not None:
+            w.write(' from ')
+            w.visit(self.cause)
 
 class Delete(_ast.Delete, Oneliner):
     _fields = 'targets'.split()
-    def _as_python(self):
-        return 'del ' + ', '.join(i.as_python() for i in self.targets)
+    def _write(self, w):
+        w.write('del ')
+        w.join(self.targets)
 
 class VarContextStmt(Oneliner):
     _fields = 'names'.split()
-    def _as_python(self):
-        return self.sym + ' ' + ', '.join(self.names)
+    def _write(self, w):
+        w.write(self.sym + ' ' + ', '.join(self.names))
 
 class Global(_ast.Global, VarContextStmt):
     sym = 'global'
@@ -73,15 +85,18 @@ class Nonlocal(_ast.Nonlocal, VarContextStmt):
     sym = 'nonlocal'
 
 class Assert(_ast.Assert, Oneliner):
-    def _as_python(self):
-        code = 'assert ' + self.test.as_python()
+    _defaults = {'msg': None}
+    def _write(self, w):
+        w.write('assert ')
+        w.visit(self.test)
         if self.msg:
-            return code + ', ' + self.msg.as_python()
-        else:
-            return code
+            w.write(', ')
+            w.visit(self.msg)
 
 class Word(Oneliner):
     '''Base class: Single-word statements.'''
+    def _write(self, w):
+        w.write(self.sym)
 
 class Pass(_ast.Pass, Word):
     sym = 'pass'
@@ -92,17 +107,17 @@ class Break(_ast.Break, Word):
 
 class Import(_ast.Import, stmt):
     _fields = 'names'.split()
-    def _as_python(self):
-        return 'import {}'.format(
-            ', '.join(i.as_python() for i in self.names))
+    def _write(self, w):
+        w.write('import ')
+        w.join(self.names)
 
 class ImportFrom(_ast.ImportFrom, Import):
     _fields = 'module names level'.split()
     _defaults = {'level': 0}
-    def _as_python(self):
-        return 'from {}{} import {}'.format(
-            '.' * self.level, self.module or '',
-            ', '.join(i.as_python() for i in self.names))
+    def _write(self, w):
+        w.write('from {}{} import '.format(
+            '.' * (self.level or 0), self.module or ''))
+        w.join(self.names)
 
 class Block(stmt):
     pass
@@ -110,64 +125,57 @@ class Block(stmt):
 class AsyncBlock(Block):
     pass
 
-def _display(item, indent=0):
-    if isinstance(item, Block):
-        return item._as_python(indent)
-    else:
-        if isinstance(item, Node):
-            item = item.as_python()
-        return ' ' * 4 * indent + item
-
-def bodyfmt(body, indent=0):
-    if body and isinstance(body[0], Expr):
-        q = body[0].value
-        if isinstance(q, Str):
-            # Docstring
-            body[0] = string_format(q.s, '"""')
-    return '\n'.join(_display(i, indent) for i in body)
-
 class If(_ast.If, Block):
     _fields = 'test body orelse'.split()
     _defaults = {'orelse': []}
-    def _as_python(self, indent=0):
-        tab = ' ' * 4 * indent
-        body = tab + 'if {}:\n'.format(self.test.as_python())
-        body += bodyfmt(self.body, indent+1)
+    def _write(self, w):
+        w.write('if ')
+        w.visit(self.test)
+        w.write(':')
+        w.body(self.body)
 
         # `elif` is just an If(orelse=If()), so we must navigate a chain
         orelse = self.orelse
         while orelse:
-            body += '\n' + tab
+            w.newline()
             if len(orelse) == 1 and isinstance(orelse[0], _ast.If):
                 newif = orelse[0]
-                body += 'elif {}:\n'.format(newif.test.as_python())
-                body += bodyfmt(newif.body, indent+1)
+                w.write('elif ')
+                w.visit(newif.test)
+                w.write(':')
+                w.body(newif.body)
                 orelse = newif.orelse
             else:
-                body += 'else:\n' + bodyfmt(orelse, indent+1)
+                w.write('else:')
+                w.body(orelse)
                 orelse = None
-        return body
 
-class While(_ast.While, Block):
-    _fields = 'test body'.split()
-    def _as_python(self, indent=0):
-        body = ' ' * 4 * indent + 'while {}:\n'.format(self.test.as_python())
-        return body + bodyfmt(self.body, indent+1)
-
-class For(_ast.For, Block):
-    _fields = 'test body'.split()
+class Loop(Block):
+    '''Base class for blocks with an `else` clause.'''
     _defaults = {'orelse': []}
-    def _as_python(self, indent=0):
-        tab = ' ' * 4 * indent
-        body = tab + '{} {} in {}:\n'.format(
-            self.symbol,
-            self.target.as_python(),
-            self.iter.as_python())
-        body += bodyfmt(self.body, indent+1)
+    def _write_orelse(self, w):
         if self.orelse:
-            body += '\n' + tab + 'else:\n'
-            body += bodyfmt(self.orelse, indent+1)
-        return body
+            w.newline()
+            w.write('else:')
+            w.body(self.orelse)
+
+class While(_ast.While, Loop):
+    def _write(self, w):
+        w.write('while ')
+        w.visit(self.test)
+        w.write(':')
+        w.body(self.body)
+        self._write_orelse(w)
+
+class For(_ast.For, Loop):
+    def _write(self, w):
+        w.write(self.symbol + ' ')
+        w.visit(self.target)
+        w.write(' in ')
+        w.visit(self.iter)
+        w.write(':')
+        w.body(self.body)
+        self._write_orelse(w)
     symbol = 'for'
 
 class AsyncFor(_ast.AsyncFor, For, AsyncBlock):
@@ -175,16 +183,22 @@ class AsyncFor(_ast.AsyncFor, For, AsyncBlock):
 
 class With(_ast.With, Block):
     symbol = 'with'
-    def _as_python(self, indent=0):
-        tab = ' ' * 4 * indent
-        body = tab + 'with {}:\n'.format(', '.join(i.as_python() for i in self.items))
-        return body + bodyfmt(self.body, indent+1)
+    def _write(self, w):
+        w.write(self.symbol + ' ')
+        w.join(self.items)
+        w.write(':')
+        w.body(self.body)
 
 class AsyncWith(With, AsyncBlock, _ast.AsyncWith):
     symbol = 'async with'
 
 class Definition(Block):
     '''Class or function definition.'''
+    def _write_decorators(self, w):
+        for i in self.decorator_list:
+            w.write('@')
+            w.visit(i)
+            w.newline()
 
 class FunctionDef(_ast.FunctionDef, Definition):
     _fields = 'name args body decorator_list returns'.split()
@@ -214,56 +228,61 @@ class FunctionDef(_ast.FunctionDef, Definition):
             return cls(**kw)
         return wrapper
 
-    def _as_python(self, indent=0):
-        lines = ['@' + i.as_python() for i in self.decorator_list]
-
-        returns = ''
-        if hasattr(self, 'returns') and self.returns:
-            returns = ' -> ' + self.returns.as_python()
-
-        lines.append('{} {}({}){}:'.format(
-            self.symbol, self.name,
-            self.args.as_python(), returns))
-
-        return bodyfmt(lines, indent) + '\n' + bodyfmt(self.body, indent+1)
+    def _write(self, w):
+        self._write_decorators(w)
+        w.write('{} {}('.format(self.symbol, self.name))
+        w.visit(self.args)
+        w.write(')')
+        if getattr(self, 'returns', None):
+            w.write(' -> ')
+            w.visit(self.returns)
+        w.write(':')
+        w.body(self.body)
 
 class AsyncFunctionDef(_ast.AsyncFunctionDef, FunctionDef, AsyncBlock):
     symbol = 'async def'
 
 class ClassDef(_ast.ClassDef, Definition):
-    def _as_python(self, indent=0):
-        lines = ['@' + i.as_python() for i in self.decorator_list]
-
-        p = ', '.join(
-            i.as_python() for i in self.bases + self.keywords).strip()
-        if p:
-            p = '('+p+')'
-
-        lines.append('class {}{}:'.format(self.name, p))
-
-        return bodyfmt(lines, indent) + '\n' + bodyfmt(self.body, indent+1)
+    _defaults = dict(bases=[], keywords=[], decorator_list=[])
+    def _write(self, w):
+        self._write_decorators(w)
+        w.write('class ' + self.name)
+        if self.bases or self.keywords:
+            w.write('(')
+            w.join(self.bases + self.keywords)
+            w.write(')')
+        w.write(':')
+        w.body(self.body)
 
 class ExceptHandler(_ast.ExceptHandler, Datanode):
     '''Individual exception in a Try block.'''
+    _defaults = {'type': None, 'name': None}
+    def _write(self, w):
+        w.write('except')
+        if self.type:
+            w.write(' ')
+            w.visit(self.type)
+        if self.name:
+            w.write(' as ' + self.name)
+        w.write(':')
+        w.body(self.body)
 
 class Try(_ast.Try, Block):
     _fields = 'body handlers orelse finalbody'.split()
     _defaults = {'orelse': [], 'finalbody': []}
-    def _as_python(self, indent=0):
-        tab = ' ' * 4 * indent
-        body = tab + 'try:\n'
-        body += bodyfmt(self.body, indent+1)
+    def _write(self, w):
+        w.write('try:')
+        w.body(self.body)
 
         for exc in self.handlers:
-            body += '\n' + tab + 'except'
-            if exc.type:
-                body += ' ' + exc.type.as_python()
-            if exc.name:
-                body += ' as ' + exc.name
-            body += ':\n' + bodyfmt(exc.body, indent+1)
+            w.newline()
+            w.visit(exc)
 
         if self.orelse:
-            body += '\n' + tab + 'else:\n' + bodyfmt(self.orelse, indent+1)
+            w.newline()
+            w.write('else:')
+            w.body(self.orelse)
         if self.finalbody:
-            body += '\n' + tab + 'finally:\n' + bodyfmt(self.finalbody, indent+1)
-        return body
+            w.newline()
+            w.write('finally:')
+            w.body(self.finalbody)
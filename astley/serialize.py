@@ -0,0 +1,287 @@
+'''Astley: Compact binary serialization of node trees.
+
+A tree is stored as a table of the node kinds and constants it uses,
+such as names and strings, each kept once, then arrays of numbers:
+the nodes and lists in post-order, how many leaves come before each,
+the leaves themselves as indexes into the table, and positions.
+Each array is packed as the smallest unsigned integers that fit all
+its numbers, so it is read back at once rather than number by number.
+'''
+
+import gc
+import sys
+import marshal
+from io import BytesIO
+from array import array
+from _ast import AST
+
+__all__ = 'dumps loads dump load'.split()
+
+MAGIC = b'AST\x01'
+NODE, LIST = range(2)
+TYPECODES = 'BHIQ'
+
+
+def _const_key(value):
+    kind = type(value)
+    if kind is str or kind is int or kind is bool or kind is bytes:
+        return kind, value
+    # Keeps 0.0 apart from -0.0, and nan equal to itself
+    return kind, repr(value)
+
+
+def _encode(node, positions):
+    kinds, kind_ids = [], {}
+    consts, const_ids = [], {}
+    ops, counts, leaves, places = [], [], [], []
+    # Leaves written since the last node or list
+    pending = 0
+    # (value, state): state is None for a value not yet written,
+    # then NODE or LIST once the items of the value have been written
+    stack = [(node, None)]
+    pop, push = stack.pop, stack.append
+    while stack:
+        value, state = pop()
+        if state is NODE:
+            kid, place = value
+            ops.append(2 * kid)
+            counts.append(pending)
+            pending = 0
+            places.extend(place)
+        elif state is LIST:
+            ops.append(2 * value + 1)
+            counts.append(pending)
+            pending = 0
+        elif isinstance(value, AST):
+            names, lists, children = [], [], []
+            for name in value._fields:
+                child = getattr(value, name, places)
+                if child is places:
+                    continue
+                elif isinstance(child, list):
+                    lists.append(len(names))
+                names.append(name)
+                children.append(child)
+            attributes = ()
+            if positions:
+                attributes = tuple(
+                    name for name in value._attributes
+                    if _is_place(getattr(value, name, None)))
+            # Kinds are told apart by the fields they have, so that
+            # reading them back needs no checks for each field
+            key = (type(value).__name__, tuple(names), tuple(lists),
+                   attributes)
+            kid = kind_ids.get(key)
+            if kid is None:
+                kid = kind_ids[key] = len(kinds)
+                kinds.append(key)
+            if not (value._fields or value._attributes):
+                # Operators and contexts, such as Load, are leaves; each
+                # is read back as one shared node. Statements such as
+                # Pass are not, as each must keep its own parent link.
+                leaves.append(2 * kid + 1)
+                pending += 1
+                continue
+            push(((kid, [getattr(value, a) for a in attributes]), NODE))
+            for child in reversed(children):
+                push((child, None))
+        elif isinstance(value, list):
+            push((len(value), LIST))
+            for item in reversed(value):
+                push((item, None))
+        else:
+            key = _const_key(value)
+            cid = const_ids.get(key)
+            if cid is None:
+                cid = const_ids[key] = len(consts)
+                consts.append(value)
+            leaves.append(2 * cid)
+            pending += 1
+    counts.append(pending)
+    return kinds, consts, (ops, counts, leaves, places)
+
+
+def _is_place(value):
+    return type(value) is int and value >= 0
+
+
+def _pack(numbers):
+    top = max(numbers, default=0)
+    for typecode in TYPECODES:
+        packed = array(typecode)
+        if top < 1 << (8 * packed.itemsize):
+            break
+    packed.extend(numbers)
+    if sys.byteorder == 'big':
+        packed.byteswap()
+    return typecode.encode() + _varint(len(packed)) + packed.tobytes()
+
+
+def dumps(node, positions=True):
+    '''Return a node tree as bytes, with line and column positions
+    unless positions is False.'''
+    kinds, consts, arrays = _encode(node, positions)
+    table = marshal.dumps((tuple(kinds), tuple(consts)))
+    body = b''.join([_varint(len(table)), table] + list(map(_pack, arrays)))
+    return MAGIC + _varint(len(body)) + body
+
+
+def loads(data):
+    '''Return the node tree stored in bytes by dumps.'''
+    return load(BytesIO(data))
+
+
+def dump(node, file, positions=True):
+    '''Write a node tree to a binary file. Several may be written.'''
+    file.write(dumps(node, positions))
+
+
+def load(file):
+    '''Read the next node tree from a binary file, or raise EOFError.'''
+    magic = file.read(len(MAGIC))
+    if not magic:
+        raise EOFError('No more trees to load.')
+    elif magic != MAGIC:
+        raise ValueError('Not a serialized Astley tree.')
+    body = memoryview(file.read(_read_varint(file)))
+    size, i = _varint_at(body, 0)
+    kinds, consts = marshal.loads(body[i:i + size])
+    i += size
+    arrays = []
+    for _ in range(4):
+        numbers, i = _unpack(body, i)
+        arrays.append(numbers)
+    # Collecting while many nodes are made takes longer than making them
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return _build(kinds, consts, *arrays)
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def _unpack(data, i):
+    packed = array(chr(data[i]))
+    count, i = _varint_at(data, i + 1)
+    end = i + count * packed.itemsize
+    packed.frombytes(data[i:end])
+    if sys.byteorder == 'big':
+        packed.byteswap()
+    return packed.tolist(), end
+
+
+def _build(kinds, consts, ops, counts, leaves, places):
+    makers = [_maker(*kind) for kind in kinds]
+    # Even leaves are constants, and odd ones operators and contexts
+    table = [None] * (2 * max(len(consts), len(kinds)))
+    table[0:2 * len(consts):2] = consts
+    table[1:2 * len(kinds):2] = [
+        None if cls._fields or cls._attributes else cls()
+        for cls, *_ in makers]
+    values = list(map(table.__getitem__, leaves))
+
+    # Nodes which are linked to their parents as they are built,
+    # rather than walking the tree again once it is
+    linked = {
+        maker[0] for maker in makers
+        if maker[0]._fields or maker[0]._attributes}
+    new = AST.__new__
+    new_list = list.__new__
+    extend = list.extend
+    stack = []
+    push = stack.append
+    leaf = place = 0
+    for op, count in zip(ops, counts):
+        if count:
+            # Leaves are pushed together, rather than one at a time
+            stack += values[leaf:leaf + count]
+            leaf += count
+        if op & 1:
+            count = op >> 1
+            items = new_list(NodeList)
+            if count:
+                extend(items, stack[-count:])
+                del stack[-count:]
+            push(items)
+            continue
+        cls, names, count, lists, singles, width = makers[op >> 1]
+        node = new(cls)
+        if count:
+            items = stack[-count:]
+            del stack[-count:]
+            for i in singles:
+                item = items[i]
+                if type(item) in linked:
+                    fields = item.__dict__
+                    fields['_parent'] = node
+                    fields['_field'] = names[i]
+            for i in lists:
+                item = items[i]
+                item.owner = node
+                name = names[i]
+                for pos, child in enumerate(item):
+                    if type(child) in linked:
+                        fields = child.__dict__
+                        fields['_parent'] = node
+                        fields['_field'] = name
+                        fields['_pos'] = pos
+            if width:
+                items += places[place:place + width]
+                place += width
+        else:
+            items = places[place:place + width]
+            place += width
+        node.__dict__.update(zip(names, items))
+        push(node)
+    stack += values[leaf:]
+    if len(stack) != 1:
+        raise ValueError('Serialized tree is malformed.')
+    return stack[0]
+
+
+def _maker(name, names, lists, attributes):
+    cls = getattr(nodes, name, None)
+    if cls is None or not isinstance(cls, type) or not issubclass(cls, AST):
+        raise ValueError('Unknown node kind {!r}.'.format(name))
+    singles = tuple(i for i in range(len(names)) if i not in lists)
+    # Attributes are set with fields, from the positions that follow
+    return (cls, names + attributes, len(names), lists, singles,
+            len(attributes))
+
+
+def _varint(n):
+    out = bytearray()
+    while n >= 0x80:
+        out.append(n & 0x7f | 0x80)
+        n >>= 7
+    out.append(n)
+    return bytes(out)
+
+
+def _varint_at(data, i):
+    n = shift = 0
+    while True:
+        byte = data[i]
+        i += 1
+        n |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return n, i
+        shift += 7
+
+
+def _read_varint(file):
+    n = shift = 0
+    while True:
+        byte = file.read(1)
+        if not byte:
+            raise EOFError('Serialized tree is cut short.')
+        n |= (byte[0] & 0x7f) << shift
+        if byte[0] < 0x80:
+            return n
+        shift += 7
+
+# Name mangling (interdependant functions)
+
+from . import nodes
+from .node import NodeList
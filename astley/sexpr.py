@@ -1,103 +1,337 @@
-import string
-import functools
-import operator
+'''Astley: S-expressions, and nodes written as them.
+
+A node is written as its kind then its fields, in order:
+    (BinOp (Name "x" Load) Add (Constant 1 None))
+Lists of fields are in square brackets, and nodes without fields,
+such as Load and Add, are bare symbols. Positions are not written.
+'''
+
+import re
+import json
+from _ast import AST
+from math import inf, nan
+
+__all__ = (
+    'Atom Symbol Quote String Sexpr nodemap parse_atom parse_lisp '
+    'read_sexprs read_nodes format_node write_node').split()
+
+CHUNK = 1 << 16
 
-from .ops import symbols
 
 class String(str):
     def __repr__(self):
-        return '"' + self.replace('"', '\"') + '"'
+        return json.dumps(self, ensure_ascii=False)
 
 class Atom(str):
     def __repr__(s):
         return s
 
 class Symbol(Atom):
-    first = string.ascii_letters
-    chars = first + string.digits
-
-    @classmethod
-    def matches(cls, expr):
-        return (
-            expr[0] in cls.first and
-            set(expr).issubset(cls.chars))
+    pass
 
 class Quote(Symbol):
     def __repr__(s):
         return "'" + s
 
+
+class Sexpr(tuple):
+    '''An S-expression, which may be made from source or a node.'''
+    def __repr__(s):
+        return format_node(s)
+
+    def __new__(cls, obj=()):
+        if isinstance(obj, str):
+            return parse_lisp(obj)
+        else:
+            return tuple.__new__(cls, obj)
+
+    @classmethod
+    def from_node(cls, node):
+        for sexpr in read_sexprs(format_node(node)):
+            return sexpr
+
+    def to_node(self):
+        for node in read_nodes(format_node(self)):
+            return node
+
+
+# Reading
+
+_tokens = re.compile(r'''
+    [()\[\]]
+  | b?"(?:[^"\\]|\\.)*"
+  | ;[^\n]*\n
+  | (?:b?"|;).*
+  | [^\s()\[\]";]+
+''', re.VERBOSE | re.DOTALL)
+_string = re.compile(r'b?"(?:[^"\\]|\\.)*"', re.DOTALL)
+
+_closers = {'(': ')', '[': ']'}
+
+CONSTANTS = {
+    'None': None, 'True': True, 'False': False, '...': Ellipsis,
+    'inf': inf, '-inf': -inf, 'nan': nan,
+}
+
+
+def tokenize(chunks):
+    '''Yield the tokens of S-expression source given in chunks.
+
+    Text after the last space or bracket of a chunk is kept back until
+    the next, as is a string or comment not yet closed.
+    '''
+    rest = ''
+    for chunk in chunks:
+        text = rest + chunk
+        cut = 1 + max(map(text.rfind, ' \n\t\r()[]'))
+        tokens = _tokens.findall(text, 0, cut)
+        if tokens and _unfinished(tokens[-1]):
+            cut -= len(tokens.pop())
+        rest = text[cut:]
+        yield from tokens
+    tokens = _tokens.findall(rest)
+    if tokens and _unfinished(tokens[-1]) and tokens[-1][0] != ';':
+        raise ValueError('Unterminated string {!r}.'.format(tokens[-1][:20]))
+    yield from tokens
+
+
+def _unfinished(token):
+    first = token[0]
+    if first == ';':
+        return token[-1] != '\n'
+    elif first == '"' or token[:2] == 'b"':
+        return not _string.fullmatch(token)
+    return False
+
+
 def parse_atom(e):
-    f, *r = e
-    
-    if f == "'" and Symbol.matches(r):
-        return Quote(r)
-
-    if Symbol.matches(e) or e in symbols:
-        return Symbol(e)
-
-    for clas in (int, float):
-        try:
-            return clas(e)
-        except ValueError:
-            continue
+    '''Return the value of a string, number, symbol or constant.'''
+    first = e[0]
+    if first == '"':
+        return String(_unquote(e))
+    elif first == 'b' and e[1:2] == '"':
+        return _unquote(e[1:]).encode('latin-1')
+    elif e in CONSTANTS:
+        return CONSTANTS[e]
+    elif first == "'" and len(e) > 1:
+        return Quote(e[1:])
+    elif first in '0123456789+-.':
+        for clas in (int, float, complex):
+            try:
+                return clas(e)
+            except ValueError:
+                continue
+    return Symbol(e)
 
-    if len(e) > 2 and f == s[-1] and f in "\"'":
-        return e[1:-1]
 
-    raise ValueError('Could not understand atom {!r}.'.format(e))
+def _unquote(token):
+    if '\\' in token:
+        return json.loads(token, strict=False)
+    return token[1:-1]
 
-def parse_lisp(source):
-    terms = [[Symbol('body')]]
-    string_delim = None
-    escape_char = False
-    atom = ''
-    lastchar = ''
-    for i, c in enumerate(source):
-        if string_delim:
-            atom += c
-            if source[i-1] != '\\' and c == string_delim:
-                terms[-1].append(String(eval(atom)))
-                string_delim = None
-                atom = ''
+
+def _read(chunks, build, atom):
+    # Iterative, so deep trees do not reach the recursion limit
+    stack = []
+    items = []
+    # Atoms are often repeated, so each is only parsed once
+    atoms = {}
+    for token in tokenize(chunks):
+        first = token[0]
+        if first == '(' or first == '[':
+            stack.append((items, token))
+            items = []
+            continue
+        elif first == ')' or first == ']':
+            if not stack:
+                raise ValueError('Unexpected {!r}.'.format(token))
+            outer, opener = stack.pop()
+            if _closers[opener] != token:
+                raise ValueError('{!r} closed by {!r}.'.format(opener, token))
+            value = build(items) if opener == '(' else items
+            items = outer
+        elif first == ';':
+            continue
         else:
-            if c in '"':
-                string_delim = c
-            elif c == '(' and not atom:
-                terms.append([])
-            
-            if c in ('() \n\t'):
-                # atom has ended
-                if atom:
-                    terms[-1].append(parse_atom(atom))
-                    atom = ''
-                if c == ')':
-                    expr = terms.pop(-1)
-                    if len(expr) == 1:
-                        expr = expr[0]
-                    terms[-1].append(Sexpr(expr))
-            else:
-                 atom += c
-    
-    if len(terms) != 1:
+            try:
+                value = atoms[token]
+            except KeyError:
+                if len(atoms) > 4096:
+                    atoms.clear()
+                value = atoms[token] = atom(token)
+        if stack:
+            items.append(value)
+        else:
+            yield value
+    if stack:
         raise ValueError('Invalid bracket matching')
-    
-    return Sexpr(terms[0])
 
-from . import node, nodes
-nodemap = {}
-for cls in nodes.__dict__.values():
-    if issubclass(cls, node.Node) and hasattr(cls, 'lispsym'):
-        nodemap[cls.lispsym] = cls
 
-class Sexpr(tuple):
-    def __repr__(s):
-        return '({})'.format(' '.join(map(repr, s)))
-    
-    def __new__(cls, obj):
-        if isinstance(obj, str):
-            return parse_lisp(obj)
+def _chunks(source):
+    if isinstance(source, str):
+        return (source, )
+    return iter(lambda: source.read(CHUNK), '')
+
+
+def read_sexprs(source):
+    '''Yield each S-expression in source, a string or readable file.'''
+    return _read(_chunks(source), Sexpr, parse_atom)
+
+
+def read_nodes(source):
+    '''Yield each node written in source, a string or readable file.
+
+    Nodes are built as they are read, without S-expressions between.
+    '''
+    kinds = {}
+
+    def atom(text):
+        value = parse_atom(text)
+        if type(value) is Symbol:
+            # Operators and contexts, such as Load, may be shared
+            node = kinds.get(value)
+            if node is None:
+                cls = nodemap.get(value)
+                if cls is None or cls._fields or cls._attributes:
+                    return value
+                node = kinds[value] = cls()
+            return node
+        elif isinstance(value, str):
+            # compile only accepts plain strings as identifiers
+            return str(value)
+        return value
+
+    def build(items):
+        if not items or type(items[0]) is not Symbol:
+            raise ValueError('Expression must start with a node kind.')
+        head = items[0]
+        if Symbol in map(type, items[1:]):
+            raise ValueError('Unknown symbol in {!r}.'.format(items))
+        if head in CONSTRUCTORS:
+            return CONSTRUCTORS[head](*items[1:])
+        cls = nodemap.get(head)
+        if cls is None:
+            raise ValueError('Unknown node kind {!r}.'.format(head))
+        fields = cls._fields
+        if len(items) > len(fields) + 1:
+            raise ValueError('{} has {} fields, not {}.'.format(
+                head, len(fields), len(items) - 1))
+        node = cls.__new__(cls)
+        values = node.__dict__
+        for name, value in zip(fields, items[1:]):
+            if type(value) is list:
+                value = NodeList(node, value)
+            values[name] = value
+            _link_value(value, node, name)
+        return node
+
+    return _read(_chunks(source), build, atom)
+
+
+def parse_lisp(source):
+    '''Read all S-expressions in source into one (body ...) expression.'''
+    return Sexpr((Symbol('body'), ) + tuple(read_sexprs(source)))
+
+
+# Writing
+
+class _Raw(str):
+    '''Text written as it is, rather than as a string.'''
+
+_SPACE, _CLOSE, _CLOSE_LIST = _Raw(' '), _Raw(')'), _Raw(']')
+# Strings which need no escapes
+_plain = re.compile(r'[^"\\\x00-\x1f\x7f]*\Z')
+
+CONSTRUCTORS = {
+    'complex': complex,
+    'tuple': lambda *items: tuple(items),
+    'frozenset': lambda *items: frozenset(items),
+}
+
+
+def _push_items(push, items, close):
+    push(close)
+    for i in reversed(range(len(items))):
+        push(items[i])
+        if i:
+            push(_SPACE)
+
+
+def write_node(node, stream, flush_every=1024):
+    '''Write a node or S-expression to a file-like stream.'''
+    out = []
+    write = out.append
+    stack = [node]
+    pop, push = stack.pop, stack.append
+    while stack:
+        value = pop()
+        kind = type(value)
+        if kind is _Raw or kind is Symbol or kind is Atom:
+            write(value)
+        elif isinstance(value, AST):
+            fields = value._fields
+            name = getattr(value, 'lispsym', kind.__name__)
+            if not fields:
+                # Statements such as Pass are not shared, so are built
+                # from an expression of their own like other nodes
+                write('(' + name + ')' if value._attributes else name)
+                continue
+            write('(' + name + ' ')
+            _push_items(push, [
+                getattr(value, field, None) for field in fields], _CLOSE)
+        elif kind is Sexpr:
+            write('(')
+            _push_items(push, value, _CLOSE)
+        elif isinstance(value, list):
+            write('[')
+            _push_items(push, value, _CLOSE_LIST)
+        elif kind is str or kind is String:
+            if _plain.match(value):
+                write('"' + value + '"')
+            else:
+                write(json.dumps(value, ensure_ascii=False))
+        elif kind is Quote:
+            write("'" + value)
+        elif value is None or kind is bool or value is Ellipsis:
+            write('...' if value is Ellipsis else repr(value))
+        elif kind is int or kind is float:
+            write(repr(value))
+        elif kind is complex:
+            if value.real or str(value.real)[0] == '-':
+                push(Sexpr((Symbol('complex'), value.real, value.imag)))
+            else:
+                write(repr(value))
+        elif kind is bytes:
+            write('b' + json.dumps(value.decode('latin-1'), ensure_ascii=False))
+        elif kind is tuple or kind is frozenset:
+            push(Sexpr((Symbol(kind.__name__), ) + tuple(value)))
         else:
-            return tuple.__new__(cls, obj)
+            raise TypeError('{} cannot be written as an S-expression.'.format(
+                kind.__name__))
+        if len(out) >= flush_every:
+            stream.write(''.join(out))
+            out.clear()
+    stream.write(''.join(out))
+
+
+class _Buffer(list):
+    write = list.append
+
+
+def format_node(node):
+    '''Return a node or S-expression written as an S-expression.'''
+    out = _Buffer()
+    write_node(node, out)
+    return ''.join(out)
 
-def escape(string):
-    return string
+
+# Name mangling (interdependant functions)
+
+from . import nodes
+from .node import Node, NodeList, _link_value
+
+nodemap = {}
+for cls in vars(nodes).values():
+    if isinstance(cls, type) and issubclass(cls, Node) and issubclass(cls, AST):
+        nodemap[getattr(cls, 'lispsym', cls.__name__)] = cls
+del cls
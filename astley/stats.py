@@ -0,0 +1,97 @@
+'''Astley: Statistics of the rules a Ruleset or Language tries.'''
+
+import sys
+
+__all__ = 'RuleCounts RuleStats'.split()
+
+
+class RuleCounts:
+    '''How often a rule, or rules on a node kind, were tried and applied.
+
+    Times are in seconds. Rounds, kept only for node kinds, count each
+    time a node of the kind was examined.
+    '''
+    __slots__ = (
+        'attempts', 'hits', 'match_time', 'transform_time', 'rounds')
+
+    def __init__(self):
+        self.attempts = self.hits = self.rounds = 0
+        self.match_time = self.transform_time = 0.0
+
+    def __repr__(self):
+        return '{}({})'.format(type(self).__name__, ', '.join(
+            '{}={!r}'.format(name, getattr(self, name))
+            for name in self.__slots__))
+
+    @property
+    def time(self):
+        return self.match_time + self.transform_time
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class RuleStats:
+    '''Counts and times of each rule, and of the node kinds tried.
+
+    Pass an instance to a Ruleset or Language to fill it:
+    >>> stats = RuleStats()
+    >>> Simplify(stats=stats).visit(node)
+    >>> stats.dump()
+    Nothing is measured without one, so there is no cost otherwise.
+    The transform time of a Language rule includes any visits it makes.
+    '''
+    def __init__(self):
+        self.rules = {}
+        self.kinds = {}
+
+    def __repr__(self):
+        return '<{} of {} rules on {} kinds>'.format(
+            type(self).__name__, len(self.rules), len(self.kinds))
+
+    def rule(self, name):
+        counts = self.rules.get(name)
+        if counts is None:
+            counts = self.rules[name] = RuleCounts()
+        return counts
+
+    def kind(self, cls):
+        name = cls.__name__
+        counts = self.kinds.get(name)
+        if counts is None:
+            counts = self.kinds[name] = RuleCounts()
+        return counts
+
+    def record(self, name, kind, match_time, transform_time=None):
+        '''Record a rule tried on a node, and its transform if it matched.'''
+        for counts in (self.rule(name), kind):
+            counts.attempts += 1
+            counts.match_time += match_time
+            if transform_time is not None:
+                counts.hits += 1
+                counts.transform_time += transform_time
+
+    @property
+    def rounds(self):
+        return sum(counts.rounds for counts in self.kinds.values())
+
+    def as_dict(self):
+        return {
+            'rules': {k: v.as_dict() for k, v in self.rules.items()},
+            'kinds': {k: v.as_dict() for k, v in self.kinds.items()},
+        }
+
+    def dump(self, file=sys.stdout):
+        '''Print rules then node kinds, slowest first.'''
+        header = '{:>10}{:>10}{:>12}{:>12}{:>10}  {}'
+        row = '{:>10}{:>10}{:>12.3f}{:>12.3f}{:>10}  {}'
+        for title, table in (('rule', self.rules), ('kind', self.kinds)):
+            print(header.format(
+                'attempts', 'hits', 'match ms', 'transform ms', 'rounds',
+                title), file=file)
+            for name, counts in sorted(
+                    table.items(), key=lambda item: -item[1].time):
+                print(row.format(
+                    counts.attempts, counts.hits, counts.match_time * 1000,
+                    counts.transform_time * 1000, counts.rounds, name),
+                    file=file)
@@ -5,6 +5,7 @@ from _ast import AST
 from types import CodeType
 from io import TextIOBase
 from functools import wraps
+from time import perf_counter
 
 from .node import Node, parse, modify
 from .nodes import Expression, expr
@@ -48,14 +49,25 @@ def match(cls=None, **kw):
                     if k not in cls.match_conds:
                         cls.match_conds[k] = []
                     cls.match_conds[k].append((kw, func))
+        cls._reset_dispatch()
         return cls
 
 
-def parse_try(source, filename):
+def transform(cls, node, filename="<unknown>"):
+    """Transform a node with a Language or Ruleset class, or neither if None."""
+    if cls is None:
+        return node
+    elif issubclass(cls, Language):
+        return cls(node, filename=filename).node
+    else:
+        return cls().visit(node)
+
+
+def parse_try(source, filename, lazy=False):
     try:
-        return parse(source, filename, "eval"), "eval"
+        return parse(source, filename, "eval", lazy), "eval"
     except SyntaxError:
-        return parse(source, filename, "exec"), "exec"
+        return parse(source, filename, "exec", lazy), "exec"
 
 
 class Language(NodeTransformer):
@@ -71,6 +83,8 @@ class Language(NodeTransformer):
     >>> code = state.compile()
     You can provide the mode, but with a few exceptions Astley can
     automatically determine it from source code or node.
+    Pass lazy=True to only convert the nodes the transformer visits,
+    and stats=RuleStats() to count and time the matches tried.
     """
 
     def _match_cond(self, kw, node):
@@ -79,8 +93,11 @@ class Language(NodeTransformer):
             return True
 
         correct_bare = True
-        if hasattr(self.node, "body") and "bare_node" in kw:
-            correct_bare = (node in self.node.body) == kw.get("bare_node")
+        if "bare_node" in kw and hasattr(self.node, "body"):
+            # A statement of the module itself, found from its parent link
+            place = getattr(node, "__dict__", {})
+            bare = place.get("_parent") is self.node and place.get("_field") == "body"
+            correct_bare = bare == kw["bare_node"]
 
         correct_fields = all(
             getattr(node, i) == v or isinstance(getattr(node, i), v)
@@ -93,19 +110,80 @@ class Language(NodeTransformer):
 
     def visit(self, node):
         """Visit a node."""
-        method = "visit_" + node.__class__.__name__
-        visitor = getattr(self, method, None)
+        try:
+            visitor, matches = self._dispatch[type(node)]
+        except KeyError:
+            visitor, matches = self._dispatcher(type(node))
         if visitor:
-            return visitor(node)
+            return visitor(self, node)
 
-        matches = self.match_conds.get(type(node), [])
         for kw, func in matches:
             if self._match_cond(kw, node):
                 return func(self, node)
         else:
             return self.generic_visit(node)
 
+    def _profiled_visit(self, node):
+        try:
+            visitor, matches = self._dispatch[type(node)]
+        except KeyError:
+            visitor, matches = self._dispatcher(type(node))
+        stats = self.stats
+        kind = stats.kind(type(node))
+        kind.rounds += 1
+        if visitor:
+            start = perf_counter()
+            try:
+                return visitor(self, node)
+            finally:
+                stats.record(visitor.__name__, kind, 0.0, perf_counter() - start)
+
+        for kw, func in matches:
+            start = perf_counter()
+            matched = self._match_cond(kw, node)
+            took = perf_counter() - start
+            if not matched:
+                stats.record(func.__name__, kind, took)
+                continue
+            start = perf_counter()
+            try:
+                return func(self, node)
+            finally:
+                stats.record(func.__name__, kind, took, perf_counter() - start)
+        else:
+            return self.generic_visit(node)
+
     match_conds = {}  # {type: [{conditions}, node_func]}
+    _dispatch = {}  # {type: (visit_ method, [({conditions}, node_func)])}
+
+    def __init_subclass__(cls, **kw):
+        super().__init_subclass__(**kw)
+        # Each language keeps its own matches, so they do not leak
+        if "match_conds" not in cls.__dict__:
+            cls.match_conds = {}
+        cls._dispatch = {}
+
+    @classmethod
+    def _dispatcher(cls, kind):
+        """Resolve and store how nodes of a kind are visited.
+
+        Matches of subclasses come before those of their bases,
+        and matches of a node kind before those of its bases.
+        """
+        visitor = getattr(cls, "visit_" + kind.__name__, None)
+        matches = []
+        for lang in cls.__mro__:
+            conds = vars(lang).get("match_conds", {})
+            for k in kind.__mro__:
+                matches.extend(conds.get(k, ()))
+        entry = cls._dispatch[kind] = (visitor, tuple(matches))
+        return entry
+
+    @classmethod
+    def _reset_dispatch(cls):
+        cls._dispatch.clear()
+        for sub in cls.__subclasses__():
+            sub._reset_dispatch()
 
     def __init__(self, node=None, **kw):
         if node is None:
@@ -120,16 +198,17 @@ class Language(NodeTransformer):
             self.filename = kw.get("filename", "<{}>".format(self.__class__.__name__))
 
         mode = kw.get("mode")
+        lazy = kw.get("lazy", False)
         if isinstance(node, Node):
             self.node = node
         elif isinstance(node, AST):
-            self.node = modify(node)
+            self.node = modify(node, lazy)
         elif isinstance(node, str):
             mode = "eval" if mode is eval else "exec" if mode is exec else mode
             if mode is None:
-                self.node, mode = parse_try(node, self.filename)
+                self.node, mode = parse_try(node, self.filename, lazy)
             else:
-                self.node = parse(node, self.filename, mode)
+                self.node = parse(node, self.filename, mode, lazy)
         else:
             raise TypeError("Must be node or source.")
         
@@ -139,6 +218,10 @@ class Language(NodeTransformer):
         self.mode = mode
         self.globals = kw.get("globals", globals())
         self.locals = kw.get("locals", dict())
+        self.stats = kw.get("stats")
+        if self.stats is not None and type(self).visit is Language.visit:
+            # Languages with their own visit are left as they are
+            self.visit = self._profiled_visit
 
         self.on_visit_start()
         self.visit(self.node)
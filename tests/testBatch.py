@@ -0,0 +1,58 @@
+import os
+import importlib.util
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from astley.batch import transpile_tree
+
+SOURCE = 'def f(a):\n    return a + 1\n'
+
+class TestBatch(TestCase):
+    def test_tree(self):
+        with TemporaryDirectory() as root:
+            source, output = os.path.join(root, 'src'), os.path.join(root, 'out')
+            os.makedirs(os.path.join(source, 'pkg'))
+            for name in ('a.py', os.path.join('pkg', 'b.py')):
+                with open(os.path.join(source, name), 'w') as f:
+                    f.write(SOURCE)
+            with open(os.path.join(source, 'bad.py'), 'w') as f:
+                f.write('def')
+
+            results = sorted(
+                transpile_tree('astley:Python', source, output, True, jobs=2),
+                key=lambda r: r['path'])
+            self.assertEqual(
+                [os.path.relpath(r['path'], source) for r in results],
+                ['a.py', 'bad.py', os.path.join('pkg', 'b.py')])
+            self.assertTrue(results[1]['error'].startswith('parse: SyntaxError'))
+            self.assertEqual(
+                sorted(results[0]['times']),
+                sorted('parse transform finalise render compile'.split()))
+            with open(os.path.join(output, 'pkg', 'b.py')) as f:
+                self.assertEqual(f.read(), SOURCE)
+
+    def test_cached(self):
+        with TemporaryDirectory() as root:
+            path = os.path.join(root, 'm.py')
+            with open(path, 'w') as f:
+                f.write(SOURCE)
+            output, cache = os.path.join(root, 'out'), os.path.join(root, 'cache')
+            for _ in range(2):
+                result, = transpile_tree(
+                    'astley:Python', path, output, True, jobs=1, cache=cache)
+            self.assertIsNone(result['error'])
+            self.assertNotIn('parse', result['times'])
+
+            # The stored code is written as the output's .pyc
+            out = os.path.join(output, 'm.py')
+            with open(importlib.util.cache_from_source(out), 'rb') as f:
+                pyc = f.read()
+            self.assertTrue(pyc.startswith(importlib.util.MAGIC_NUMBER))
+            spec = importlib.util.spec_from_file_location('m', out)
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+            self.assertEqual(module.f(1), 2)
+            # It is valid, so importing does not write it again
+            with open(importlib.util.cache_from_source(out), 'rb') as f:
+                self.assertEqual(f.read(), pyc)
+
@@ -0,0 +1,35 @@
+import io
+from unittest import TestCase
+
+from astley.bench import Corpus, compare, report, run_benchmarks
+
+class TestBench(TestCase):
+    def test_run(self):
+        corpus = Corpus([
+            ('a', 'x = 1 + 0\nprint(x)'), ('b', 'def'), ('c', 'y = [x]')])
+        self.assertEqual(len(corpus), 2)
+        results = run_benchmarks(corpus, ['parse', 'Ruleset.visit'], repeat=1)
+        self.assertEqual(
+            list(results),
+            ['ast.parse', 'parse', 'ast.NodeTransformer', 'Ruleset.visit'])
+        for name, result in results.items():
+            self.assertGreater(result['seconds'], 0)
+            self.assertGreater(result['peak'], 0)
+        self.assertIn('ratio', results['parse'])
+        self.assertNotIn('ratio', results['ast.parse'])
+
+        slower = {'parse': dict(results['parse'])}
+        slower['parse']['ratio'] *= 2
+        self.assertEqual(compare(results, slower, min_delta=0), [])
+        self.assertEqual(
+            [name for name, _, _ in compare(slower, results, min_delta=0)],
+            ['parse'])
+        # Differences too short to tell from noise are not regressions
+        self.assertEqual(compare(slower, results), [])
+
+        # Benchmarks missing from the stored results are marked as new
+        out = io.StringIO()
+        report(results, slower, out)
+        rows = dict(line.split(None, 1) for line in out.getvalue().splitlines())
+        self.assertTrue(rows['ast.parse'].endswith(' new'))
+        self.assertFalse(rows['parse'].endswith(' new'))
@@ -0,0 +1,89 @@
+import io
+import ast
+from unittest import TestCase
+
+from astley import (
+    parse, iter_python, write_python, x, y, z,
+    JoinedStr, FormattedValue, Constant, Attribute)
+
+class TestCodegen(TestCase):
+    def round_trip(self, source, mode='exec'):
+        new = parse(source, mode=mode).as_python()
+        self.assertEqual(source, new)
+        self.assertEqual(
+            ast.dump(ast.parse(source, mode=mode)),
+            ast.dump(ast.parse(new, mode=mode)))
+
+    def test_precedence(self):
+        for source in (
+            'a - (b - c)', 'a - b - c', '(a + b) * c',
+            'a ** b ** c', '(a ** b) ** c', '(-a) ** b', '-a ** b',
+            '-(a + b)', '(not a) == b', 'not a == b', '(a + b).c',
+            'a and (b or c)', '[i for i in x if (i if j else k)]',
+        ):
+            self.round_trip(source, 'eval')
+
+    def test_statements(self):
+        self.round_trip('def f(a, /, b=1, *c, d, e=2, **g) -> h:\n    pass')
+        self.round_trip('while x:\n    break\nelse:\n    pass')
+        self.round_trip('raise ValueError from e\nglobal a, b')
+        self.round_trip('x = {**a, "b": c}\nf\'{x!r:>{y}} {{}}\'')
+
+    def test_constructed(self):
+        node = (x + y) * z ** 2
+        self.assertEqual(node.as_python(), '(x + y) * z ** 2')
+        self.assertEqual(node.as_python(), node.as_python())
+
+        # Expressions f-strings cannot hold are passed to str.format
+        node = JoinedStr([Constant('{'), FormattedValue(
+            Attribute(Constant('\n'), 'join')(x), ord('r'),
+            JoinedStr([Constant('>'), FormattedValue(y)]))])
+        self.assertEqual(
+            node.as_python(), "'{{{!r:>{}}'.format(\"\\n\".join(x), y)")
+        self.assertEqual(
+            node.eval(x='ab', y=8, traceback=False), '{' + repr('a\nb').rjust(8))
+
+    def test_stream(self):
+        source = '\n'.join(
+            'def f{0}(a):\n    """Doc."""\n    return a + {0}'.format(i)
+            for i in range(300))
+        node = parse(source)
+        stream = io.StringIO()
+        write_python(node, stream)
+        self.assertEqual(stream.getvalue(), source)
+
+        chunks = list(iter_python(node))
+        self.assertEqual(len(chunks), 300)
+        self.assertEqual(''.join(chunks), node.as_python())
+        self.assertEqual(list(iter_python(x + 1)), ['x + 1'])
+
+    def test_cache(self):
+        source = '\n'.join(
+            'def f{0}(a):\n    """Doc."""\n    return a + {0}'.format(i)
+            for i in range(100))
+        node = parse(source)
+        self.assertEqual(node.as_python(), source)
+        untouched = node.body[0].__dict__['_rendered']
+
+        # Editing a field or a list only rewrites statements around it
+        f = node.body[50]
+        f.body[1].value.right.value = 7
+        f.body[0].value.value = 'New.'
+        f.body.append(parse('del a').body[0])
+        del node.body[-1]
+        node.body[60].name = 'g60'
+        expected = source.replace(
+            '"""Doc."""\n    return a + 50', '"""New."""\n    return a + 7\n    del a'
+        ).replace('def f60', 'def g60').rpartition('\ndef f99')[0]
+        self.assertEqual(node.as_python(), expected)
+        self.assertIs(node.body[0].__dict__['_rendered'], untouched)
+        self.assertEqual(node, parse(expected))
+
+        # An expression used in two statements is rewritten in both
+        tree = parse('x = f(1)\ny = g(1)')
+        a, b = tree.body
+        shared = a.value.args[0]
+        b.value.args[0] = shared
+        self.assertEqual(tree.as_python(), 'x = f(1)\ny = g(1)')
+        shared.value = 2
+        self.assertEqual(tree.as_python(), 'x = f(2)\ny = g(2)')
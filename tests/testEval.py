@@ -0,0 +1,91 @@
+import os
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from astley import parse, x, y
+from astley import Python
+from astley.cache import code_cache, node_key, LRUCache
+from astley.diskcache import DiskCache
+
+class TestEval(TestCase):
+    def test_eval(self):
+        node = x ** 2 + y
+        for traceback in (True, False):
+            self.assertEqual(node.eval(x=3, y=1, traceback=traceback), 10)
+        scope = {}
+        parse('z = 1').exec(locals=scope)
+        self.assertEqual(scope, {'z': 1})
+
+    def test_to_function(self):
+        node = x ** 2 + y
+        for traceback in (True, False):
+            f = node.to_function('x', 'y', traceback=traceback)
+            self.assertEqual(f(3, 1), 10)
+            self.assertEqual(f(y=2, x=1), 3)
+        self.assertNotIn('_parent', vars(node))
+        self.assertNotIn('lineno', vars(node))
+        self.assertEqual(f.__code__.co_filename, '<astley>')
+
+        tree = parse('f(a) * 2', mode='eval')
+        f = tree.body.to_function('a', globals={'f': abs})
+        self.assertEqual(f(-4), 8)
+        self.assertIs(tree.body.parent, tree)
+
+    def test_cache(self):
+        node = x * 3
+        code = node._code('eval')
+        self.assertIs(node._code('eval'), code)
+        hits = code_cache.hits
+        self.assertIs((x * 3)._code('eval'), code)
+        self.assertEqual(code_cache.hits, hits + 1)
+
+        # Changing the node compiles it anew
+        node.right = 4
+        self.assertEqual(node.eval(x=2), 8)
+        self.assertEqual(code_cache.hits, hits + 1)
+
+        # As does changing a node it shares with another
+        shared = x + 1
+        a, b = shared * 1, shared * 2
+        self.assertEqual((a.eval(x=1), b.eval(x=1)), (2, 4))
+        shared.right = 100
+        self.assertEqual((a.eval(x=1), b.eval(x=1)), (101, 202))
+
+        deep = ' + '.join(['x'] * 3000)
+        self.assertEqual(
+            node_key(parse(deep, mode='eval')), node_key(parse(deep, mode='eval')))
+
+    def test_eviction(self):
+        evicted = []
+        cache = LRUCache(2, lambda k, v: evicted.append(k))
+        cache['a'] = cache['b'] = 1
+        cache.get('a')
+        cache['c'] = 1
+        self.assertEqual(evicted, ['b'])
+        cache.clear()
+        self.assertEqual(evicted, ['b', 'a', 'c'])
+
+        code = (x + 1)._code('eval')
+        self.assertTrue(os.path.exists(code.co_filename))
+        code_cache.clear()
+        self.assertFalse(os.path.exists(code.co_filename))
+
+    def test_disk_cache(self):
+        with TemporaryDirectory() as path:
+            cache = DiskCache(path, max_entries=2)
+            source, code = cache.transpile('x = 1\ny = x + 1', Python)
+            self.assertEqual(source, 'x = 1\ny = x + 1')
+            self.assertEqual(cache.misses, 1)
+
+            again = DiskCache(path, max_entries=2)
+            self.assertEqual(again.transpile('x = 1\ny = x + 1', Python)[0], source)
+            self.assertEqual(again.hits, 1)
+            scope = {}
+            exec(again.transpile('x = 1\ny = x + 1', Python)[1], scope)
+            self.assertEqual(scope['y'], 2)
+
+            # Other transformers and sources are kept apart
+            cache.transpile('x = 1\ny = x + 1')
+            cache.transpile('z = 3')
+            self.assertEqual(len(cache), 2)
+            self.assertEqual(cache.misses, 3)
@@ -3,19 +3,19 @@ from os import path
 from sys import version_info
 from unittest import TestCase
 
-from astley import parse
+from astley import parse, first_difference
 
 class TestFile(TestCase):
     def file_test(self, fn1, fn2):
         with open(fn1, encoding='utf8') as f:
             source = f.read(-1)
         expr1 = parse(source, fn1)
-        new = expr1.asPython()
+        new = expr1.as_python()
         with open(fn2, 'w', encoding='utf8') as f:
             f.write(new)
         self.assertEqual(source, new)
         expr2 = parse(new, fn2)
-        self.assertEqual(expr1, expr2)
+        self.assertIsNone(first_difference(expr1, expr2))
 
 # Append each example*.py file to TestCase
 TESTS_PATH = path.dirname(__file__)
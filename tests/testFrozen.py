@@ -0,0 +1,48 @@
+from unittest import TestCase
+
+from astley import parse, BinOp, Call, Dict, Global, Name, Add
+from astley.macros import match
+from astley.frozen import freeze
+
+SOURCE = '''\
+def f(a, b=1):
+    global q
+    x = {**d, 1: 2}
+    return a + b * g(a + 1)
+'''
+
+class TestFrozen(TestCase):
+    def test_traverse(self):
+        node = parse(SOURCE)
+        tree = freeze(node)
+        self.assertEqual(tree.thaw(), node)
+        self.assertEqual(tree.thaw().as_python(), node.as_python())
+
+        function = tree.root.body[0]
+        self.assertEqual(function.name, 'f')
+        self.assertEqual(function.parent, tree.root)
+        self.assertEqual(tree.root.children, [function])
+        self.assertEqual(
+            list(tree.walk(function.index)),
+            list(range(function.index, len(tree))))
+
+        names = [tree[i].id for i in tree.of_kind(Name)]
+        self.assertEqual(names, ['x', 'd', 'a', 'b', 'g', 'a'])
+        glob, = tree.query(kind=Global)
+        self.assertEqual(glob.names, ('q', ))
+        self.assertEqual(glob.lineno, 2)
+        self.assertEqual(list(tree.ancestors(glob.index)), [1, 0])
+
+        d, = tree.query(kind=Dict)
+        self.assertIsNone(d.keys[0])
+        self.assertEqual(d.thaw().as_python(), '{**d, 1: 2}')
+
+    def test_query(self):
+        tree = freeze(parse(SOURCE))
+        adds = tree.query(match(kind=BinOp, op=match(kind=Add)))
+        self.assertEqual(
+            [n.thaw().as_python() for n in adds],
+            ['a + b * g(a + 1)', 'a + 1'])
+        calls = tree.query(lambda n: n.func.id == 'g', kind=Call)
+        self.assertEqual([n.thaw().as_python() for n in calls], ['g(a + 1)'])
+        self.assertIsInstance(tree.root.body[0].body[2].value, BinOp)
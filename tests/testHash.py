@@ -0,0 +1,90 @@
+from unittest import TestCase
+
+from astley import parse, first_difference, Name, Constant, Load
+from astley.cache import Interner
+
+SOURCE = 'f(x.y, x.y) + x.y * 2'
+
+class TestHash(TestCase):
+    def test_hash(self):
+        a, b = parse(SOURCE), parse(SOURCE)
+        self.assertEqual(hash(a), hash(b))
+        self.assertEqual(len({a, b, Name('x')}), 2)
+        self.assertEqual({Name('x'): 1}[Name('x')], 1)
+
+        # Changing any node in the tree changes its hash
+        before = hash(b)
+        b.body[0].value.right.right.value = 3
+        self.assertNotEqual(hash(b), before)
+        self.assertNotEqual(hash(parse('a + b')), hash(parse('a - b')))
+
+        # Only the hashes of the changed node and those above it are dropped
+        call = a.body[0].value.left
+        hash(a)
+        Name('q', Load())
+        a.body[0].value.right.left.attr = 'z'
+        self.assertIn('_hash', call.__dict__)
+        self.assertNotIn('_hash', a.__dict__)
+        self.assertNotEqual(hash(a), hash(parse(SOURCE)))
+
+        deep = parse(' + '.join(['x'] * 5000), mode='eval')
+        self.assertEqual(hash(deep), hash(deep))
+
+    def test_equality(self):
+        a, b = parse(SOURCE), parse(SOURCE)
+        self.assertEqual(a, b)
+        self.assertIsNone(first_difference(a, b))
+        b.body[0].value.left.args[1].attr = 'z'
+        self.assertNotEqual(a, b)
+        self.assertEqual(
+            first_difference(a, b),
+            ('body', 0, 'value', 'left', 'args', 1, 'attr'))
+        self.assertNotEqual(Name('x'), 'x')
+
+        # Nodes differing only by operator are not equal
+        self.assertNotEqual(parse('a + b'), parse('a - b'))
+        self.assertNotEqual(parse('a < b'), parse('a > b'))
+        self.assertEqual(
+            first_difference(parse('a + b'), parse('a - b')),
+            ('body', 0, 'value', 'op'))
+
+        # Comparisons are compared, not chained
+        c, d = parse('a < b'), parse('a < b')
+        self.assertEqual(c, d)
+        self.assertEqual(len(c.body[0].value.ops), 1)
+
+        # Comparisons build new comparisons with ==, so cannot be hashed
+        e, f = c.body[0].value, d.body[0].value
+        with self.assertRaises(TypeError):
+            e in {f}
+        self.assertEqual(c, d)
+        self.assertEqual(e.as_python(), 'a < b')
+
+        deep = ' + '.join(['x'] * 5000)
+        self.assertEqual(parse(deep, mode='eval'), parse(deep, mode='eval'))
+
+    def test_shared(self):
+        # A node in two trees drops what is cached above both
+        a, b = parse('f(x)', mode='eval'), parse('g(x)', mode='eval')
+        shared = Name('y', Load())
+        a.body.args[0] = shared
+        b.body.args[0] = shared
+        c, d = parse('f(y)', mode='eval'), parse('g(y)', mode='eval')
+        self.assertEqual((a, b), (c, d))
+        self.assertEqual((hash(a), hash(b)), (hash(c), hash(d)))
+        shared.id = 'z'
+        c.body.args[0].id = d.body.args[0].id = 'z'
+        self.assertEqual((a, b), (c, d))
+        self.assertEqual((hash(a), hash(b)), (hash(c), hash(d)))
+
+    def test_intern(self):
+        intern = Interner()
+        tree = intern(parse(SOURCE))
+        call = tree.body[0].value.left
+        self.assertIs(call.args[0], call.args[1])
+        self.assertIs(call.args[0], tree.body[0].value.right.left)
+        self.assertEqual(tree.as_python(), SOURCE)
+
+        other = intern(parse('x.y'))
+        self.assertIs(other.body[0].value, call.args[0])
+        self.assertIsNot(intern(Constant(1)), intern(Constant(True)))
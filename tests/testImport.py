@@ -0,0 +1,48 @@
+import os
+import sys
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from astley import Language
+from astley.importer import install
+
+class Doubled(Language):
+    '''Doubles every integer.'''
+    transforms = 0
+
+    def on_visit_start(self):
+        type(self).transforms += 1
+
+    def visit_Constant(self, node):
+        if type(node.value) is int:
+            node.value *= 2
+        return node
+
+class TestImport(TestCase):
+    def test_import(self):
+        with TemporaryDirectory() as path:
+            os.makedirs(os.path.join(path, 'dialect'))
+            for name in ('dialect/__init__.apy', 'dialect/sub.apy', 'plain.py'):
+                with open(os.path.join(path, name), 'w') as f:
+                    f.write('x = 21\n')
+
+            finder = install(Doubled, extensions=['.apy'])
+            sys.path.insert(0, path)
+            dont_write, sys.dont_write_bytecode = sys.dont_write_bytecode, False
+            try:
+                for _ in range(2):
+                    for name in ('dialect', 'dialect.sub', 'plain'):
+                        sys.modules.pop(name, None)
+                    import dialect.sub
+                    import plain
+                    self.assertEqual(dialect.x, 42)
+                    self.assertEqual(dialect.sub.x, 42)
+                    self.assertEqual(plain.x, 21)
+                # Transformed once, then loaded from __pycache__
+                self.assertEqual(Doubled.transforms, 2)
+            finally:
+                finder.uninstall()
+                sys.dont_write_bytecode = dont_write
+                sys.path.remove(path)
+                for name in ('dialect', 'dialect.sub', 'plain'):
+                    sys.modules.pop(name, None)
@@ -0,0 +1,52 @@
+import sys
+import json
+import subprocess
+from unittest import TestCase
+
+import astley
+
+SCRIPT = '''\
+import sys, json, time
+start = time.perf_counter()
+import astley
+took = time.perf_counter() - start
+print(json.dumps([took, sorted(sys.modules), sorted(vars(astley))]))
+'''
+
+# Slow modules which `import astley` should not need
+DEFERRED = '''\
+tempfile hashlib inspect multiprocessing
+astley.batch astley.bench astley.diskcache astley.importer astley.macros
+'''.split()
+
+class TestImportTime(TestCase):
+    def test_import_time(self):
+        runs = [
+            json.loads(subprocess.check_output([sys.executable, '-c', SCRIPT]))
+            for _ in range(3)]
+        took, modules, names = min(runs)
+        for module in DEFERRED:
+            self.assertNotIn(module, modules)
+        self.assertNotIn('x', names)
+        # About 30 ms when written, leaving room for slower machines
+        self.assertLess(took, 0.1)
+
+    def test_lazy_names(self):
+        self.assertEqual(astley.x.id, 'x')
+        self.assertIs(astley.x, astley.x)
+        self.assertEqual((-astley.x).as_python(), '-x')
+        self.assertEqual((2 - astley.x).as_python(), '2 - x')
+        self.assertIn('λ', dir(astley))
+        self.assertIsNotNone(astley.diskcache.DiskCache)
+
+    def test_all(self):
+        for name in ('parse', 'BinOp', 'Load', 'load', 'match', 'x',
+                     'func_signature', 'string_format', 'precedence'):
+            self.assertIn(name, astley.__all__)
+        for name in ('import_module', 'LETTERS', 'SUBMODULES', 'nodes', 'ops'):
+            self.assertNotIn(name, astley.__all__)
+        scope = {}
+        exec('from astley import *', scope)
+        self.assertIs(scope['BinOp'], astley.BinOp)
+        with self.assertRaises(AttributeError):
+            astley.xy
@@ -0,0 +1,80 @@
+from unittest import TestCase
+
+from astley import parse, BinOp, Call, Constant, Name, Add, Pass
+from astley.macros import match, Ruleset
+from astley.index import NodeIndex, index_of
+
+SOURCE = '''\
+def f(a):
+    return g(a + 0) + h(x)
+y = f(x) + 0
+'''
+
+class Identities(Ruleset):
+    add_zero = match(
+        kind=BinOp, op=match(kind=Add),
+        right=match(kind=Constant, value=0))(lambda n: n.left)
+
+def names(index, identifier):
+    return [(n.id, n.lineno) for n in index.named(identifier)]
+
+class TestIndex(TestCase):
+    def test_query(self):
+        tree = parse(SOURCE)
+        index = NodeIndex(tree, names=True)
+        self.assertIs(index_of(tree), index)
+        self.assertEqual(
+            [c.func.id for c in index.of_kind(Call)], ['g', 'h', 'f'])
+        self.assertEqual(names(index, 'x'), [('x', 2), ('x', 3)])
+        call = index.of_kind(Call)[0]
+        self.assertEqual(index.parent(call), (call_parent(tree), 'left'))
+
+    def test_upkeep(self):
+        tree = parse(SOURCE)
+        index = NodeIndex(tree, names=True)
+        tree.body[0].body[0].value = Name('x')
+        self.assertEqual(
+            [c.func.id for c in index.of_kind(Call)], ['f'])
+        self.assertEqual(len(index.named('x')), 2)
+        self.assertEqual(index.named('a'), [])
+
+        tree.body.append(parse('z = k(x)').body[0])
+        self.assertEqual(
+            [c.func.id for c in index.of_kind(Call)], ['f', 'k'])
+        tree.body[1].targets[0].id = 'w'
+        self.assertEqual(names(index, 'w'), [('w', 3)])
+        self.assertEqual(names(index, 'y'), [])
+        del tree.body[1:]
+        self.assertEqual(index.of_kind(Call), [])
+        self.assertEqual(len(index), len(list(walk_indexed(tree))))
+
+    def test_list_edits(self):
+        tree = parse('pass\nx = f(1)')
+        index = NodeIndex(tree)
+        self.assertEqual(len(index.of_kind(Pass)), 1)
+        tree.body.insert(0, parse('y = g(2)').body[0])
+        tree.body.extend(parse('z = h(3)\npass').body)
+        del tree.body[1]
+        tree.body[-2:-1] = []
+        tree.body.pop(1)
+        self.assertEqual([c.func.id for c in index.of_kind(Call)], ['g'])
+        self.assertEqual(len(index.of_kind(Pass)), 1)
+        self.assertEqual(len(index), len(list(walk_indexed(tree))))
+        self.assertEqual([s.place for s in tree.body], [('body', 0), ('body', 1)])
+
+    def test_ruleset(self):
+        tree = parse(SOURCE)
+        index = NodeIndex(tree)
+        result = Identities().visit(tree)
+        self.assertIs(result, tree)
+        self.assertEqual(
+            tree.as_python(), Identities().visit(parse(SOURCE)).as_python())
+        self.assertEqual(len(index.of_kind(BinOp)), 1)
+        self.assertEqual(len(index), len(list(walk_indexed(tree))))
+
+def call_parent(tree):
+    return tree.body[0].body[0].value
+
+def walk_indexed(tree):
+    from astley import walk
+    return (n for n in walk(tree) if n._fields or n._attributes)
@@ -0,0 +1,69 @@
+from unittest import TestCase
+
+import io
+
+from astley import match, Language, BinOp, Add, Mult, expr, RuleStats
+
+class TestLanguage(TestCase):
+    def test_dispatch(self):
+        @match
+        class Adds(Language):
+            @match(kind=BinOp, op=Add)
+            def add(self, node):
+                self.seen.append('add')
+                return self.generic_visit(node)
+
+            def on_visit_start(self):
+                self.seen = []
+
+        @match
+        class Mults(Language):
+            @match(kind=BinOp, op=Mult)
+            def mult(self, node):
+                self.seen.append('mult')
+                return self.generic_visit(node)
+
+            def on_visit_start(self):
+                self.seen = []
+
+        class Both(Adds, Mults):
+            def visit_Name(self, node):
+                self.seen.append(node.id)
+                return node
+
+        source = 'a + b * c'
+        self.assertEqual(Adds(source).seen, ['add'])
+        self.assertEqual(Mults(source).seen, ['mult'])
+        self.assertEqual(Both(source).seen, ['add', 'a', 'mult', 'b', 'c'])
+        self.assertEqual(Language.match_conds, {})
+
+    def test_dispatch_kind_bases(self):
+        @match
+        class Exprs(Language):
+            @match(kind=expr)
+            def count(self, node):
+                self.count += 1
+                return self.generic_visit(node)
+
+            def on_visit_start(self):
+                self.count = 0
+
+        self.assertEqual(Exprs('a + b').count, 3)
+
+    def test_stats(self):
+        @match
+        class Adds(Language):
+            @match(kind=BinOp, op=Add)
+            def add(self, node):
+                return self.generic_visit(node)
+
+        stats = RuleStats()
+        Adds('a + b * c + d', stats=stats)
+        add = stats.rules['add']
+        self.assertEqual((add.attempts, add.hits), (3, 2))
+        self.assertEqual(stats.kinds['BinOp'].rounds, 3)
+        self.assertEqual(stats.kinds['Name'].attempts, 0)
+
+        out = io.StringIO()
+        stats.dump(out)
+        self.assertIn('add', out.getvalue())
@@ -0,0 +1,88 @@
+import dis
+from unittest import TestCase
+
+from astley import parse
+from astley.macros.optimise import optimise, propagate_constants, Flatten
+
+SOURCE = '''\
+def f(x, y):
+    k = 2
+    half = 0.5
+    a = (x + 1 + 2) * 1 - 0
+    b = k * x * 3 / 4 + y * half * 2
+    c = -x + y - (x - 3) + 0
+    d = x ** 1 + (-2) ** 2
+    e = x / (y * k)
+    return a + b + c + d + e
+'''
+
+def expr(source):
+    return optimise(parse(source, mode='eval')).as_python()
+
+def instructions(node):
+    code = compile(node.as_python(), '<test>', 'exec')
+    return len(list(dis.get_instructions(code.co_consts[0])))
+
+class TestOptimise(TestCase):
+    def test_fold(self):
+        self.assertEqual(expr('(x + 1 + 2) * 1 - 0'), 'x + 3')
+        self.assertEqual(expr('2 * x * 3'), 'x * 6')
+        self.assertEqual(expr('x - (y - 1) + 2'), 'x - y + 3')
+        self.assertEqual(expr('x / (y * 2) / 4'), 'x / y * 0.125')
+        self.assertEqual(expr('(-1) ** 2 + x ** 1'), '1 + x')
+        # Floats are kept, as dropping them may change the result's type
+        self.assertEqual(expr('x * 1.0'), 'x * 1.0')
+        self.assertEqual(expr('2 ** 1000 + x'), '2 ** 1000 + x')
+        self.assertEqual(expr('1 << 10 ** 9'), '1 << 1000000000')
+        self.assertEqual(expr('1 ** -10 ** 9'), '1 ** -1000000000')
+
+        # Divisors are not moved out of the divisor they divide
+        self.assertEqual(expr('a / (b / c)'), 'a / (b / c)')
+        self.assertEqual(expr('2 / (x / (y % 1.0))'), '2 / (x / (y % 1.0))')
+        with self.assertRaises(ZeroDivisionError):
+            optimise(parse('-2 / (-x / (y % 1.0))', mode='eval')).eval(
+                x=1, y=3.0, traceback=False)
+
+        # Operands other than numbers are worked out in the same order
+        self.assertEqual(expr('-f() + g() - 1 + 2'), '1 - f() + g()')
+        self.assertEqual(expr('1 / f() * g() * 2'), '2 / f() * g()')
+        calls = []
+        call = lambda name: lambda: calls.append(name) or 2
+        for source in ('-f() + g()', 'x / f() * g()', 'f() - g() + 1'):
+            calls.clear()
+            optimise(parse(source, mode='eval')).eval(
+                f=call('f'), g=call('g'), x=1, traceback=False)
+            self.assertEqual(calls, ['f', 'g'])
+
+        # Numbers folded in place of names are bracketed where needed
+        self.assertEqual(expr('(-2).bit_length()'), '(-2).bit_length()')
+        self.assertEqual(expr('(1 + 1).real'), '(2).real')
+        self.assertEqual(expr('(0 - 1)[x]'), '(-1)[x]')
+        self.assertEqual(expr('(0 - 1.5)(x)'), '(-1.5)(x)')
+        self.assertEqual(expr('(1.5).real'), '1.5.real')
+
+    def test_flatten(self):
+        node = Flatten().visit(parse('a + b - c * d / e', mode='eval').body)
+        self.assertEqual(len(node.operands), 3)
+        self.assertEqual(len(node.operands[2].operand.operands), 3)
+
+    def test_propagate(self):
+        node = propagate_constants(parse(
+            'def f(x):\n    k = 2\n    return x * k\n'
+            'def g(x):\n    k = 2\n    k += 1\n    return k\n'
+            'def h():\n    k = 2\n    return locals()\n'))
+        self.assertEqual(node.as_python(), (
+            'def f(x):\n    return x * 2\n'
+            'def g(x):\n    k = 2\n    k += 1\n    return k\n'
+            'def h():\n    k = 2\n    return locals()'))
+
+    def test_smaller(self):
+        node = parse(SOURCE)
+        namespace, optimised = {}, {}
+        exec(node.compile(), namespace)
+        optimise(node)
+        exec(node.compile(), optimised)
+        self.assertLessEqual(
+            instructions(node), instructions(parse(SOURCE)) * 2 // 3)
+        for x, y in ((1, 2), (3.5, -1), (0, 7)):
+            self.assertEqual(namespace['f'](x, y), optimised['f'](x, y))
@@ -0,0 +1,93 @@
+import ast
+from unittest import TestCase
+
+from astley import parse, Language, Name, Node
+from astley.node import adopt, modify
+
+SOURCE = '''\
+def f(a, b=1):
+    return a + b
+x = f(2) * [i for i in range(3)]'''
+
+class TestParse(TestCase):
+    def test_adopt(self):
+        tree = ast.parse(SOURCE)
+        func = tree.body[0]
+        node = adopt(tree)
+        self.assertIs(node, tree)
+        self.assertIs(node.body[0], func)
+        self.assertTrue(all(
+            isinstance(n, Node) for n in ast.walk(node)))
+        self.assertEqual(node, modify(ast.parse(SOURCE)))
+
+        # Shared contexts of the stdlib parser are left untouched
+        self.assertNotIsInstance(ast.parse('x').body[0].value.ctx, Node)
+
+    def test_lazy(self):
+        node = parse(SOURCE, lazy=True)
+        self.assertNotIn('body', vars(node))
+        func = node.body[0]
+        self.assertEqual(func.name, 'f')
+        self.assertNotIn('body', vars(func))
+        self.assertNotIn('value', vars(node.body[1]))
+
+        self.assertEqual(node, parse(SOURCE))
+        self.assertEqual(node.as_python(), SOURCE)
+
+    def test_lazy_language(self):
+        class Names(Language):
+            def on_visit_start(self):
+                self.names = []
+            def visit_Name(self, node):
+                self.names.append(node.id)
+                return node
+
+        names = Names(SOURCE, lazy=True).names
+        self.assertEqual(names, ['a', 'b', 'x', 'f', 'i', 'i', 'range'])
+        self.assertTrue(all(isinstance(n, str) for n in names))
+        self.assertIsInstance(parse('x', lazy=True).body[0].value, Name)
+
+    def test_parents(self):
+        import pickle
+        for node in (parse(SOURCE), parse(SOURCE, lazy=True)):
+            func, assign = node.body
+            ret = func.body[0]
+            self.assertIs(ret.parent, func)
+            self.assertEqual(ret.place, ('body', 0))
+            self.assertEqual(list(ret.value.left.ancestors()), [
+                ret.value, ret, func, node])
+            self.assertIs(func.sibling(), assign)
+            self.assertIsNone(assign.sibling())
+            self.assertIsNone(node.parent)
+
+        node = parse(SOURCE)
+        func, assign = node.body
+        node.body.insert(0, assign.value)
+        self.assertEqual(assign.value.place, ('body', 0))
+        self.assertEqual(func.place, ('body', 1))
+        value = assign.value = Name('y')
+        self.assertIs(value.parent, assign)
+        self.assertIsNone(func.sibling(-1).sibling(-1))
+
+        # Statements without fields have parents too
+        loop = parse('while x:\n    pass\nelse:\n    pass').body[0]
+        self.assertIs(loop.body[0].parent, loop)
+        self.assertEqual(loop.orelse[0].place, ('orelse', 0))
+
+        copied = pickle.loads(pickle.dumps(func.body[0]))
+        self.assertIsNone(copied.parent)
+        self.assertIs(copied.value.parent, copied)
+
+    def test_bare_node(self):
+        from astley import match, Expr
+        @match
+        class Bare(Language):
+            @match(kind=Expr, bare_node=True)
+            def top(self, node):
+                self.seen.append(node.value.id)
+                return self.generic_visit(node)
+
+            def on_visit_start(self):
+                self.seen = []
+
+        self.assertEqual(Bare('a\nif b:\n    c\nd').seen, ['a', 'd'])
@@ -0,0 +1,67 @@
+from unittest import TestCase
+
+from astley import parse, BinOp, Constant, Name, Add, Mult, RuleStats
+from astley.macros import match, Ruleset
+
+is_add = match(kind=BinOp, op=match(kind=Add))
+is_mul = match(kind=BinOp, op=match(kind=Mult))
+is_zero = match(kind=Constant, value=0)
+is_one = match(kind=Constant, value=1)
+
+class Simplify(Ruleset):
+    add_left = match(is_add, left=is_zero)(lambda n: n.right)
+    add_right = match(is_add, right=is_zero)(lambda n: n.left)
+    mul_left = match(is_mul, left=is_one)(lambda n: n.right)
+    mul_right = match(is_mul, right=is_one)(lambda n: n.left)
+    x_zero = match(kind=Name, id='x')(lambda n: Constant(0))
+
+def expr(source):
+    return parse(source, mode='eval').body
+
+class TestRuleset(TestCase):
+    def test_index(self):
+        rules = Simplify()
+        names = lambda source: [n for n, _ in rules.rules_for(expr(source))]
+        self.assertEqual(names('0 + b'), ['add_left'])
+        self.assertEqual(names('0 + 0'), ['add_left', 'add_right'])
+        self.assertEqual(names('a * 1'), ['mul_right'])
+        self.assertEqual(names('a + b'), [])
+        self.assertEqual(names('1 - 0'), [])
+        self.assertEqual(names('x'), ['x_zero'])
+        self.assertEqual(names('y'), [])
+        self.assertEqual(names('0'), [])
+
+        # Candidates are remembered by which tested values a field equals
+        for source in ('y', 'z', 'x', 'w'):
+            names(source)
+        _, _, found = Simplify._index._kinds[Name]
+        self.assertEqual(len(found), 2)
+
+    def test_transform(self):
+        applied = []
+        trace = lambda name, node, result: applied.append(name)
+        node = Simplify(trace).visit(expr('0 + a * 1 - (1 * b + x)'))
+        self.assertEqual(node.as_python(), 'a - b')
+        self.assertEqual(applied, [
+            'mul_right', 'add_left', 'mul_left', 'x_zero', 'add_right'])
+
+    def test_deep(self):
+        source = ' + '.join(['0'] * 3000)
+        node = Simplify().visit(expr(source))
+        self.assertEqual(node.as_python(), '0')
+
+    def test_stats(self):
+        stats = RuleStats()
+        node = Simplify(stats=stats).visit(expr('0 + a * 1 - (1 * b + x)'))
+        self.assertEqual(node.as_python(), 'a - b')
+        hits = {name: c.hits for name, c in stats.rules.items() if c.hits}
+        self.assertEqual(hits, {
+            'mul_right': 1, 'add_left': 1, 'mul_left': 1,
+            'x_zero': 1, 'add_right': 1})
+        self.assertEqual(stats.rules['add_right'].attempts, 1)
+        self.assertEqual(stats.kinds['BinOp'].hits, 4)
+        self.assertGreater(stats.kinds['BinOp'].rounds, 4)
+        self.assertEqual(
+            stats.rounds, sum(c.rounds for c in stats.kinds.values()))
+        self.assertIn('add_left', stats.as_dict()['rules'])
+        self.assertNotIn('_transform_round', vars(Simplify()))
@@ -0,0 +1,51 @@
+import io
+from unittest import TestCase
+
+from astley import parse, Name, Load, NodeList
+from astley.serialize import dumps, loads, dump, load
+
+SOURCE = '''\
+def f(a, *b, c=1, **d):
+    """Doc"""
+    x = (1, -0.0, 1j, b"q", ..., None, True) if not a < b <= c else {1: [y]}
+    global q
+    return f"{a!r:>3}"
+from . import a as b
+'''
+
+class TestSerialize(TestCase):
+    def test_round_trip(self):
+        node = parse(SOURCE)
+        new = loads(dumps(node))
+        self.assertEqual(new, node)
+        self.assertEqual(new.as_python(), node.as_python())
+        self.assertEqual(new.body[0].body[1].lineno, 3)
+        self.assertIsInstance(new.body, NodeList)
+        self.assertIs(new.body.owner, new)
+        compile(new, '<serialize>', 'exec')
+
+        bare = loads(dumps(node, positions=False))
+        self.assertEqual(bare, node)
+        self.assertFalse(hasattr(bare.body[0], 'lineno'))
+        self.assertEqual(loads(dumps(Load())), Load())
+
+        # Statements without fields are still kept apart
+        loop = loads(dumps(parse('while x:\n    pass\nelse:\n    pass'),
+                           positions=False)).body[0]
+        self.assertIsNot(loop.body[0], loop.orelse[0])
+        self.assertIs(loop.body[0].parent, loop)
+
+        deep = parse(' + '.join(['x'] * 5000), mode='eval')
+        self.assertEqual(loads(dumps(deep)), deep)
+
+    def test_stream(self):
+        trees = [parse(SOURCE), parse('x = 1'), Name('y')]
+        stream = io.BytesIO()
+        for tree in trees:
+            dump(tree, stream)
+        stream.seek(0)
+        self.assertEqual([load(stream) for _ in trees], trees)
+        with self.assertRaises(EOFError):
+            load(stream)
+        with self.assertRaises(ValueError):
+            loads(b'not a tree')
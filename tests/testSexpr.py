@@ -0,0 +1,75 @@
+import io
+from unittest import TestCase
+
+from astley import parse, Name, Load
+from astley.sexpr import (
+    Sexpr, Symbol, String, Quote, parse_lisp, read_nodes, read_sexprs,
+    format_node)
+import astley.sexpr
+
+SOURCE = '''\
+def f(a, *b, c=1, **d):
+    """Doc "quoted" ; not a comment"""
+    x = a[1:2] + b"\\xff" + 1j + 2.5 - ... if not a < b <= c else {1: [y]}
+    global q
+    return f"{a!r:>3}"
+from . import a as b
+'''
+
+class TestSexpr(TestCase):
+    def test_read(self):
+        expr = parse_lisp('(a 1 "x\\ny") ; comment\n b [-2.5 None] \'q')
+        self.assertEqual(expr, (
+            'body', ('a', 1, 'x\ny'), 'b', [-2.5, None], 'q'))
+        self.assertIs(type(expr[1][0]), Symbol)
+        self.assertIs(type(expr[1][2]), String)
+        self.assertIs(type(expr[-1]), Quote)
+        self.assertEqual(repr(expr), '(body (a 1 "x\\ny") b [-2.5 None] \'q)')
+        self.assertEqual(Sexpr('(a)'), ('body', ('a', )))
+        for bad in ('(a', 'a)', '(a]', '"a'):
+            with self.assertRaises(ValueError):
+                list(read_sexprs(bad))
+
+    def test_nodes(self):
+        node = parse(SOURCE)
+        text = format_node(node)
+        self.assertTrue(text.startswith('(Module [(FunctionDef "f" '))
+        self.assertEqual(format_node(Name('x', Load())), '(Name "x" Load)')
+        new, = read_nodes(text)
+        self.assertEqual(new, node)
+        self.assertEqual(new.as_python(), node.as_python())
+        self.assertEqual(Sexpr.from_node(node).to_node(), node)
+        self.assertIs(type(new.body[0].name), str)
+
+        # Nodes read back can be compiled and run
+        code = parse('def f(a, *b):\n    return a.real + len(b)\nx = f(1, "s")')
+        read, = read_nodes(format_node(code))
+        for tree in read, Sexpr.from_node(code).to_node():
+            env = {}
+            tree.exec(env, env)
+            self.assertEqual(env['x'], 2)
+        with self.assertRaises(ValueError):
+            list(read_nodes('(Name x Load)'))
+
+        loop, = read_nodes(format_node(parse('while x:\n    pass\nelse:\n    pass').body[0]))
+        self.assertIsNot(loop.body[0], loop.orelse[0])
+        self.assertIs(loop.orelse[0].parent, loop)
+
+    def test_stream(self):
+        node = parse(SOURCE)
+        stream = io.StringIO()
+        for _ in range(3):
+            astley.sexpr.write_node(node, stream)
+            stream.write('\n')
+        # Tokens cut between chunks are joined again
+        chunk = astley.sexpr.CHUNK
+        try:
+            for size in (1, 3, 7, 100):
+                astley.sexpr.CHUNK = size
+                stream.seek(0)
+                self.assertEqual(list(read_nodes(stream)), [node] * 3)
+        finally:
+            astley.sexpr.CHUNK = chunk
+
+        deep = parse(' + '.join(['x'] * 5000), mode='eval')
+        self.assertEqual(next(read_nodes(format_node(deep))), deep)